@@ -1,29 +1,41 @@
 import os
+import functools
 import hmac
 import hashlib
 import json
+import time
+from collections import OrderedDict
 from urllib.parse import parse_qsl
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 
 from fastapi import FastAPI, Depends, HTTPException, Header, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.exceptions import RequestValidationError
+from fastapi.exception_handlers import request_validation_exception_handler
 from pydantic import BaseModel
-import httpx
 
-from database import (
-    get_user_code,
+from database_async import (
     get_or_create_user_code,
-    get_tracks,
-    add_track,
+    add_track_and_get_tracks,
+    add_tracks_bulk,
+    get_profile_bundle,
     get_track_photos,
+    get_photos_for_tracks,
+    get_tracks_page,
     delete_all_user_tracks,
     init_db,
     find_user_ids_by_track,
     is_user_blocked,
 )
 
+from sender import get_sender
+from tracks import extract_tracks, is_valid_track
+from photo_proxy import get_photo_proxy
+from webhook import BOT_MODE, WEBHOOK_PATH, WEBHOOK_SECRET, UpdateQueue, record_update
+from workers import BOT_WORKERS, WorkerPool
+
 try:
     from aiogram import Bot
 except Exception:
@@ -48,6 +60,23 @@ DELIVERY_TYPES: Dict[str, Dict[str, str]] = {
     "air": {"name": "\u2708\ufe0f \u0410\u0432\u0438\u0430"},
 }
 
+# Один экземпляр Bot на процесс: соединения к api.telegram.org (TLS, keep-alive) переиспользуются
+BOT_CONNECTIONS_LIMIT = int(os.getenv("BOT_CONNECTIONS_LIMIT", "20") or 20)
+_bot: Optional["Bot"] = None
+
+def _get_bot() -> "Bot":
+    global _bot
+    if not BOT_TOKEN or Bot is None:
+        raise HTTPException(status_code=500, detail="Bot not available for notifications")
+    if _bot is None:
+        _bot = Bot(token=BOT_TOKEN, connections_limit=BOT_CONNECTIONS_LIMIT)
+    return _bot
+
+# Подписанные init_data живут не дольше INIT_DATA_MAX_AGE секунд с auth_date (0 — без ограничения)
+INIT_DATA_MAX_AGE = int(os.getenv("INIT_DATA_MAX_AGE", "86400") or 0)
+INIT_DATA_CACHE_SIZE = int(os.getenv("INIT_DATA_CACHE_SIZE", "10000") or 0)
+
+@functools.lru_cache(maxsize=8)
 def _compute_webapp_secret_key(bot_token: str) -> bytes:
     return hmac.new(b"WebAppData", bot_token.encode("utf-8"), hashlib.sha256).digest()
 
@@ -62,7 +91,7 @@ def _verify_init_data(init_data: str, bot_token: str) -> Dict[str, Any]:
     data_check_string = "\n".join(data_pairs)
     secret_key = _compute_webapp_secret_key(bot_token)
     calc_hash = hmac.new(secret_key, data_check_string.encode("utf-8"), hashlib.sha256).hexdigest()
-    if calc_hash != provided_hash:
+    if not hmac.compare_digest(calc_hash, provided_hash):
         raise HTTPException(status_code=401, detail="Invalid init_data signature")
     user_raw = params.get("user")
     user: Dict[str, Any] = {}
@@ -73,10 +102,71 @@ def _verify_init_data(init_data: str, bot_token: str) -> Dict[str, Any]:
             user = {}
     return {"params": params, "user": user}
 
-async def tg_user_dep(
+class _InitDataCache:
+    # Mini App присылает одну и ту же init_data в каждом запросе: проверенный результат
+    # запоминаем до истечения срока жизни подписи, повторные запросы обходятся без HMAC и JSON.
+
+    def __init__(self, max_items: int, max_age: int):
+        self._max_items = max_items
+        self._max_age = max_age
+        # init_data -> (user, expires_at)
+        self._items: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _expires_at(self, params: Dict[str, str]) -> float:
+        if not self._max_age:
+            return float("inf")
+        try:
+            auth_date = int(params.get("auth_date") or 0)
+        except ValueError:
+            auth_date = 0
+        return auth_date + self._max_age
+
+    def verify(self, init_data: str, bot_token: str) -> Dict[str, Any]:
+        now = time.time()
+        item = self._items.get(init_data)
+        if item is not None:
+            if now < item[1]:
+                self._items.move_to_end(init_data)
+                self.hits += 1
+                return item[0]
+            self._items.pop(init_data, None)
+        self.misses += 1
+        verified = _verify_init_data(init_data, bot_token)
+        expires_at = self._expires_at(verified["params"])
+        if now >= expires_at:
+            raise HTTPException(status_code=401, detail="init_data expired")
+        user = verified.get("user") or {}
+        if self._max_items and user.get("id"):
+            self._items[init_data] = (user, expires_at)
+            while len(self._items) > self._max_items:
+                self._items.popitem(last=False)
+        return user
+
+    def stats(self) -> dict:
+        return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
+
+_init_data_cache = _InitDataCache(INIT_DATA_CACHE_SIZE, INIT_DATA_MAX_AGE)
+
+async def _init_data_from_body(request: Request) -> Optional[str]:
+    # Starlette кэширует результат request.json(), а FastAPI строит модель эндпоинта
+    # из того же разобранного тела — JSON декодируется один раз на запрос
+    if not await request.body():
+        return None
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if isinstance(body, dict):
+        return body.get("init_data") or body.get("initData")
+    return None
+
+async def tg_identity_dep(
     request: Request,
     x_telegram_init_data: Optional[str] = Header(None, convert_underscores=True),
 ) -> Dict[str, Any]:
+    # Только проверка подписи init_data, без обращения к базе
     if DEV_MODE:
         # Упрощенный вход в режиме разработки
         return {"id": 1, "first_name": "Dev", "username": "devuser"}
@@ -84,19 +174,17 @@ async def tg_user_dep(
         raise HTTPException(status_code=500, detail="BOT_TOKEN is not set")
     init_data = x_telegram_init_data or request.query_params.get("init_data") or request.query_params.get("initData")
     if not init_data and request.method in ("POST", "PUT", "PATCH"):
-        try:
-            body = await request.json()
-            init_data = body.get("init_data") or body.get("initData")
-        except Exception:
-            pass
-    verified = _verify_init_data(init_data or "", BOT_TOKEN)
-    user = verified.get("user") or {}
+        init_data = await _init_data_from_body(request)
+    user = _init_data_cache.verify(init_data or "", BOT_TOKEN)
     user_id = user.get("id")
     if not user_id:
         raise HTTPException(status_code=401, detail="No user in init_data")
+    return user
+
+async def tg_user_dep(user: Dict[str, Any] = Depends(tg_identity_dep)) -> Dict[str, Any]:
     # Blocked users are not allowed to use API
     try:
-        if is_user_blocked(int(user_id)):
+        if await is_user_blocked(int(user["id"])):
             raise HTTPException(status_code=403, detail="User is blocked")
     except HTTPException:
         raise
@@ -104,17 +192,75 @@ async def tg_user_dep(
         pass
     return user
 
-class TrackRequest(BaseModel):
+class AuthBody(BaseModel):
+    # init_data можно передать в теле запроса вместо заголовка X-Telegram-Init-Data
+    init_data: Optional[str] = None
+
+class TrackRequest(AuthBody):
     track: str
     delivery: Optional[str] = None
 
-class ManagerRequest(BaseModel):
+class ManagerRequest(AuthBody):
     text: Optional[str] = None
 
-class BuyRequest(BaseModel):
+class BuyRequest(AuthBody):
     text: str
 
+class PhotosRequest(AuthBody):
+    tracks: List[str]
+
+class BulkTracksRequest(AuthBody):
+    tracks: Optional[List[str]] = None
+    # Список в свободной форме (вставленный текст, содержимое txt/csv) — треки ищутся в нем
+    text: Optional[str] = None
+    delivery: Optional[str] = None
+
+# Сколько треков можно запросить в /api/photos за раз
+MAX_PHOTO_TRACKS = int(os.getenv("MAX_PHOTO_TRACKS", "200") or 200)
+
+# Сколько треков можно зарегистрировать в /api/tracks/bulk за раз
+MAX_BULK_TRACKS = int(os.getenv("MAX_BULK_TRACKS", "100") or 100)
+
+# Размер страницы /api/me/tracks: по умолчанию и максимально допустимый limit
+TRACKS_PAGE_SIZE = int(os.getenv("TRACKS_PAGE_SIZE", "20") or 20)
+MAX_TRACKS_PAGE_SIZE = int(os.getenv("MAX_TRACKS_PAGE_SIZE", "100") or 100)
+
+# Максимальный размер тела запроса в байтах; больше — сразу 413, без чтения и разбора
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", str(256 * 1024)) or 0)
+
+class BodySizeLimitMiddleware:
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.max_bytes:
+            await self.app(scope, receive, send)
+            return
+        for name, value in scope.get("headers") or []:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > self.max_bytes:
+                    await JSONResponse({"detail": "Request body too large"}, status_code=413)(scope, receive, send)
+                    return
+                break
+
+        # Content-Length может отсутствовать (chunked) — считаем фактически прочитанное.
+        # HTTPException из receive FastAPI пробрасывает как есть и превращает в ответ 413.
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
 app = FastAPI(title="Probuy API", version="0.1.0")
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=MAX_BODY_BYTES)
 
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
 app.add_middleware(
@@ -125,25 +271,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(RequestValidationError)
+async def _invalid_json_handler(request: Request, exc: RequestValidationError):
+    # FastAPI разбирает тело модели раньше зависимостей: неразбираемый JSON — тот же 400,
+    # что и в _init_data_from_body, остальные ошибки валидации — обычный 422
+    if any(err.get("type") == "json_invalid" for err in exc.errors()):
+        return JSONResponse({"detail": "Invalid JSON body"}, status_code=400)
+    return await request_validation_exception_handler(request, exc)
+
 @app.get("/healthz")
 async def healthz():
     return {"ok": True}
 
 @app.get("/api/me")
-async def me(user=Depends(tg_user_dep)):
+async def me(photos: bool = False, user=Depends(tg_identity_dep)):
     user_id = int(user["id"])
-    code = get_user_code(user_id) or get_or_create_user_code(user_id)
-    tracks = get_tracks(user_id)
+    # Блокировка, код и треки — одним обращением к базе
+    bundle = await get_profile_bundle(user_id, create_code=True, photo_counts=photos)
+    if bundle["blocked"]:
+        raise HTTPException(status_code=403, detail="User is blocked")
+    code = bundle["code"]
+    tracks = bundle["tracks"]
+    items = [{"track": t, "delivery": d} for (t, d) in tracks]
+    if photos:
+        counts = bundle.get("photo_counts") or {}
+        for item in items:
+            item["photos"] = counts.get(item["track"], 0)
     return {
         "user": {"id": user_id, "first_name": user.get("first_name"), "username": user.get("username")},
         "code": code,
-        "tracks": [{"track": t, "delivery": d} for (t, d) in tracks],
+        "tracks": items,
     }
 
+@app.get("/api/me/tracks")
+async def my_tracks_page(
+    cursor: Optional[int] = None,
+    backward: bool = False,
+    limit: int = TRACKS_PAGE_SIZE,
+    photos: bool = False,
+    user=Depends(tg_user_dep),
+):
+    # Одна страница треков по курсору: next_cursor/prev_cursor передаются обратно в cursor
+    # (для prev_cursor — вместе с backward=1). Фото считаются только для треков страницы.
+    user_id = int(user["id"])
+    limit = max(1, min(limit, MAX_TRACKS_PAGE_SIZE))
+    page = await get_tracks_page(user_id, cursor=cursor, backward=backward, limit=limit)
+    items = [{"id": i, "track": t, "delivery": d} for (i, t, d) in page["items"]]
+    if photos and items:
+        found = await get_photos_for_tracks(list(dict.fromkeys(item["track"] for item in items)))
+        for item in items:
+            item["photos"] = len(found.get(item["track"]) or [])
+    return {"tracks": items, "next_cursor": page["next_cursor"], "prev_cursor": page["prev_cursor"]}
+
 @app.get("/api/address")
 async def get_address(user=Depends(tg_user_dep)):
     user_id = int(user["id"])
-    code = get_user_code(user_id) or get_or_create_user_code(user_id)
+    code = await get_or_create_user_code(user_id)
     return {"text": CHINA_WAREHOUSE_ADDRESS.format(client_code=code)}
 
 @app.get("/api/deliveries")
@@ -151,61 +334,82 @@ async def get_deliveries() -> Dict[str, List[Dict[str, str]]]:
     items = [{"key": k, "name": v.get("name", k)} for k, v in DELIVERY_TYPES.items()]
     return {"items": items}
 
+def _delivery_name(value: Optional[str]) -> str:
+    # Сохраняем человекочитаемое название доставки, если ключ известен
+    delivery_val = (value or "").strip()
+    delivery_name = DELIVERY_TYPES.get(delivery_val, {}).get("name") if delivery_val in DELIVERY_TYPES else delivery_val
+    return delivery_name or ""
+
 @app.post("/api/track")
 async def add_track_ep(req: TrackRequest, user=Depends(tg_user_dep)):
     user_id = int(user["id"])
     track = (req.track or "").strip().upper()
-    if len(track) < 8 or len(track) > 40 or not all(c.isalnum() and c.upper() == c for c in track):
+    if not is_valid_track(track):
         raise HTTPException(status_code=400, detail="Invalid track format")
-    # Сохраняем человекочитаемое название доставки, если ключ известен
-    delivery_val = (req.delivery or "").strip()
-    delivery_name = DELIVERY_TYPES.get(delivery_val, {}).get("name") if delivery_val in DELIVERY_TYPES else delivery_val
-    add_track(user_id, track, delivery_name or "")
-    tracks = get_tracks(user_id)
+    tracks = await add_track_and_get_tracks(user_id, track, _delivery_name(req.delivery))
     return {"ok": True, "tracks": [{"track": t, "delivery": d} for (t, d) in tracks]}
 
+@app.post("/api/tracks/bulk")
+async def add_tracks_bulk_ep(req: BulkTracksRequest, user=Depends(tg_user_dep)):
+    # Много треков за один вызов и одну транзакцию; уже зарегистрированные возвращаются в duplicates
+    user_id = int(user["id"])
+    candidates = [(t or "").strip().upper() for t in (req.tracks or [])]
+    # Треки в тексте ищутся по тем же правилам, что и в боте
+    candidates += extract_tracks(req.text)
+    invalid = [t for t in dict.fromkeys(candidates) if t and not is_valid_track(t)]
+    tracks = list(dict.fromkeys(t for t in candidates if t and is_valid_track(t)))
+    if not tracks:
+        raise HTTPException(status_code=400, detail="No valid tracks")
+    if len(tracks) > MAX_BULK_TRACKS:
+        raise HTTPException(status_code=400, detail=f"Too many tracks (max {MAX_BULK_TRACKS})")
+    added, duplicates = await add_tracks_bulk(user_id, tracks, _delivery_name(req.delivery))
+    return {"ok": True, "added": added, "duplicates": duplicates, "invalid": invalid}
+
 @app.delete("/api/tracks")
 async def clear_tracks(user=Depends(tg_user_dep)):
     user_id = int(user["id"])
-    deleted = delete_all_user_tracks(user_id)
+    deleted = await delete_all_user_tracks(user_id)
     return {"ok": True, "deleted": deleted}
 
 @app.get("/api/track/{track}/photos")
 async def get_photos(track: str, user=Depends(tg_user_dep)):
     _ = user
     t = (track or "").strip().upper()
-    photos = get_track_photos(t)
+    photos = await get_track_photos(t)
     return {"track": t, "photos": photos}
 
+@app.post("/api/photos")
+async def get_photos_batch(req: PhotosRequest, user=Depends(tg_user_dep)):
+    _ = user
+    tracks = list(dict.fromkeys((t or "").strip().upper() for t in req.tracks if (t or "").strip()))
+    if len(tracks) > MAX_PHOTO_TRACKS:
+        raise HTTPException(status_code=400, detail=f"Too many tracks (max {MAX_PHOTO_TRACKS})")
+    photos = await get_photos_for_tracks(tracks)
+    return {"photos": photos}
+
 @app.post("/api/manager")
 async def notify_manager(req: ManagerRequest, user=Depends(tg_user_dep)):
     if not MANAGER_ID:
         return {"ok": True, "sent": False}
-    if not BOT_TOKEN or Bot is None:
-        raise HTTPException(status_code=500, detail="Bot not available for notifications")
-    bot = Bot(token=BOT_TOKEN)
-    try:
-        full_name = f"{user.get('first_name','')} {user.get('last_name','')}".strip()
-        username = f"@{user.get('username')}" if user.get('username') else "не указан"
-        text = (
-            "📞 <b>КЛИЕНТ ХОЧЕТ СВЯЗАТЬСЯ С МЕНЕДЖЕРОМ (из Mini App)</b>\n\n"
-            f"👤 Имя: {full_name}\n"
-            f"📱 Username: {username}\n"
-            f"🆔 Telegram ID: <code>{user.get('id')}</code>\n\n"
-            f"📝 Сообщение: {req.text or '—'}"
-        )
-        await bot.send_message(MANAGER_ID, text, parse_mode="HTML")
-    finally:
-        await bot.session.close()
+    bot = _get_bot()
+    full_name = f"{user.get('first_name','')} {user.get('last_name','')}".strip()
+    username = f"@{user.get('username')}" if user.get('username') else "не указан"
+    text = (
+        "📞 <b>КЛИЕНТ ХОЧЕТ СВЯЗАТЬСЯ С МЕНЕДЖЕРОМ (из Mini App)</b>\n\n"
+        f"👤 Имя: {full_name}\n"
+        f"📱 Username: {username}\n"
+        f"🆔 Telegram ID: <code>{user.get('id')}</code>\n\n"
+        f"📝 Сообщение: {req.text or '—'}"
+    )
+    await bot.send_message(MANAGER_ID, text, parse_mode="HTML")
     return {"ok": True, "sent": True}
 
-class ParcelArrivedRequest(BaseModel):
+class ParcelArrivedRequest(AuthBody):
     tracking: str
 
 @app.post("/events/parcel-arrived")
 async def parcel_arrived(req: ParcelArrivedRequest, user=Depends(tg_user_dep)):
-    if not BOT_TOKEN or Bot is None:
-        raise HTTPException(status_code=500, detail="Bot not available for notifications")
+    bot = _get_bot()
     user_id = int(user.get("id"))
     # Только администраторы (склад/менеджер) могут подтверждать прибытие
     admin_ids = {i for i in [MANAGER_ID, WAREHOUSE_ID] if i}
@@ -216,24 +420,17 @@ async def parcel_arrived(req: ParcelArrivedRequest, user=Depends(tg_user_dep)):
     if not tracking or len(tracking) < 8 or len(tracking) > 40 or not all(c.isalnum() and c.upper() == c for c in tracking):
         raise HTTPException(status_code=400, detail="Invalid track format")
 
-    target_user_ids = find_user_ids_by_track(tracking)
+    target_user_ids = await find_user_ids_by_track(tracking)
     if not target_user_ids:
         return {"ok": True, "notified": 0}
 
-    bot = Bot(token=BOT_TOKEN)
-    sent = 0
-    try:
-        text = f"\ud83d\udce6 \u0412\u0430\u0448\u0430 \u043f\u043e\u0441\u044b\u043b\u043a\u0430 <code>{tracking}</code> \u043f\u0440\u0438\u0431\u044b\u043b\u0430 \u043d\u0430 \u0441\u043a\u043b\u0430\u0434."
-        for uid in set(target_user_ids):
-            try:
-                await bot.send_message(uid, text, parse_mode="HTML")
-                sent += 1
-            except Exception:
-                # пропускаем недоставляемые
-                pass
-    finally:
-        await bot.session.close()
-    return {"ok": True, "notified": sent}
+    text = f"\ud83d\udce6 \u0412\u0430\u0448\u0430 \u043f\u043e\u0441\u044b\u043b\u043a\u0430 <code>{tracking}</code> \u043f\u0440\u0438\u0431\u044b\u043b\u0430 \u043d\u0430 \u0441\u043a\u043b\u0430\u0434."
+    # недоставляемые попадают в report.failed и пропускаются
+    report = await get_sender().deliver_many(
+        (uid, functools.partial(bot.send_message, uid, text, parse_mode="HTML"))
+        for uid in set(target_user_ids)
+    )
+    return {"ok": True, "notified": report.sent_count, "failed": report.failed_count}
 
 @app.get("/scan")
 async def serve_scan_page():
@@ -251,51 +448,100 @@ async def serve_scan_page():
 async def buy_request(req: BuyRequest, user=Depends(tg_user_dep)):
     if not MANAGER_ID:
         return {"ok": True, "sent": False}
-    if not BOT_TOKEN or Bot is None:
-        raise HTTPException(status_code=500, detail="Bot not available for notifications")
+    bot = _get_bot()
     user_id = int(user.get("id"))
-    code = get_user_code(user_id) or get_or_create_user_code(user_id)
-    bot = Bot(token=BOT_TOKEN)
-    try:
-        full_name = f"{user.get('first_name','')} {user.get('last_name','')}".strip()
-        username = f"@{user.get('username')}" if user.get('username') else "не указан"
-        text = (
-            "\ud83d\udecd\ufe0f <b>\u041d\u041e\u0412\u042b\u0419 \u0417\u0410\u041f\u0420\u041e\u0421 \u041d\u0410 \u041f\u041e\u041a\u0423\u041f\u041a\u0423 (Mini App)</b>\n\n"
-            f"\ud83c\udd94 \u041a\u043e\u0434 \u043a\u043b\u0438\u0435\u043d\u0442\u0430: <code>{code}</code>\n"
-            f"\ud83d\udc64 \u0418\u043c\u044f: {full_name}\n"
-            f"\ud83d\udcf1 Username: {username}\n"
-            f"\ud83c\udd94 Telegram ID: <code>{user_id}</code>\n\n"
-            f"\ud83d\udcdd \u0421\u043e\u043e\u0431\u0449\u0435\u043d\u0438\u0435: {req.text}"
-        )
-        await bot.send_message(MANAGER_ID, text, parse_mode="HTML")
-    finally:
-        await bot.session.close()
+    code = await get_or_create_user_code(user_id)
+    full_name = f"{user.get('first_name','')} {user.get('last_name','')}".strip()
+    username = f"@{user.get('username')}" if user.get('username') else "не указан"
+    text = (
+        "\ud83d\udecd\ufe0f <b>\u041d\u041e\u0412\u042b\u0419 \u0417\u0410\u041f\u0420\u041e\u0421 \u041d\u0410 \u041f\u041e\u041a\u0423\u041f\u041a\u0423 (Mini App)</b>\n\n"
+        f"\ud83c\udd94 \u041a\u043e\u0434 \u043a\u043b\u0438\u0435\u043d\u0442\u0430: <code>{code}</code>\n"
+        f"\ud83d\udc64 \u0418\u043c\u044f: {full_name}\n"
+        f"\ud83d\udcf1 Username: {username}\n"
+        f"\ud83c\udd94 Telegram ID: <code>{user_id}</code>\n\n"
+        f"\ud83d\udcdd \u0421\u043e\u043e\u0431\u0449\u0435\u043d\u0438\u0435: {req.text}"
+    )
+    await bot.send_message(MANAGER_ID, text, parse_mode="HTML")
     return {"ok": True, "sent": True}
 
 @app.get("/api/tg_photo/{file_id}")
-async def proxy_tg_photo(file_id: str):
+async def proxy_tg_photo(file_id: str, request: Request):
     if not BOT_TOKEN:
         raise HTTPException(status_code=500, detail="BOT_TOKEN is not set")
-    api_base = f"https://api.telegram.org/bot{BOT_TOKEN}"
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.get(f"{api_base}/getFile", params={"file_id": file_id})
-        data = r.json()
-        if not data.get("ok"):
-            raise HTTPException(status_code=404, detail="File not found")
-        file_path = data["result"].get("file_path")
-        if not file_path:
-            raise HTTPException(status_code=404, detail="No file_path")
-        file_url = f"https://api.telegram.org/file/bot{BOT_TOKEN}/{file_path}"
-        stream = await client.stream("GET", file_url)
-        headers = {"Content-Type": stream.headers.get("Content-Type", "application/octet-stream")}
-        return StreamingResponse(stream.aiter_raw(), headers=headers)
+    return await get_photo_proxy(BOT_TOKEN).respond(file_id, request)
+
+# BOT_MODE=webhook: бот (bot.py) работает в этом процессе, апдейты идут через ограниченную очередь.
+# BOT_WORKERS > 1 — апдейты раздаются процессам-воркерам по chat_id (workers.py).
+_updates: Optional[Any] = None
+_tg_bot = None
+
+def _webhook_secret_ok(value: Optional[str]) -> bool:
+    return bool(WEBHOOK_SECRET) and hmac.compare_digest((value or "").encode(), WEBHOOK_SECRET.encode())
+
+@app.post(WEBHOOK_PATH + "/{secret}")
+async def telegram_webhook(
+    secret: str,
+    request: Request,
+    x_telegram_bot_api_secret_token: Optional[str] = Header(default=None),
+):
+    if not _webhook_secret_ok(secret) or not _webhook_secret_ok(x_telegram_bot_api_secret_token):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if _updates is None:
+        raise HTTPException(status_code=503, detail="Bot is not running in webhook mode")
+    try:
+        update = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid update")
+    if not isinstance(update, dict):
+        raise HTTPException(status_code=400, detail="Invalid update")
+    record_update(update)
+    # Очередь переполнена — 503, Telegram повторит доставку позже
+    if not _updates.put(update):
+        raise HTTPException(status_code=503, detail="Update queue is full")
+    return {"ok": True}
+
+@app.get(WEBHOOK_PATH + "/{secret}/stats")
+async def telegram_webhook_stats(secret: str):
+    if not _webhook_secret_ok(secret):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return _updates.stats() if _updates is not None else {"workers": 0}
 
 @app.on_event("startup")
 async def _startup():
+    global _updates, _tg_bot
     try:
-        init_db()
+        await init_db()
     except Exception:
         pass
+    if BOT_TOKEN and Bot is not None:
+        _get_bot()
+    if BOT_MODE == "webhook" and BOT_TOKEN and BOT_WORKERS > 1:
+        _updates = WorkerPool(BOT_WORKERS)
+        _updates.start()
+    elif BOT_MODE == "webhook" and BOT_TOKEN:
+        import bot as tg_bot
+
+        _tg_bot = tg_bot
+        await tg_bot.on_startup(tg_bot.dp)
+        _updates = UpdateQueue(tg_bot.process_webhook_update)
+        _updates.start()
+
+@app.on_event("shutdown")
+async def _shutdown():
+    global _bot, _updates, _tg_bot
+    if _updates is not None:
+        await _updates.stop()
+        _updates = None
+    if _tg_bot is not None:
+        await _tg_bot.on_shutdown(_tg_bot.dp)
+        await _tg_bot.bot.session.close()
+        _tg_bot = None
+    await get_sender().close()
+    if BOT_TOKEN:
+        await get_photo_proxy(BOT_TOKEN).close()
+    if _bot is not None:
+        await _bot.session.close()
+        _bot = None
 
 _base_dir = os.path.dirname(__file__)
 _dist_dir = os.path.join(_base_dir, "web", "dist")
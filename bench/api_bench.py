@@ -0,0 +1,332 @@
+# Нагрузочные прогоны API в процессе, без сети (httpx.ASGITransport).
+# Запуск из корня репозитория: python bench/api_bench.py <прогон> [аргументы], список — без аргументов.
+# Синтетические пользователи — с большими id, чтобы не пересекаться с реальными; в конце удаляются.
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Tuple
+from unittest import mock
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# Прогону нужен только токен для подписи init_data (бот не запускается) и настоящая проверка подписи
+os.environ.setdefault("BOT_TOKEN", "0:bench")
+os.environ["DEV_MODE"] = "0"
+
+import api  # noqa: E402
+from storage import OPERATIONS, CachedStorage, create_storage, set_storage  # noqa: E402
+
+BENCH_USER_BASE = 9_000_000_000
+# Задержка ответа базы в прогоне, мс: sqlite локальный, а до Postgres — сетевой round-trip
+BENCH_DB_LATENCY_MS = float(os.getenv("BENCH_DB_LATENCY_MS", "2") or 0)
+
+
+def signed_init_data(user_id: int) -> str:
+    params = {"auth_date": str(int(time.time())), "user": json.dumps({"id": user_id, "first_name": "Bench"})}
+    data_check_string = "\n".join(f"{k}={params[k]}" for k in sorted(params))
+    secret_key = api._compute_webapp_secret_key(api.BOT_TOKEN)
+    params["hash"] = hmac.new(secret_key, data_check_string.encode("utf-8"), hashlib.sha256).hexdigest()
+    return urlencode(params)
+
+
+def bench_storage(engine: str, slow_ops: Tuple[str, ...] = ()) -> Tuple[Any, Dict[str, int]]:
+    # Хранилище прогона: обращения к backend (то, что не отдал кэш профиля) считаются по операциям,
+    # операции из slow_ops ждут BENCH_DB_LATENCY_MS
+    storage = create_storage(engine)
+    inner = storage.inner if isinstance(storage, CachedStorage) else storage
+    calls: Dict[str, int] = {}
+    for op in OPERATIONS:
+        if not hasattr(inner, op):
+            # Операции самого кэша (статистика) в базу не ходят
+            continue
+        delay = BENCH_DB_LATENCY_MS / 1000 if op in slow_ops else 0.0
+
+        def counted(*args, _op=op, _fn=getattr(inner, op), _delay=delay, **kwargs):
+            calls[_op] = calls.get(_op, 0) + 1
+            if _delay:
+                # Драйвер ждет ответа базы в потоке — так же блокирующе
+                time.sleep(_delay)
+            return _fn(*args, **kwargs)
+        setattr(inner, op, counted)
+    if storage is not inner:
+        storage = CachedStorage(inner)
+    storage.init_db()
+    set_storage(storage)
+    return storage, calls
+
+
+async def run_requests(send: Callable[[Any, int], Any], requests: int, concurrency: int) -> Dict[str, Any]:
+    import httpx
+
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    pending = iter(range(requests))
+
+    async def client_loop(client: "httpx.AsyncClient") -> None:
+        for i in pending:
+            started = time.perf_counter()
+            resp = await send(client, i)
+            latencies.append(time.perf_counter() - started)
+            statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(max(1, concurrency))))
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, statuses, elapsed)
+
+
+def summarize(latencies: List[float], statuses: Dict[int, int], elapsed: float, digits: int = 2) -> Dict[str, Any]:
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "statuses": statuses,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, digits) if latencies else 0.0,
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, digits) if latencies else 0.0,
+    }
+
+
+async def bench_me(engine: str = "sqlite", requests: int = 2000, concurrency: int = 50) -> Dict[str, Dict[str, Any]]:
+    # /api/me через database_async (запрос в пуле потоков) против того же вызова прямо в event loop
+    storage, _ = bench_storage(engine, ("get_profile_bundle",))
+    users = [BENCH_USER_BASE + i for i in range(max(1, concurrency))]
+    headers = [{"X-Telegram-Init-Data": signed_init_data(uid)} for uid in users]
+
+    async def send(client, i):
+        return await client.get("/api/me", headers=headers[i % len(headers)])
+
+    async def blocking_bundle(*args, **kwargs):
+        return storage.get_profile_bundle(*args, **kwargs)
+
+    report = {}
+    try:
+        report["async"] = await run_requests(send, requests, concurrency)
+        with mock.patch.object(api, "get_profile_bundle", blocking_bundle):
+            report["sync"] = await run_requests(send, requests, concurrency)
+    finally:
+        for uid in users:
+            storage.delete_user_everything(uid)
+    return report
+
+
+async def bench_roundtrips(engine: str = "sqlite", users: int = 100) -> Dict[str, Dict[str, Any]]:
+    # Обращения к базе на один запрос к endpoint; каждое обращение ждет BENCH_DB_LATENCY_MS.
+    # Для сравнения — прежняя цепочка /api/me из отдельных запросов (бан, код, треки) без кэша.
+    storage, calls = bench_storage(engine, OPERATIONS)
+    inner = getattr(storage, "inner", storage)
+    ids = [BENCH_USER_BASE + i for i in range(max(1, users))]
+    headers = [{"X-Telegram-Init-Data": signed_init_data(uid)} for uid in ids]
+    scenarios: List[Tuple[str, Callable[[Any, int], Any]]] = [
+        ("GET /api/me (new user)", lambda c, i: c.get("/api/me", headers=headers[i])),
+        ("GET /api/me", lambda c, i: c.get("/api/me", headers=headers[i])),
+        ("POST /api/track", lambda c, i: c.post("/api/track", headers=headers[i], json={"track": f"RT{ids[i]}A1", "delivery": "air"})),
+        ("POST /api/tracks/bulk", lambda c, i: c.post("/api/tracks/bulk", headers=headers[i], json={"text": f"RT{ids[i]}B1\nRT{ids[i]}B2\nRT{ids[i]}B3"})),
+        ("GET /api/me/tracks", lambda c, i: c.get("/api/me/tracks?photos=1", headers=headers[i])),
+    ]
+
+    async def chain(_client, i):
+        # Как было: отдельные обращения к базе на бан, код (с созданием) и треки
+        uid = ids[i]
+        inner.is_user_blocked(uid)
+        inner.get_user_code(uid) or inner.get_or_create_user_code(uid)
+        inner.get_tracks(uid)
+        return SimpleNamespace(status_code=200)
+
+    report = {}
+    try:
+        for name, send in scenarios + [("/api/me as separate queries", chain)]:
+            before = sum(calls.values())
+            row = await run_requests(send, len(ids), 1)
+            row["db_calls"] = round((sum(calls.values()) - before) / len(ids), 2)
+            report[name] = row
+    finally:
+        for uid in ids:
+            storage.delete_user_everything(uid)
+    return report
+
+
+async def bench_init_data(requests: int = 20000, users: int = 100) -> Dict[str, Dict[str, Any]]:
+    # Пропускная способность tg_user_dep: кэш проверенных init_data и ключ, вычисленный один раз,
+    # против проверки каждого запроса заново (HMAC ключа и подписи, разбор строки, JSON user)
+    bench_storage("memory")
+    request = api.Request({"type": "http", "method": "GET", "headers": [], "query_string": b""})
+    init_datas = [signed_init_data(BENCH_USER_BASE + i) for i in range(max(1, users))]
+
+    async def run_deps() -> Dict[str, Any]:
+        latencies: List[float] = []
+        started = time.perf_counter()
+        for i in range(requests):
+            call_started = time.perf_counter()
+            await api.tg_user_dep(await api.tg_identity_dep(request, init_datas[i % len(init_datas)]))
+            latencies.append(time.perf_counter() - call_started)
+        return summarize(latencies, {200: requests}, time.perf_counter() - started, digits=4)
+
+    async def send(client, i):
+        return await client.get("/api/address", headers={"X-Telegram-Init-Data": init_datas[i % len(init_datas)]})
+
+    report: Dict[str, Dict[str, Any]] = {}
+    report["tg_user_dep cached"] = await run_deps()
+    report["GET /api/address cached"] = await run_requests(send, requests // 10, 1)
+    # Без кэша: ничего не запоминается, ключ из токена считается на каждый запрос
+    with mock.patch.multiple(
+        api,
+        _init_data_cache=api._InitDataCache(0, api.INIT_DATA_MAX_AGE),
+        _compute_webapp_secret_key=api._compute_webapp_secret_key.__wrapped__,
+    ):
+        report["tg_user_dep uncached"] = await run_deps()
+        report["GET /api/address uncached"] = await run_requests(send, requests // 10, 1)
+    return report
+
+
+async def bench_body(requests: int = 500, buy_kb: int = 100) -> Dict[str, Dict[str, Any]]:
+    # POST /api/track и /api/buy с init_data в заголовке и в теле: текущее чтение тела в авторизации
+    # против прежнего (ошибки разбора молча пропускались). Оба разбирают JSON один раз — Starlette
+    # кэширует request.json(). Плюс отказ 413 по размеру против разбора такого тела целиком.
+    bench_storage("memory")
+    init_data = signed_init_data(BENCH_USER_BASE)
+    header = {"X-Telegram-Init-Data": init_data}
+    track = {"track": f"RT{BENCH_USER_BASE}", "delivery": "air"}
+    buy = {"text": "x" * (buy_kb * 1024)}
+    oversized = json.dumps({"init_data": init_data, "text": "x" * (api.MAX_BODY_BYTES or 256 * 1024) * 4}).encode()
+
+    async def chunks():
+        # Без Content-Length — размер виден только по прочитанному
+        for start in range(0, len(oversized), 64 * 1024):
+            yield oversized[start:start + 64 * 1024]
+
+    scenarios: List[Tuple[str, Callable[[Any, int], Any]]] = [
+        ("track, init_data in header", lambda c, i: c.post("/api/track", headers=header, json=track)),
+        ("track, init_data in body", lambda c, i: c.post("/api/track", json={**track, "init_data": init_data})),
+        (f"buy {buy_kb} KB, init_data in body", lambda c, i: c.post("/api/buy", json={**buy, "init_data": init_data})),
+        (f"buy {len(oversized) // 1024} KB, Content-Length", lambda c, i: c.post("/api/buy", content=oversized, headers={"Content-Type": "application/json"})),
+        (f"buy {len(oversized) // 1024} KB, chunked", lambda c, i: c.post("/api/buy", content=chunks(), headers={"Content-Type": "application/json"})),
+    ]
+
+    async def baseline_init_data_from_body(request):
+        # Чтение тела в tg_user_dep до изменения (e237f00), дословно
+        try:
+            body = await request.json()
+            return body.get("init_data") or body.get("initData")
+        except Exception:
+            return None
+
+    def body_limit_layer() -> Any:
+        # Стек middleware собирается при первом запросе
+        layer = api.app.middleware_stack
+        while layer is not None and not isinstance(layer, api.BodySizeLimitMiddleware):
+            layer = getattr(layer, "app", None)
+        return layer
+
+    report: Dict[str, Dict[str, Any]] = {}
+    for name, send in scenarios:
+        report[name] = await run_requests(send, requests, 1)
+    with mock.patch.object(api, "_init_data_from_body", baseline_init_data_from_body):
+        for name, send in scenarios[1:3]:
+            report[name + ", old dependency"] = await run_requests(send, requests, 1)
+    with mock.patch.object(body_limit_layer(), "max_bytes", 0):
+        report[scenarios[3][0] + ", no limit"] = await run_requests(scenarios[3][1], requests, 1)
+    return report
+
+
+async def telegram_stub() -> Tuple[Any, str, Dict[str, Any]]:
+    # Локальная заглушка Bot API: отвечает на sendMessage и считает TCP-соединения клиентов.
+    # Обычный HTTP на loopback — установка соединения здесь дешевле, чем TLS до api.telegram.org.
+    from aiohttp import web
+
+    seen: Dict[str, Any] = {"connections": set(), "requests": 0}
+
+    async def send_message(request: "web.Request") -> "web.Response":
+        seen["connections"].add(request.transport.get_extra_info("peername"))
+        seen["requests"] += 1
+        data = await request.post()
+        return web.json_response({"ok": True, "result": {
+            "message_id": seen["requests"],
+            "date": int(time.time()),
+            "chat": {"id": int(data.get("chat_id") or 0), "type": "private"},
+            "text": data.get("text") or "",
+        }})
+
+    web_app = web.Application()
+    web_app.router.add_post("/bot{token}/sendMessage", send_message)
+    runner = web.AppRunner(web_app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}", seen
+
+
+async def bench_bot(requests: int = 500, concurrency: int = 10) -> Dict[str, Dict[str, Any]]:
+    # Уведомление менеджеру (/api/manager) через общий Bot против нового Bot на каждый запрос
+    from aiogram import Bot
+    from aiogram.bot.api import TelegramAPIServer
+
+    bench_storage("memory")
+    runner, base_url, seen = await telegram_stub()
+    server = TelegramAPIServer.from_base(base_url)
+    users = [BENCH_USER_BASE + i for i in range(max(1, concurrency))]
+    headers = [{"X-Telegram-Init-Data": signed_init_data(uid)} for uid in users]
+    shared_bot = Bot(token=api.BOT_TOKEN, connections_limit=api.BOT_CONNECTIONS_LIMIT, server=server)
+    fresh_bots: List[Any] = []
+
+    async def send(client, i):
+        return await client.post("/api/manager", headers=headers[i % len(headers)], json={"text": "bench"})
+
+    def fresh_bot():
+        # Как было до общего экземпляра: своя aiohttp-сессия и свое соединение на уведомление
+        bot = Bot(token=api.BOT_TOKEN, server=server)
+        fresh_bots.append(bot)
+        return bot
+
+    async def run(name: str) -> None:
+        seen["connections"].clear()
+        report[name] = await run_requests(send, requests, concurrency)
+        report[name]["conns"] = len(seen["connections"])
+
+    report: Dict[str, Dict[str, Any]] = {}
+    try:
+        with mock.patch.multiple(api, MANAGER_ID=1, _bot=shared_bot):
+            await run("shared")
+            with mock.patch.object(api, "_get_bot", fresh_bot):
+                await run("per-request")
+    finally:
+        for bot in [shared_bot] + fresh_bots:
+            await (await bot.get_session()).close()
+        await runner.cleanup()
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, Any]]) -> None:
+    width = max(len(name) for name in report) + 2
+    extra = [key for key in next(iter(report.values())) if key not in ("requests", "statuses", "rps", "p50_ms", "p95_ms")]
+    print(f"{'variant':<{width}} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}" + "".join(f" {key:>9}" for key in extra) + "  statuses")
+    for name, row in report.items():
+        print(
+            f"{name:<{width}} {row['requests']:>9} {row['rps']:>9} {row['p50_ms']:>9} {row['p95_ms']:>9}"
+            + "".join(f" {row[key]:>9}" for key in extra)
+            + f"  {row['statuses']}"
+        )
+
+
+# имя -> (аргументы для справки, прогон); числовые аргументы приводятся к int
+BENCHES: Dict[str, Tuple[str, Callable[..., Any]]] = {
+    "me": ("[engine] [requests] [concurrency]", bench_me),
+    "roundtrips": ("[engine] [users]", bench_roundtrips),
+    "init_data": ("[requests] [users]", bench_init_data),
+    "body": ("[requests] [buy_kb]", bench_body),
+    "bot": ("[requests] [concurrency]", bench_bot),
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHES:
+        sys.exit("Usage:\n" + "\n".join(f"  python bench/api_bench.py {name} {args}" for name, (args, _) in BENCHES.items()))
+    bench_args = [int(arg) if arg.isdigit() else arg for arg in sys.argv[2:]]
+    print_report(asyncio.run(BENCHES[sys.argv[1]][1](*bench_args)))
@@ -0,0 +1,74 @@
+# Задержка get/set состояний FSM: DatabaseStorage против MemoryStorage aiogram.
+# Запуск из корня репозитория: python bench/fsm_bench.py <engine> [операций]
+# Пишет строки fsm_states в базу выбранного engine (memory / sqlite / postgres) для синтетических
+# чатов с большими id и удаляет их в конце (reset_state без данных удаляет строку).
+import asyncio
+import os
+import sys
+import time
+from typing import Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from aiogram.contrib.fsm_storage.memory import MemoryStorage  # noqa: E402
+
+from fsm_storage import DatabaseStorage  # noqa: E402
+from storage import create_storage, set_storage  # noqa: E402
+
+BENCH_CHAT_BASE = 9_000_000_000
+
+
+async def bench(engine: str, n: int = 2000) -> dict:
+    storage_backend = create_storage(engine)
+    storage_backend.init_db()
+    set_storage(storage_backend)
+    report: dict = {}
+    for name, storage in (("memory", MemoryStorage()), ("database", DatabaseStorage())):
+        timings: Dict[str, list] = {}
+        chats = [BENCH_CHAT_BASE + i for i in range(n)]
+        for op in ("set_state", "set_data", "get_state", "get_data"):
+            samples = timings.setdefault(op, [])
+            for chat in chats:
+                started = time.perf_counter()
+                if op == "set_state":
+                    await storage.set_state(chat=chat, state="BenchStates:step")
+                elif op == "set_data":
+                    await storage.set_data(chat=chat, data={"track": f"BENCH{chat}"})
+                elif op == "get_state":
+                    await storage.get_state(chat=chat)
+                else:
+                    await storage.get_data(chat=chat)
+                samples.append(time.perf_counter() - started)
+        if isinstance(storage, DatabaseStorage):
+            # Холодное чтение — промах кэша, запрос к базе
+            samples = timings.setdefault("get_state (cold)", [])
+            await storage.flush()
+            cold = DatabaseStorage()
+            for chat in chats:
+                started = time.perf_counter()
+                await cold.get_state(chat=chat)
+                samples.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            for chat in chats:
+                await storage.reset_state(chat=chat)
+            await storage.flush()
+            timings["flush (per state)"] = [(time.perf_counter() - started) / n]
+        await storage.close()
+        for op, samples in timings.items():
+            samples.sort()
+            report[f"{name}: {op}"] = {
+                "p50_us": round(samples[len(samples) // 2] * 1e6, 1),
+                "p95_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1e6, 1),
+            }
+    return report
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python bench/fsm_bench.py <memory|sqlite|postgres> [operations]")
+    rows = asyncio.run(bench(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 2000))
+    print(f"{'operation':<34} {'p50 us':>10} {'p95 us':>10}")
+    for op, row in rows.items():
+        print(f"{op:<34} {row['p50_us']:>10} {row['p95_us']:>10}")
@@ -0,0 +1,92 @@
+# Нагрузочный прогон для любого backend: задержка (p50/p95) и пропускная способность по операциям,
+# и проверка планов горячих запросов. Запуск из корня репозитория:
+#   python bench/storage_bench.py bench [engine] [users] [tracks_per_user]
+#   python bench/storage_bench.py explain [engine]   — код выхода 1, если есть полный просмотр таблицы
+# Прогон пишет в базу выбранного engine синтетических пользователей с большими id и удаляет их в конце.
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from storage import DB_ENGINE, create_storage  # noqa: E402
+
+BENCH_USER_BASE = 9_000_000_000
+
+
+def bench(engine: str = DB_ENGINE, users: int = 200, tracks_per_user: int = 5) -> dict:
+    storage = create_storage(engine)
+    storage.init_db()
+    timings: dict = {}
+
+    def measure(op: str, *args):
+        started = time.perf_counter()
+        result = getattr(storage, op)(*args)
+        timings.setdefault(op, []).append(time.perf_counter() - started)
+        return result
+
+    user_ids = [BENCH_USER_BASE + i for i in range(users)]
+    codes: dict = {}
+    try:
+        for uid in user_ids:
+            codes[uid] = measure("get_or_create_user_code", uid)
+            for n in range(tracks_per_user):
+                measure("add_track", uid, f"BENCH{uid}X{n}", "")
+            measure("add_track_photo", f"BENCH{uid}X0", f"bench-file-{uid}", None, None)
+            measure("create_shipment", uid, 1, f"BENCH{uid}-1", "Bench", "+70000000000", "City", None)
+        for uid in user_ids:
+            measure("get_user_code", uid)
+            measure("get_tracks", uid)
+            measure("get_profile_bundle", uid, False, True)
+            measure("find_user_ids_by_track", f"BENCH{uid}X1")
+            measure("get_track_photos", f"BENCH{uid}X0")
+            measure("get_user_id_by_code", codes[uid])
+            measure("get_photos_for_tracks", [f"BENCH{uid}X{n}" for n in range(tracks_per_user)])
+            measure("is_user_blocked", uid)
+            measure("get_user_id_by_cargo_code", f"BENCH{uid}-1")
+            measure("update_shipment_status", f"BENCH{uid}-1", "bench")
+    finally:
+        for uid in user_ids:
+            measure("delete_all_user_tracks", uid)
+            measure("delete_user_everything", uid)
+
+    report: dict = {}
+    for op, samples in timings.items():
+        samples.sort()
+        total = sum(samples)
+        report[op] = {
+            "calls": len(samples),
+            "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+            "ops_per_sec": round(len(samples) / total, 1) if total else 0.0,
+        }
+    return report
+
+
+def explain(engine: str = DB_ENGINE) -> bool:
+    # True, если хотя бы один горячий запрос читает таблицу целиком
+    storage = create_storage(engine)
+    storage.init_db()
+    plans = storage.explain_hot_queries()
+    return any(
+        "Seq Scan" in p or any(line.startswith("SCAN ") and "INDEX" not in line for line in p.splitlines())
+        for p in plans.values()
+    )
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd == "explain":
+        sys.exit(1 if explain(sys.argv[2] if len(sys.argv) > 2 else DB_ENGINE) else 0)
+    elif cmd == "bench":
+        engine = sys.argv[2] if len(sys.argv) > 2 else DB_ENGINE
+        users = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+        tracks_per_user = int(sys.argv[4]) if len(sys.argv) > 4 else 5
+        print(f"{'operation':<28} {'calls':>7} {'p50 ms':>9} {'p95 ms':>9} {'ops/s':>10}")
+        for op, row in bench(engine, users, tracks_per_user).items():
+            print(f"{op:<28} {row['calls']:>7} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['ops_per_sec']:>10}")
+    else:
+        sys.exit("Usage: python bench/storage_bench.py bench [engine] [users] [tracks_per_user]\n"
+                 "       python bench/storage_bench.py explain [engine]")
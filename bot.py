@@ -1,8 +1,11 @@
 import os
 import asyncio
+import functools
 import logging
 import re
-from typing import List, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional, Tuple
 
 from aiogram import Bot, Dispatcher, types
 from aiogram.types import (
@@ -18,43 +21,56 @@ from aiogram.contrib.fsm_storage.memory import MemoryStorage
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters.state import State, StatesGroup
 from aiogram.dispatcher.middlewares import BaseMiddleware
-from aiogram.dispatcher.handler import CancelHandler
-
-from database import (
+from aiogram.dispatcher.handler import CancelHandler, SkipHandler
+from aiogram.utils.exceptions import MessageNotModified
+
+from sender import get_sender
+from fsm_storage import DatabaseStorage
+from storage import DB_ENGINE, get_storage
+from tracks import extract_tracks, is_valid_track
+from webhook import BOT_MODE, WEBHOOK_SECRET, webhook_url
+from workers import BOT_WORKERS, broadcast, notify_owner, owns_chat
+from database_async import (
 	init_db,
 	get_user_code,
-	get_or_create_user_code,
 	get_tracks,
+	get_tracks_page,
 	add_track,
+	add_tracks_bulk,
 	add_track_photo,
 	get_track_photos,
 	find_user_ids_by_track,
 	delete_all_user_tracks,
     get_user_id_by_code,
-    get_recipient,
     set_recipient,
-    get_next_cargo_num,
     create_shipment,
     get_user_id_by_cargo_code,
     update_shipment_status,
-    list_user_shipments_by_status,
-    delete_all_user_shipments,
+    list_user_shipments_page,
     count_user_shipments,
+    delete_all_user_shipments,
+    get_profile_bundle,
 	# admin
 	is_user_blocked,
 	block_user,
 	unblock_user,
 	delete_user_everything,
 	# reminders/activity
-	record_user_activity,
-	mark_pressed_address,
-	mark_pressed_sendcargo,
+	flush_user_activity,
 	get_users_for_address_reminder,
 	get_users_for_sendcargo_reminder,
 	get_users_for_inactive_reminder,
 	mark_address_reminder_sent,
 	mark_sendcargo_reminder_sent,
 	mark_inactive_reminder_sent,
+	# /shipped media sessions
+	add_shipment_media,
+	get_shipment_media,
+	delete_shipment_media,
+	delete_expired_shipment_media,
+	# menu message registry
+	get_menu_message,
+	save_menu_message,
 )
 
 
@@ -88,6 +104,22 @@ def _resolve_webapp_url() -> str:
 WEBAPP_URL = _resolve_webapp_url()
 MANAGER_ID = int(os.getenv("MANAGER_ID", "7095008192") or 7095008192)
 WAREHOUSE_ID = int(os.getenv("WAREHOUSE_ID", "7095008192") or 7095008192)
+# Сколько треков/грузов на одной странице списка: весь список не помещается в сообщение (4096 символов)
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "20") or 20)
+# Сколько треков принимаем из одного сообщения или файла и максимальный размер файла со списком
+MAX_BULK_TRACKS = int(os.getenv("MAX_BULK_TRACKS", "100") or 100)
+# Номер процесса при запуске несколькими воркерами (workers.py); пусто — бот работает одним процессом.
+# Напоминания, настройка webhook и служебные сообщения — только в первом воркере.
+BOT_WORKER_INDEX = os.getenv("BOT_WORKER_INDEX", "").strip()
+IS_PRIMARY_WORKER = BOT_WORKER_INDEX in ("", "0")
+MAX_TRACKS_FILE_BYTES = int(os.getenv("MAX_TRACKS_FILE_BYTES", str(256 * 1024)) or 0)
+# Сессия /shipped: не больше MAX_SHIPMENT_PHOTOS фото, брошенная сессия живет SHIPMENT_MEDIA_TTL секунд.
+# Фото одного альбома ждем ALBUM_COLLECT_DELAY секунд после последнего и обрабатываем вместе.
+MAX_SHIPMENT_PHOTOS = int(os.getenv("MAX_SHIPMENT_PHOTOS", "50") or 50)
+SHIPMENT_MEDIA_TTL = int(os.getenv("SHIPMENT_MEDIA_TTL", str(24 * 3600)) or 0)
+ALBUM_COLLECT_DELAY = float(os.getenv("ALBUM_COLLECT_DELAY", "1") or 1)
+# Telegram принимает в send_media_group не больше 10 элементов
+MEDIA_GROUP_LIMIT = 10
 
 if not BOT_TOKEN:
 	raise RuntimeError("BOT_TOKEN is not set")
@@ -99,46 +131,254 @@ CHINA_WAREHOUSE_ADDRESS = (
 )
 
 bot = Bot(token=BOT_TOKEN)
-storage = MemoryStorage()
+# Состояния диалогов: db — в базе проекта (переживают перезапуск, общие для воркеров),
+# memory — в памяти процесса (по умолчанию при DB_ENGINE=memory)
+FSM_STORAGE = os.getenv("FSM_STORAGE", "").strip().lower() or ("memory" if DB_ENGINE == "memory" else "db")
+storage = MemoryStorage() if FSM_STORAGE == "memory" else DatabaseStorage()
 dp = Dispatcher(bot, storage=storage)
 
 
-# Держим одно «экранное» сообщение меню на чат и редактируем его вместо спама новыми сообщениями
-_menu_message_by_chat: dict[int, int] = {}
+async def _no_throttle() -> None:
+    pass
 
 
-async def _remove_reply_keyboard(chat_id: int) -> None:
+async def _remove_reply_keyboard(chat_id: int, throttle: Callable[[], Awaitable[None]] = _no_throttle) -> bool:
     """Send a transient message to remove any ReplyKeyboard and delete it."""
     try:
+        await throttle()
         tmp = await bot.send_message(chat_id, "\u2063", reply_markup=types.ReplyKeyboardRemove())
         try:
+            await throttle()
             await bot.delete_message(chat_id, tmp.message_id)
         except Exception:
             pass
     except Exception:
-        pass
+        return False
+    return True
+
+
+class MenuRegistry:
+    """Bounded LRU of chat -> (menu message_id, reply keyboard removed), persisted to the database.
+
+    Only chats owned by this worker process are kept in memory (see workers.owns_chat);
+    other chats are read from and written to the database, and their owner is told to reload.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        # chat_id -> [message_id, keyboard_removed]
+        self._entries: "OrderedDict[int, list]" = OrderedDict()
+        # Растет при каждом forget: прочитанное из базы до сброса в память уже не попадет
+        self._generation = 0
+
+    async def _load(self, chat_id: int) -> list:
+        try:
+            row = await get_menu_message(chat_id)
+        except Exception as e:
+            logger.exception("Failed to load menu message for chat %s: %s", chat_id, e)
+            row = None
+        return list(row) if row else [None, False]
+
+    async def get(self, chat_id: int) -> list:
+        if not owns_chat(chat_id):
+            return await self._load(chat_id)
+        entry = self._entries.get(chat_id)
+        if entry is not None:
+            self._entries.move_to_end(chat_id)
+            return entry
+        generation = self._generation
+        loaded = await self._load(chat_id)
+        # Пока шел запрос, запись могли обновить — она новее прочитанной
+        entry = self._entries.get(chat_id)
+        if entry is not None:
+            return entry
+        if generation != self._generation:
+            return loaded
+        return self._remember(chat_id, loaded)
+
+    def forget(self, chat_id: int) -> None:
+        # Запись чата изменил другой воркер — при следующем обращении читаем из базы
+        self._generation += 1
+        self._entries.pop(chat_id, None)
+
+    def _remember(self, chat_id: int, entry: list) -> list:
+        self._entries[chat_id] = entry
+        self._entries.move_to_end(chat_id)
+        while len(self._entries) > self._size:
+            # Вытесняем только из памяти — в базе запись остается
+            self._entries.popitem(last=False)
+        return entry
+
+    async def set(self, chat_id: int, message_id: Optional[int], keyboard_removed: bool) -> None:
+        owned = owns_chat(chat_id)
+        if owned:
+            self._remember(chat_id, [message_id, keyboard_removed])
+        try:
+            await save_menu_message(chat_id, message_id, keyboard_removed)
+        except Exception as e:
+            logger.exception("Failed to save menu message for chat %s: %s", chat_id, e)
+        if not owned:
+            notify_owner(chat_id, {"_control": "menu", "chat_id": chat_id})
+
+
+# Держим одно «экранное» сообщение меню на чат и редактируем его вместо спама новыми сообщениями.
+# id сообщения и отметка о снятой ReplyKeyboard переживают перезапуск (таблица menu_messages).
+menu_registry = MenuRegistry(int(os.getenv("MENU_CACHE_SIZE", "10000") or 10000))
+
+
+class ActivityBuffer:
+    """Collect activity timestamps in memory and write them with one upsert per flush."""
+
+    def __init__(self, interval: float):
+        self._interval = interval
+        # user_id -> [first_seen_at, last_activity_at, address_pressed_at, sendcargo_pressed_at]
+        self._pending: dict[int, list] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, user_id: int, address: bool = False, sendcargo: bool = False) -> None:
+        now = datetime.now(timezone.utc)
+        entry = self._pending.get(user_id)
+        if entry is None:
+            entry = [now, now, None, None]
+            self._pending[user_id] = entry
+        entry[1] = now
+        if address:
+            entry[2] = now
+        if sendcargo:
+            entry[3] = now
+
+    def _merge_back(self, pending: dict[int, list]) -> None:
+        # Запись не удалась — возвращаем отметки в буфер, не затирая более свежие
+        for user_id, old in pending.items():
+            cur = self._pending.get(user_id)
+            if cur is None:
+                self._pending[user_id] = old
+                continue
+            cur[0] = min(cur[0], old[0])
+            cur[2] = cur[2] or old[2]
+            cur[3] = cur[3] or old[3]
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            await flush_user_activity([(uid, *entry) for uid, entry in pending.items()])
+        except BaseException as e:
+            # Отмена (stop) посреди записи тоже возвращает отметки в буфер
+            self._merge_back(pending)
+            if not isinstance(e, Exception):
+                raise
+            logger.exception("Failed to flush user activity: %s", e)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+activity_buffer = ActivityBuffer(float(os.getenv("ACTIVITY_FLUSH_INTERVAL", "5") or 5))
+
+
+class AlbumCollector:
+    """Group album messages by media_group_id and hand each album to its handler once."""
+
+    def __init__(self, delay: float):
+        self._delay = delay
+        # media_group_id -> [messages, handler, last_message_at]
+        self._groups: dict[str, list] = {}
+        # chat_id -> задачи, в которых сейчас выполняется обработчик альбома этого чата
+        self._running: dict[int, set] = {}
+
+    def add(self, message: types.Message, handler: Callable[[List[types.Message]], Awaitable[None]]) -> None:
+        loop = asyncio.get_running_loop()
+        group = self._groups.get(message.media_group_id)
+        if group is not None:
+            group[0].append(message)
+            group[2] = loop.time()
+            return
+        self._groups[message.media_group_id] = [[message], handler, loop.time()]
+        loop.create_task(self._wait(message.media_group_id))
+
+    async def _wait(self, group_id: str) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            group = self._groups.get(group_id)
+            if group is None:
+                return
+            # Альбом приходит отдельными апдейтами — ждем, пока они перестанут поступать
+            left = group[2] + self._delay - loop.time()
+            if left <= 0:
+                break
+            await asyncio.sleep(left)
+        await self._process(group_id)
+
+    async def _process(self, group_id: str) -> None:
+        group = self._groups.pop(group_id, None)
+        if group is None:
+            return
+        messages, handler, _ = group
+        messages.sort(key=lambda m: m.message_id)
+        chat_id = messages[0].chat.id
+        task = asyncio.current_task()
+        self._running.setdefault(chat_id, set()).add(task)
+        try:
+            await handler(messages)
+        except Exception as e:
+            logger.exception("Failed to handle album %s: %s", group_id, e)
+        finally:
+            running = self._running.get(chat_id)
+            if running is not None:
+                running.discard(task)
+                if not running:
+                    del self._running[chat_id]
+
+    async def flush_chat(self, chat_id: int) -> None:
+        # Альбомы чата обрабатываем сразу, не дожидаясь задержки, и ждем уже запущенные обработчики
+        for group_id in [g for g, group in self._groups.items() if group[0][0].chat.id == chat_id]:
+            await self._process(group_id)
+        current = asyncio.current_task()
+        running = [t for t in self._running.get(chat_id, ()) if t is not current]
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    async def stop(self) -> None:
+        # Недособранные альбомы обрабатываем сразу, чтобы не потерять фото при остановке
+        for group_id in list(self._groups):
+            await self._process(group_id)
+
+
+album_collector = AlbumCollector(ALBUM_COLLECT_DELAY)
 
 
 class ActivityMiddleware(BaseMiddleware):
     async def on_pre_process_message(self, message: types.Message, data: dict):
-        try:
-            if message.from_user:
-                record_user_activity(int(message.from_user.id))
-        except Exception:
-            pass
+        if message.from_user:
+            activity_buffer.touch(int(message.from_user.id))
 
     async def on_pre_process_callback_query(self, callback_query: CallbackQuery, data: dict):
-        try:
-            if callback_query.from_user:
-                record_user_activity(int(callback_query.from_user.id))
-        except Exception:
-            pass
+        if callback_query.from_user:
+            activity_buffer.touch(int(callback_query.from_user.id))
 
 
 class BanMiddleware(BaseMiddleware):
     async def on_pre_process_message(self, message: types.Message, data: dict):
         try:
-            if message.from_user and is_user_blocked(int(message.from_user.id)):
+            if message.from_user and await is_user_blocked(int(message.from_user.id)):
                 raise CancelHandler()
         except CancelHandler:
             raise
@@ -147,7 +387,7 @@ class BanMiddleware(BaseMiddleware):
 
     async def on_pre_process_callback_query(self, callback_query: CallbackQuery, data: dict):
         try:
-            if callback_query.from_user and is_user_blocked(int(callback_query.from_user.id)):
+            if callback_query.from_user and await is_user_blocked(int(callback_query.from_user.id)):
                 raise CancelHandler()
         except CancelHandler:
             raise
@@ -155,12 +395,20 @@ class BanMiddleware(BaseMiddleware):
             pass
 
 
-async def show_menu_screen(chat_id: int, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None, parse_mode: Optional[str] = "HTML") -> None:
-	# Ensure any ReplyKeyboard is hidden before showing menus
-	await _remove_reply_keyboard(chat_id)
-	message_id = _menu_message_by_chat.get(chat_id)
+async def show_menu_screen(
+	chat_id: int,
+	text: str,
+	reply_markup: Optional[InlineKeyboardMarkup] = None,
+	parse_mode: Optional[str] = "HTML",
+	throttle: Callable[[], Awaitable[None]] = _no_throttle,
+) -> None:
+	# throttle вызывается перед каждым запросом к Bot API (в очереди рассылки — sender.throttle)
+	message_id, keyboard_removed = await menu_registry.get(chat_id)
+	# ReplyKeyboard бот больше не отправляет — старую клавиатуру снимаем один раз на чат
+	removed_now = not keyboard_removed and await _remove_reply_keyboard(chat_id, throttle)
 	if message_id:
 		try:
+			await throttle()
 			await bot.edit_message_text(
 				chat_id=chat_id,
 				message_id=message_id,
@@ -168,12 +416,19 @@ async def show_menu_screen(chat_id: int, text: str, reply_markup: Optional[Inlin
 				parse_mode=parse_mode,
 				reply_markup=reply_markup,
 			)
-			return
+		except MessageNotModified:
+			# Экран уже такой — новое сообщение не нужно
+			pass
 		except Exception:
 			# Если не удалось отредактировать (удалено/устарело) — пришлём новое и запомним id
-			pass
+			message_id = None
+		if message_id:
+			if removed_now:
+				await menu_registry.set(chat_id, message_id, True)
+			return
+	await throttle()
 	sent = await bot.send_message(chat_id, text, parse_mode=parse_mode, reply_markup=reply_markup)
-	_menu_message_by_chat[chat_id] = sent.message_id
+	await menu_registry.set(chat_id, sent.message_id, keyboard_removed or removed_now)
 
 
 class TrackStates(StatesGroup):
@@ -201,10 +456,6 @@ class AdminShipmentStates(StatesGroup):
 	waiting_for_media = State()
 
 
-# Буфер для медиа-альбомов администратора
-_admin_album_buffers: dict[str, list[dict]] = {}
-
-
 def get_main_menu_inline() -> InlineKeyboardMarkup:
 	kb = InlineKeyboardMarkup(row_width=2)
 	kb.add(
@@ -318,6 +569,16 @@ def cargo_status_menu_keyboard() -> InlineKeyboardMarkup:
 	return kb
 
 
+def page_nav_buttons(kind: str, page: dict, offset: int) -> List[InlineKeyboardButton]:
+	# «Назад/вперёд» по страницам: в callback_data курсор страницы и номер её первой строки
+	buttons: List[InlineKeyboardButton] = []
+	if page["prev_cursor"] is not None:
+		buttons.append(InlineKeyboardButton("◀️", callback_data=f"page:{kind}:p:{page['prev_cursor']}:{max(0, offset - LIST_PAGE_SIZE)}"))
+	if page["next_cursor"] is not None:
+		buttons.append(InlineKeyboardButton("▶️", callback_data=f"page:{kind}:n:{page['next_cursor']}:{offset + len(page['items'])}"))
+	return buttons
+
+
 def parse_recipient_input(text: Optional[str]) -> Optional[Tuple[str, str, str]]:
 	if not text:
 		return None
@@ -333,23 +594,16 @@ def parse_recipient_input(text: Optional[str]) -> Optional[Tuple[str, str, str]]
 	return fio, phone, city
 
 
-def format_tracks(tracks: List[Tuple[str, Optional[str]]]) -> str:
+def format_tracks(tracks: List[Tuple[str, Optional[str]]], start: int = 1) -> str:
 	if not tracks:
 		return "Нет зарегистрированных трек-кодов"
 	lines: List[str] = []
-	for idx, (track, delivery) in enumerate(tracks, start=1):
+	for idx, (track, delivery) in enumerate(tracks, start=start):
 		suffix = f" ({delivery})" if delivery else ""
 		lines.append(f"{idx}. <code>{track}</code>{suffix}")
 	return "\n".join(lines)
 
 
-def is_valid_track_number(text: str) -> bool:
-	t = (text or "").strip().upper()
-	if len(t) < 8 or len(t) > 40:
-		return False
-	return all("A" <= c <= "Z" or "0" <= c <= "9" for c in t)
-
-
 def extract_track_from_text(text: Optional[str]) -> Optional[str]:
 	if not text:
 		return None
@@ -358,10 +612,31 @@ def extract_track_from_text(text: Optional[str]) -> Optional[str]:
 	match = re.search(r"[A-Z0-9]{8,40}", text_upper)
 	if match:
 		candidate = match.group(0)
-		return candidate if is_valid_track_number(candidate) else None
+		return candidate if is_valid_track(candidate) else None
 	return None
 
 
+def decode_tracks_file(raw: bytes) -> str:
+	# Excel сохраняет «текст Юникод» в UTF-16, остальное — UTF-8 (с BOM или без) либо cp1251
+	if raw.startswith((b"\xff\xfe", b"\xfe\xff")):
+		return raw.decode("utf-16", errors="replace")
+	try:
+		return raw.decode("utf-8-sig")
+	except UnicodeDecodeError:
+		return raw.decode("cp1251", errors="replace")
+
+
+def format_bulk_report(added: List[str], duplicates: List[str], skipped: int = 0) -> str:
+	parts = [f"✅ Зарегистрировано трек-кодов: {len(added)}"]
+	if added:
+		parts[0] += "\n" + "\n".join(f"• <code>{t}</code>" for t in added)
+	if duplicates:
+		parts.append(f"↩️ Уже были зарегистрированы: {len(duplicates)}\n" + "\n".join(f"• <code>{t}</code>" for t in duplicates))
+	if skipped:
+		parts.append(f"⚠️ За один раз принимается не больше {MAX_BULK_TRACKS} треков. Не обработано: {skipped} — пришлите их отдельным сообщением.")
+	return "\n\n".join(parts)
+
+
 def extract_cargo_code(text: Optional[str]) -> Optional[str]:
 	if not text:
 		return None
@@ -379,7 +654,7 @@ def extract_cargo_code(text: Optional[str]) -> Optional[str]:
 
 
 async def require_code_or_hint(message: types.Message) -> Optional[str]:
-	code = get_user_code(message.from_user.id)
+	code = await get_user_code(message.from_user.id)
 	if not code:
 		await show_menu_screen(message.chat.id, "Сначала получите личный код: нажмите «🔑 Получить код».", reply_markup=get_main_menu_inline())
 		return None
@@ -412,11 +687,10 @@ async def menu_getcod(cb_or_msg, state: FSMContext):
 		user_id = cb_or_msg.from_user.id
 		user = cb_or_msg.from_user
 
-	code = get_user_code(user_id)
-	just_created = False
-	if not code:
-		code = get_or_create_user_code(user_id)
-		just_created = True
+	# Код создается в том же запросе, что и чтение профиля
+	bundle = await get_profile_bundle(user_id, create_code=True)
+	code = bundle["code"]
+	just_created = bundle["code_created"]
 
 	await show_menu_screen(tgt.chat.id, f"🔑 Ваш личный код клиента: <code>{code}</code>", reply_markup=get_main_menu_inline())
 
@@ -425,17 +699,9 @@ async def menu_getcod(cb_or_msg, state: FSMContext):
 		try:
 			full_name = user.full_name or ""
 			username = f"@{user.username}" if user.username else "не указан"
-			tracks = get_tracks(user_id)
-			# Deduplicate while preserving order
-			seen = set()
-			unique_track_lines: List[str] = []
-			for t, _ in tracks:
-				if t in seen:
-					continue
-				seen.add(t)
-				unique_track_lines.append(f"{len(seen)}. <code>{t}</code>")
-
-			recipient = get_recipient(user_id)
+			track_lines = [f"{idx}. <code>{t}</code>" for idx, (t, _) in enumerate(bundle["tracks"], start=1)]
+
+			recipient = bundle["recipient"]
 			recipient_block = ""
 			if recipient:
 				recipient_block = (
@@ -451,15 +717,16 @@ async def menu_getcod(cb_or_msg, state: FSMContext):
 				f"📱 Username: {username}\n"
 				f"🆔 Telegram ID: <code>{user_id}</code>\n"
 				f"{recipient_block}\n"
-				"📚 Треки клиента:\n" + ("\n".join(unique_track_lines) if unique_track_lines else "Нет зарегистрированных трек-кодов")
+				"📚 Треки клиента:\n" + ("\n".join(track_lines) if track_lines else "Нет зарегистрированных трек-кодов")
 			)
 
 			admin_ids = {i for i in [MANAGER_ID, WAREHOUSE_ID] if i}
-			for admin_id in admin_ids:
-				try:
-					await bot.send_message(admin_id, text, parse_mode="HTML")
-				except Exception as e:
-					logger.exception("Failed to notify admin %s about new code: %s", admin_id, e)
+			report = await get_sender().deliver_many(
+				(admin_id, functools.partial(bot.send_message, admin_id, text, parse_mode="HTML"))
+				for admin_id in admin_ids
+			)
+			for admin_id, error in report.failed.items():
+				logger.error("Failed to notify admin %s about new code: %s", admin_id, error)
 		except Exception as e:
 			logger.exception("Failed to build/send new user code notification: %s", e)
 
@@ -476,16 +743,13 @@ async def menu_address(cb_or_msg, state: FSMContext):
 		tgt = cb_or_msg
 		user_id = cb_or_msg.from_user.id
 
-	code = get_user_code(user_id)
+	code = await get_user_code(user_id)
 	if not code:
 		await show_menu_screen(tgt.chat.id, "Сначала получите личный код: нажмите «🔑 Получить код».", reply_markup=get_main_menu_inline())
 		return
 
 	await show_menu_screen(tgt.chat.id, CHINA_WAREHOUSE_ADDRESS.format(client_code=code), reply_markup=get_main_menu_inline(), parse_mode="HTML")
-	try:
-		mark_pressed_address(int(user_id))
-	except Exception:
-		pass
+	activity_buffer.touch(int(user_id), address=True)
 
 
 @dp.callback_query_handler(lambda c: c.data == "menu_mytracks", state="*")
@@ -500,15 +764,80 @@ async def menu_mytracks(cb_or_msg, state: FSMContext):
 		tgt = cb_or_msg
 		user_id = cb_or_msg.from_user.id
 
-	code = get_user_code(user_id)
+	code = await get_user_code(user_id)
 	if not code:
 		await show_menu_screen(tgt.chat.id, "Сначала получите личный код: нажмите «🔑 Получить код».", reply_markup=get_main_menu_inline())
 		return
 
-	tracks = get_tracks(user_id)
-	text = f"🔑 Ваш код клиента: <code>{code}</code>\n\n" + ("📦 Ваши трек-коды:\n\n" + format_tracks(tracks) if tracks else "Пока нет зарегистрированных трек-кодов")
-	kb = clear_history_with_back_keyboard() if tracks else back_keyboard()
-	await show_menu_screen(tgt.chat.id, text, reply_markup=kb, parse_mode="HTML")
+	text, kb, parse_mode = await render_list_screen("mytracks", user_id, code)
+	await show_menu_screen(tgt.chat.id, text, reply_markup=kb, parse_mode=parse_mode)
+
+
+async def render_list_screen(kind: str, user_id: int, code: str, cursor: Optional[int] = None, backward: bool = False, offset: int = 0):
+	# Экран со списком читает из базы и показывает только одну страницу.
+	# kind: mytracks / sendtrack — треки, building / shipped — грузы со статусом.
+	if kind in ("building", "shipped"):
+		status_value = "на сборке" if kind == "building" else "отгружен"
+		try:
+			page, total = await asyncio.gather(
+				list_user_shipments_page(user_id, status_value, cursor=cursor, backward=backward, limit=LIST_PAGE_SIZE),
+				count_user_shipments(user_id, status_value),
+			)
+			if not page["items"] and cursor is not None:
+				page, offset = await list_user_shipments_page(user_id, status_value, limit=LIST_PAGE_SIZE), 0
+		except Exception:
+			page, total = {"items": [], "next_cursor": None, "prev_cursor": None}, 0
+		title = "🧰 На сборке" if kind == "building" else "✅ Отгруженные"
+		text = _format_cargo_list(title, [c for (_, c) in page["items"]], start=offset + 1, total=total)
+		kb = cargo_status_menu_keyboard()
+		parse_mode: Optional[str] = "HTML"
+	else:
+		page = await get_tracks_page(user_id, cursor=cursor, backward=backward, limit=LIST_PAGE_SIZE)
+		if not page["items"] and cursor is not None:
+			# Страница исчезла (история очищена) — показываем первую
+			page, offset = await get_tracks_page(user_id, limit=LIST_PAGE_SIZE), 0
+		tracks = [(t, d) for (_, t, d) in page["items"]]
+		if kind == "mytracks":
+			text = f"🔑 Ваш код клиента: <code>{code}</code>\n\n" + ("📦 Ваши трек-коды:\n\n" + format_tracks(tracks, start=offset + 1) if tracks else "Пока нет зарегистрированных трек-кодов")
+			kb = clear_history_with_back_keyboard() if tracks else back_keyboard()
+			parse_mode = "HTML"
+		else:
+			text_parts = []
+			if tracks:
+				text_parts.append("📦 Ваша история зарегистрированных трек-кодов:\n\n" + format_tracks(tracks, start=offset + 1))
+			text_parts.append("📝 Отправьте трек-код или список трек-кодов (сообщением или файлом .txt/.csv). Для отмены — /cancel")
+			text = "\n\n".join(text_parts)
+			kb = clear_history_entry_keyboard() if tracks else None
+			parse_mode = "HTML" if tracks else None
+	nav = page_nav_buttons(kind, page, offset)
+	if nav and kb is not None:
+		kb.inline_keyboard.insert(0, nav)
+	return text, kb, parse_mode
+
+
+@dp.callback_query_handler(lambda c: (c.data or "").startswith("page:"), state="*")
+async def list_page(callback: CallbackQuery, state: FSMContext):
+	await bot.answer_callback_query(callback.id)
+	try:
+		_, kind, direction, cursor, offset = callback.data.split(":")
+		cursor_id, first = int(cursor), int(offset)
+	except ValueError:
+		return
+	if kind not in ("mytracks", "sendtrack", "building", "shipped"):
+		return
+	user_id = callback.from_user.id
+	code = await get_user_code(user_id)
+	if not code:
+		await state.finish()
+		await show_menu_screen(callback.message.chat.id, "Сначала получите личный код: нажмите «🔑 Получить код».", reply_markup=get_main_menu_inline())
+		return
+	# Листание «Отправить трек» оставляет бота в ожидании трек-кода, остальные экраны — без состояния
+	if kind == "sendtrack":
+		await TrackStates.waiting_for_track.set()
+	else:
+		await state.finish()
+	text, kb, parse_mode = await render_list_screen(kind, user_id, code, cursor_id, direction == "p", first)
+	await show_menu_screen(callback.message.chat.id, text, reply_markup=kb, parse_mode=parse_mode)
 
 
 @dp.callback_query_handler(lambda c: c.data == "menu_manager", state="*")
@@ -523,7 +852,7 @@ async def menu_manager(cb_or_msg, state: FSMContext):
 		tgt = cb_or_msg
 		user = cb_or_msg.from_user
 
-	code = get_user_code(user.id)
+	code = await get_user_code(user.id)
 	if not code:
 		await show_menu_screen(tgt.chat.id, "Сначала получите личный код: нажмите «🔑 Получить код».", reply_markup=get_main_menu_inline())
 		return
@@ -557,7 +886,7 @@ async def menu_buy(cb_or_msg, state: FSMContext):
 		tgt = cb_or_msg
 		user_id = cb_or_msg.from_user.id
 
-	code = get_user_code(user_id)
+	code = await get_user_code(user_id)
 	if not code:
 		await show_menu_screen(tgt.chat.id, "Сначала получите личный код: нажмите «🔑 Получить код».", reply_markup=get_main_menu_inline())
 		return
@@ -614,18 +943,13 @@ async def menu_sendtrack(cb_or_msg, state: FSMContext):
 		tgt = cb_or_msg
 		user_id = cb_or_msg.from_user.id
 
-	code = get_user_code(user_id)
+	code = await get_user_code(user_id)
 	if not code:
 		await show_menu_screen(tgt.chat.id, "Сначала получите личный код: нажмите «🔑 Получить код».", reply_markup=get_main_menu_inline())
 		return
 
-	tracks = get_tracks(user_id)
-	text_parts = []
-	if tracks:
-		text_parts.append("📦 Ваша история зарегистрированных трек-кодов:\n\n" + format_tracks(tracks))
-	text_parts.append("📝 Отправьте трек-код одним сообщением. Для отмены — /cancel")
-	text = "\n\n".join(text_parts)
-	await show_menu_screen(tgt.chat.id, text, reply_markup=(clear_history_entry_keyboard() if tracks else None), parse_mode=("HTML" if tracks else None))
+	text, kb, parse_mode = await render_list_screen("sendtrack", user_id, code)
+	await show_menu_screen(tgt.chat.id, text, reply_markup=kb, parse_mode=parse_mode)
 	await TrackStates.waiting_for_track.set()
 
 
@@ -634,21 +958,19 @@ async def menu_sendcargo(callback: CallbackQuery, state: FSMContext):
 	await bot.answer_callback_query(callback.id)
 	await state.finish()
 	user_id = callback.from_user.id
-	code = get_user_code(user_id)
+	bundle = await get_profile_bundle(user_id)
+	code = bundle["code"]
 	if not code:
 		await show_menu_screen(callback.message.chat.id, "Сначала получите личный код: нажмите «🔑 Получить код».", reply_markup=get_main_menu_inline())
 		return
 
-	try:
-		mark_pressed_sendcargo(int(user_id))
-	except Exception:
-		pass
+	activity_buffer.touch(int(user_id), sendcargo=True)
 
 	# Проверим, есть ли сохраненные данные получателя
-	saved = get_recipient(user_id)
+	saved = bundle["recipient"]
 	if saved and all(saved.get(k) for k in ("fio", "phone", "city")):
 		fio, phone, city = saved["fio"], saved["phone"], saved["city"]
-		tracks = get_tracks(user_id)
+		tracks = bundle["tracks"]
 		text = (
 			"📤 Заявка на отправку груза\n\n"
 			f"🆔 Код клиента: <code>{code}</code>\n"
@@ -685,7 +1007,7 @@ async def handle_recipient_input(message: types.Message, state: FSMContext):
 		return
 	fio, phone, city = parsed
 	await state.update_data(fio=fio, phone=phone, city=city)
-	tracks = get_tracks(message.from_user.id)
+	tracks = await get_tracks(message.from_user.id)
 	text = (
 		"📤 Заявка на отправку груза\n\n"
 		f"🆔 Код клиента: <code>{code}</code>\n"
@@ -710,13 +1032,14 @@ async def clear_history_entry(cb_or_msg, state: FSMContext):
 		tgt = cb_or_msg
 		user_id = cb_or_msg.from_user.id
 
-	code = get_user_code(user_id)
+	bundle = await get_profile_bundle(user_id)
+	code = bundle["code"]
 	if not code:
 		await show_menu_screen(tgt.chat.id, "Сначала получите личный код: нажмите «🔑 Получить код».", reply_markup=get_main_menu_inline())
 		return
 
-	tracks = get_tracks(user_id)
-	shipments_total = count_user_shipments(user_id)
+	tracks = bundle["tracks"]
+	shipments_total = bundle["shipments_total"]
 	if not tracks and shipments_total == 0:
 		await show_menu_screen(tgt.chat.id, "ℹ️ История пуста. Очищать нечего.", reply_markup=get_main_menu_inline())
 		return
@@ -734,15 +1057,15 @@ async def clear_history_confirm(callback: CallbackQuery, state: FSMContext):
 		return
 
 	user_id = callback.from_user.id
-	code = get_user_code(user_id)
+	code = await get_user_code(user_id)
 	if not code:
 		await state.finish()
 		await callback.message.edit_text("Сначала получите личный код: нажмите «🔑 Получить код».")
 		await show_menu_screen(callback.message.chat.id, "Выберите действие:", reply_markup=get_main_menu_inline())
 		return
 
-	deleted_tracks = delete_all_user_tracks(user_id)
-	deleted_shipments = delete_all_user_shipments(user_id)
+	deleted_tracks = await delete_all_user_tracks(user_id)
+	deleted_shipments = await delete_all_user_shipments(user_id)
 	await state.finish()
 	await callback.message.edit_text(f"✅ История очищена. Удалено треков: {deleted_tracks}, грузов: {deleted_shipments}.")
 	await show_menu_screen(callback.message.chat.id, "Выберите действие:", reply_markup=get_main_menu_inline())
@@ -755,14 +1078,19 @@ async def handle_track_input(message: types.Message, state: FSMContext):
 		await state.finish()
 		return
 
+	tracks = extract_tracks(message.text)
+	if len(tracks) > 1:
+		await register_tracks_bulk(message, state, tracks)
+		return
+
 	track = (message.text or "").strip().upper()
-	if not is_valid_track_number(track):
+	if not is_valid_track(track):
 		await message.answer("⚠️ Неверный формат трек-кода. Пришлите другой или /cancel")
 		return
 
 	# Сохраняем трек без выбора доставки. Доставку уточним при оформлении груза.
 	try:
-		add_track(message.from_user.id, track, "")
+		await add_track(message.from_user.id, track, "")
 	except Exception as e:
 		logger.exception("Failed to save track: %s", e)
 		await message.answer("❌ Ошибка сохранения трека. Попробуйте позже.")
@@ -776,6 +1104,50 @@ async def handle_track_input(message: types.Message, state: FSMContext):
 	await show_menu_screen(message.chat.id, "Выберите действие:", reply_markup=get_main_menu_inline())
 
 
+@dp.message_handler(state=TrackStates.waiting_for_track, content_types=[ContentType.DOCUMENT])
+async def handle_tracks_file(message: types.Message, state: FSMContext):
+	code = await require_code_or_hint(message)
+	if not code:
+		await state.finish()
+		return
+
+	doc = message.document
+	name = (doc.file_name or "").lower()
+	if not (name.endswith((".txt", ".csv")) or (doc.mime_type or "").startswith("text/")):
+		await message.answer("⚠️ Пришлите список трек-кодов файлом .txt или .csv. Или /cancel")
+		return
+	if MAX_TRACKS_FILE_BYTES and (doc.file_size or 0) > MAX_TRACKS_FILE_BYTES:
+		await message.answer(f"⚠️ Файл слишком большой (максимум {MAX_TRACKS_FILE_BYTES // 1024} КБ). Или /cancel")
+		return
+	try:
+		content = await bot.download_file_by_id(doc.file_id)
+	except Exception as e:
+		logger.exception("Failed to download tracks file: %s", e)
+		await message.answer("❌ Не удалось получить файл. Попробуйте позже.")
+		return
+
+	tracks = extract_tracks(decode_tracks_file(content.getvalue()))
+	if not tracks:
+		await message.answer("⚠️ В файле не найдено трек-кодов. Пришлите другой файл или /cancel")
+		return
+	await register_tracks_bulk(message, state, tracks)
+
+
+async def register_tracks_bulk(message: types.Message, state: FSMContext, tracks: List[str]) -> None:
+	# Список треков регистрируется сразу, без выбора доставки и подтверждения по каждому треку:
+	# одна транзакция, уже существующие у пользователя треки пропускаются
+	skipped = max(0, len(tracks) - MAX_BULK_TRACKS)
+	try:
+		added, duplicates = await add_tracks_bulk(message.from_user.id, tracks[:MAX_BULK_TRACKS], "")
+	except Exception as e:
+		logger.exception("Failed to save tracks: %s", e)
+		await message.answer("❌ Ошибка сохранения треков. Попробуйте позже.")
+		return
+	await state.finish()
+	await message.answer(format_bulk_report(added, duplicates, skipped), parse_mode="HTML")
+	await show_menu_screen(message.chat.id, "Выберите действие:", reply_markup=get_main_menu_inline())
+
+
 @dp.callback_query_handler(lambda c: c.data.startswith("delivery_"), state=TrackStates.choosing_delivery)
 async def choose_delivery(callback: CallbackQuery, state: FSMContext):
 	await bot.answer_callback_query(callback.id)
@@ -812,7 +1184,7 @@ async def confirm_track(callback: CallbackQuery, state: FSMContext):
 		return
 
 	user_id = callback.from_user.id
-	code = get_user_code(user_id)
+	code = await get_user_code(user_id)
 	if not code:
 		await state.finish()
 		await callback.message.edit_text("Сначала получите личный код: нажмите «🔑 Получить код».")
@@ -823,7 +1195,7 @@ async def confirm_track(callback: CallbackQuery, state: FSMContext):
 	track = data["track"]
 	# Регистрируем трек без выбора способа доставки; отправка на склад будет при оформлении груза
 	try:
-		add_track(user_id, track, "")
+		await add_track(user_id, track, "")
 	except Exception as e:
 		logger.exception("Failed to save track: %s", e)
 		await state.finish()
@@ -851,12 +1223,13 @@ async def menu_photokontrol(cb_or_msg, state: FSMContext):
 		tgt = cb_or_msg
 		user_id = cb_or_msg.from_user.id
 
-	code = get_user_code(user_id)
+	bundle = await get_profile_bundle(user_id)
+	code = bundle["code"]
 	if not code:
 		await show_menu_screen(tgt.chat.id, "Сначала получите личный код: нажмите «🔑 Получить код».", reply_markup=get_main_menu_inline())
 		return
 
-	user_tracks = get_tracks(user_id)
+	user_tracks = bundle["tracks"]
 	text_parts = []
 	if user_tracks:
 		text_parts.append("📦 Ваши треки:\n\n" + format_tracks(user_tracks))
@@ -877,11 +1250,11 @@ async def handle_photo_request(message: types.Message, state: FSMContext):
 		return
 
 	track = (message.text or "").strip().upper()
-	if not is_valid_track_number(track):
+	if not is_valid_track(track):
 		await message.answer("⚠️ Неверный формат трек-кода. Пришлите другой или /cancel")
 		return
 
-	photos = get_track_photos(track)
+	photos = await get_track_photos(track)
 	if not photos:
 		await state.finish()
 		await show_menu_screen(message.chat.id, f"📭 Фото по треку <code>{track}</code> пока не загружены.", reply_markup=get_main_menu_inline(), parse_mode="HTML")
@@ -901,7 +1274,7 @@ async def handle_photo_request(message: types.Message, state: FSMContext):
 	await state.finish()
 	await show_menu_screen(message.chat.id, "✅ Все доступные фото отправлены.", reply_markup=get_main_menu_inline())
 	# Предложим возможность очистить историю
-	user_tracks = get_tracks(message.from_user.id)
+	user_tracks = await get_tracks(message.from_user.id)
 	if user_tracks:
 		await show_menu_screen(message.chat.id, "Нужно очистить историю треков?", reply_markup=clear_history_entry_keyboard())
 
@@ -920,7 +1293,8 @@ async def confirm_cargo(callback: CallbackQuery, state: FSMContext):
         return
 
     user_id = callback.from_user.id
-    code = get_user_code(user_id)
+    bundle = await get_profile_bundle(user_id)
+    code = bundle["code"]
     if not code:
         await state.finish()
         await callback.message.edit_text("Сначала получите личный код: нажмите «🔑 Получить код».")
@@ -931,14 +1305,14 @@ async def confirm_cargo(callback: CallbackQuery, state: FSMContext):
     fio, phone, city = data.get("fio", ""), data.get("phone", ""), data.get("city", "")
     delivery_key = data.get("delivery")
     delivery_name = DELIVERY_TYPES.get(delivery_key, {}).get("name", "Не указано") if delivery_key else "Не указано"
-    set_recipient(user_id, fio, phone, city)
+    await set_recipient(user_id, fio, phone, city)
 
-    tracks = get_tracks(user_id)
-    cargo_num = get_next_cargo_num(user_id)
+    tracks = bundle["tracks"]
+    cargo_num = bundle["next_cargo_num"]
     cargo_code = f"{code}-{cargo_num}"
     try:
         # Статус по умолчанию: на сборке
-        create_shipment(user_id, cargo_num, cargo_code, fio, phone, city, status="на сборке")
+        await create_shipment(user_id, cargo_num, cargo_code, fio, phone, city, status="на сборке")
     except Exception as e:
         logger.exception("Failed to create shipment: %s", e)
         await state.finish()
@@ -948,14 +1322,8 @@ async def confirm_cargo(callback: CallbackQuery, state: FSMContext):
 
     full_name = callback.from_user.full_name or ""
     username = f"@{callback.from_user.username}" if callback.from_user.username else "не указан"
-    # Список треков без дубликатов
-    seen = set()
-    unique_track_lines = []
-    for idx, (t, _d) in enumerate([(t, d) for (t, d) in tracks], start=1):
-        if t in seen:
-            continue
-        seen.add(t)
-        unique_track_lines.append(f"{len(seen)}. <code>{t}</code>")
+    # Треки уникальны на уровне базы (user_id, track)
+    track_lines = [f"{idx}. <code>{t}</code>" for idx, (t, _d) in enumerate(tracks, start=1)]
 
     text = (
         "📦 <b>ЗАЯВКА НА ОТПРАВКУ ГРУЗА</b>\n\n"
@@ -968,7 +1336,7 @@ async def confirm_cargo(callback: CallbackQuery, state: FSMContext):
         f"📞 Телефон: {phone}\n"
         f"🏙️ Город доставки: {city}\n"
         f"🚚 Способ доставки: {delivery_name}\n\n"
-        "📚 Треки клиента:\n" + ("\n".join(unique_track_lines) if unique_track_lines else "Нет зарегистрированных трек-кодов")
+        "📚 Треки клиента:\n" + ("\n".join(track_lines) if track_lines else "Нет зарегистрированных трек-кодов")
     )
     if WAREHOUSE_ID:
         try:
@@ -999,18 +1367,10 @@ async def choose_cargo_delivery(callback: CallbackQuery, state: FSMContext):
 
     data = await state.get_data()
     user_id = callback.from_user.id
-    code = get_user_code(user_id) or "—"
+    bundle = await get_profile_bundle(user_id)
+    code = bundle["code"] or "—"
     fio, phone, city = data.get("fio", ""), data.get("phone", ""), data.get("city", "")
-    tracks = get_tracks(user_id)
-
-    # Список треков без дубликатов
-    seen = set()
-    unique_track_lines = []
-    for (t, _d) in tracks:
-        if t in seen:
-            continue
-        seen.add(t)
-        unique_track_lines.append(f"{len(seen)}. <code>{t}</code>")
+    track_lines = [f"{idx}. <code>{t}</code>" for idx, (t, _d) in enumerate(bundle["tracks"], start=1)]
 
     text = (
         "📤 Заявка на отправку груза\n\n"
@@ -1019,7 +1379,7 @@ async def choose_cargo_delivery(callback: CallbackQuery, state: FSMContext):
         f"📞 Телефон: {phone}\n"
         f"🏙️ Город доставки: {city}\n"
         f"🚚 Способ доставки: {delivery_name}\n\n"
-        "📚 Зарегистрированные треки:\n" + ("\n".join(unique_track_lines) if unique_track_lines else "Нет зарегистрированных трек-кодов") + "\n\n"
+        "📚 Зарегистрированные треки:\n" + ("\n".join(track_lines) if track_lines else "Нет зарегистрированных трек-кодов") + "\n\n"
         "Подтвердить отправку?"
     )
     await CargoStates.confirming.set()
@@ -1047,11 +1407,12 @@ async def menu_status(callback: CallbackQuery, state: FSMContext):
     await show_menu_screen(callback.message.chat.id, "📦 Статус груза:", reply_markup=cargo_status_menu_keyboard())
 
 
-def _format_cargo_list(title: str, items: list[str]) -> str:
+def _format_cargo_list(title: str, items: list[str], start: int = 1, total: Optional[int] = None) -> str:
     if not items:
         return f"{title}: пусто"
-    lines = [f"{idx}. <code>{code}</code>" for idx, code in enumerate(items, start=1)]
-    return f"{title} (всего: {len(items)}):\n" + "\n".join(lines)
+    lines = [f"{idx}. <code>{code}</code>" for idx, code in enumerate(items, start=start)]
+    # total — всего грузов со статусом, а не на текущей странице
+    return f"{title} (всего: {total if total is not None else len(items)}):\n" + "\n".join(lines)
 
 
 @dp.callback_query_handler(lambda c: c.data in ("status_building", "status_shipped"), state="*")
@@ -1059,18 +1420,13 @@ async def menu_status_list(callback: CallbackQuery, state: FSMContext):
     await bot.answer_callback_query(callback.id)
     await state.finish()
     user_id = callback.from_user.id
-    code = get_user_code(user_id)
+    code = await get_user_code(user_id)
     if not code:
         await show_menu_screen(callback.message.chat.id, "Сначала получите личный код: нажмите «🔑 Получить код».", reply_markup=get_main_menu_inline())
         return
-    status_value = "на сборке" if callback.data == "status_building" else "отгружен"
-    try:
-        cargo_codes = list_user_shipments_by_status(user_id, status_value)
-    except Exception:
-        cargo_codes = []
-    title = "🧰 На сборке" if callback.data == "status_building" else "✅ Отгруженные"
-    text = _format_cargo_list(title, cargo_codes)
-    await show_menu_screen(callback.message.chat.id, text, reply_markup=cargo_status_menu_keyboard(), parse_mode="HTML")
+    kind = "building" if callback.data == "status_building" else "shipped"
+    text, kb, parse_mode = await render_list_screen(kind, user_id, code)
+    await show_menu_screen(callback.message.chat.id, text, reply_markup=kb, parse_mode=parse_mode)
 @dp.message_handler(lambda m: (getattr(m, "caption", "") or "").strip().lower().startswith("/shipped"), content_types=[ContentType.PHOTO], state="*")
 async def admin_shipped_with_photo(message: types.Message, state: FSMContext):
 	# Если администратор отправляет фото с подписью вида "/shipped EM.." в одном сообщении
@@ -1082,13 +1438,13 @@ async def admin_shipped_with_photo(message: types.Message, state: FSMContext):
 	if not cargo_code:
 		await message.answer("Укажите номер груза в подписи, например: /shipped EM03-0001-1")
 		return
-	user_id = get_user_id_by_cargo_code(cargo_code)
+	user_id = await get_user_id_by_cargo_code(cargo_code)
 	if not user_id:
 		await message.answer(f"Груз с номером <code>{cargo_code}</code> не найден.", parse_mode="HTML")
 		return
 	# Обновляем статус: отгружен
 	try:
-		update_shipment_status(cargo_code, "отгружен")
+		await update_shipment_status(cargo_code, "отгружен")
 	except Exception:
 		pass
 	try:
@@ -1123,7 +1479,8 @@ async def warehouse_photo_upload(message: types.Message, state: FSMContext):
 		AdminShipmentStates.waiting_for_media.state,
 		AdminShipmentStates.waiting_for_cargo_code.state,
 	}:
-		return
+		# В aiogram 2 обработка останавливается на первом подходящем хендлере — передаем фото дальше
+		raise SkipHandler()
 
 	# Пытаемся извлечь трек из подписи к фото или из реплая
 	track = extract_track_from_text(message.caption)
@@ -1141,29 +1498,38 @@ async def warehouse_photo_upload(message: types.Message, state: FSMContext):
 	file_id = message.photo[-1].file_id
 
 	try:
-		add_track_photo(track, file_id, uploaded_by=message.from_user.id, caption=message.caption)
+		await add_track_photo(track, file_id, uploaded_by=message.from_user.id, caption=message.caption)
 	except Exception as e:
 		logger.exception("Failed to save track photo: %s", e)
 		await message.answer("❌ Ошибка сохранения фото. Попробуйте позже.")
 		return
 
 	# Ищем пользователей, у кого зарегистрирован этот трек
-	user_ids = find_user_ids_by_track(track)
-	sent_count = 0
+	user_ids = await find_user_ids_by_track(track)
+	sender = get_sender()
+	photo_jobs = []
 	for uid in set(user_ids):
-		try:
-			await bot.send_photo(
-				uid,
-				file_id,
-				caption=f"📷 Фото по треку: <code>{track}</code>",
-				parse_mode="HTML",
-				reply_markup=back_keyboard(),
-			)
-			# После отправки фото — показываем главное меню
-			await show_menu_screen(uid, "Выберите действие:", reply_markup=get_main_menu_inline())
-			sent_count += 1
-		except Exception as e:
-			logger.exception("Failed to deliver track photo to user %s: %s", uid, e)
+		photo_jobs.append((uid, functools.partial(
+			bot.send_photo,
+			uid,
+			file_id,
+			caption=f"📷 Фото по треку: <code>{track}</code>",
+			parse_mode="HTML",
+			reply_markup=back_keyboard(),
+		)))
+	report = await sender.deliver_many(photo_jobs)
+	for uid, error in report.failed.items():
+		logger.error("Failed to deliver track photo to user %s: %s", uid, error)
+	# Главное меню — только тем, кому дошло фото. Экран меню — несколько вызовов Bot API,
+	# поэтому задача берет токен общего лимита на каждый вызов, а не один на всю задачу.
+	sender.submit_many(
+		[
+			(uid, functools.partial(show_menu_screen, uid, "Выберите действие:", reply_markup=get_main_menu_inline(), throttle=sender.throttle))
+			for uid in report.sent
+		],
+		metered=True,
+	)
+	sent_count = report.sent_count
 
 	if sent_count > 0:
 		await message.answer(f"✅ Фото сохранено и отправлено {sent_count} клиенту(ам).")
@@ -1184,10 +1550,16 @@ async def admin_shipped_start(message: types.Message, state: FSMContext):
 	if not cargo_code:
 		await message.answer("Укажите номер груза, например: /shipped EM03-0001-1")
 		return
-	user_id = get_user_id_by_cargo_code(cargo_code)
+	user_id = await get_user_id_by_cargo_code(cargo_code)
 	if not user_id:
 		await message.answer(f"Груз с номером <code>{cargo_code}</code> не найден.", parse_mode="HTML")
 		return
+	# Начинаем сессию с чистого листа и заодно чистим брошенные сессии
+	try:
+		await delete_expired_shipment_media(SHIPMENT_MEDIA_TTL)
+		await delete_shipment_media(message.from_user.id, cargo_code)
+	except Exception as e:
+		logger.exception("Failed to reset shipment media session: %s", e)
 	await state.update_data(cargo_code=cargo_code, target_user_id=user_id)
 	await AdminShipmentStates.waiting_for_media.set()
 	await message.answer(
@@ -1197,6 +1569,8 @@ async def admin_shipped_start(message: types.Message, state: FSMContext):
 
 @dp.message_handler(lambda m: m.text and m.text.lower() in {"готово", "done", "/done"}, state=AdminShipmentStates.waiting_for_media)
 async def admin_shipped_finish(message: types.Message, state: FSMContext):
+	# Альбом, присланный прямо перед /done, еще ждет в сборщике — сохраняем его до чтения сессии
+	await album_collector.flush_chat(message.chat.id)
 	data = await state.get_data()
 	user_id = data.get("target_user_id")
 	cargo_code = data.get("cargo_code")
@@ -1204,34 +1578,50 @@ async def admin_shipped_finish(message: types.Message, state: FSMContext):
 		await state.finish()
 		await message.answer("Сессия сброшена. Повторите /shipped.")
 		return
-	buffer_key = f"{message.from_user.id}:{cargo_code}"
-	media_items = _admin_album_buffers.get(buffer_key, [])
-	if not media_items:
+	try:
+		file_ids = await get_shipment_media(message.from_user.id, cargo_code, SHIPMENT_MEDIA_TTL)
+	except Exception as e:
+		logger.exception("Failed to load shipment media: %s", e)
+		await message.answer("❌ Ошибка чтения фото. Попробуйте еще раз.")
+		return
+	if not file_ids:
 		await state.finish()
 		await message.answer("Нет прикрепленных фото. Отправьте хотя бы одно фото перед завершением.")
 		return
 
-	# Сформируем медиа группу (первые 10 по ограничению Telegram)
-	group: list[InputMediaPhoto] = []
-	for idx, item in enumerate(media_items[:10]):
-		caption = (f"📦 Отправка груза <b>{cargo_code}</b>" if idx == 0 else None)
-		group.append(InputMediaPhoto(media=item["file_id"], caption=caption, parse_mode="HTML"))
+	caption = f"📦 Отправка груза <b>{cargo_code}</b>"
+	jobs = []
+	if len(file_ids) == 1:
+		jobs.append((user_id, functools.partial(
+			bot.send_photo,
+			user_id,
+			file_ids[0],
+			caption=caption,
+			parse_mode="HTML",
+			reply_markup=back_keyboard(),
+		)))
+	else:
+		# Все фото пачками по 10 (ограничение Telegram); подпись — у первого фото
+		for start in range(0, len(file_ids), MEDIA_GROUP_LIMIT):
+			chunk = file_ids[start:start + MEDIA_GROUP_LIMIT]
+			chunk_caption = caption if start == 0 else None
+			if len(chunk) == 1:
+				# Группа из одного элемента Telegram не принимает
+				jobs.append((user_id, functools.partial(bot.send_photo, user_id, chunk[0], caption=chunk_caption, parse_mode="HTML")))
+				continue
+			group = [
+				InputMediaPhoto(media=file_id, caption=(chunk_caption if idx == 0 else None), parse_mode="HTML")
+				for idx, file_id in enumerate(chunk)
+			]
+			jobs.append((user_id, functools.partial(bot.send_media_group, user_id, group)))
 
 	try:
-		if len(group) == 1:
-			await bot.send_photo(
-				user_id,
-				group[0].media,
-				caption=group[0].caption,
-				parse_mode="HTML",
-				reply_markup=back_keyboard(),
-			)
-			# После отправки фото — показываем главное меню
-			await show_menu_screen(user_id, "Выберите действие:", reply_markup=get_main_menu_inline())
-		else:
-			await bot.send_media_group(user_id, group)
-			# После отправки медиа-группы — показываем главное меню
-			await show_menu_screen(user_id, "Выберите действие:", reply_markup=get_main_menu_inline())
+		# Очередь чата сохраняет порядок: пачки уходят одна за другой
+		report = await get_sender().deliver_many(jobs)
+		if report.failed:
+			raise next(iter(report.failed.values()))
+		# После отправки фото — показываем главное меню
+		await show_menu_screen(user_id, "Выберите действие:", reply_markup=get_main_menu_inline())
 		await bot.send_message(user_id, f"✅ Ваш груз <b>{cargo_code}</b> отправлен. Фото во вложении.", parse_mode="HTML")
 		await message.answer("✅ Уведомление клиенту отправлено")
 	except Exception as e:
@@ -1240,25 +1630,52 @@ async def admin_shipped_finish(message: types.Message, state: FSMContext):
 
 	# Обновляем статус отправки: отгружен
 	try:
-		update_shipment_status(cargo_code, "отгружен")
+		await update_shipment_status(cargo_code, "отгружен")
 	except Exception:
 		pass
 
-	# Очистим буфер и состояние
-	_admin_album_buffers.pop(buffer_key, None)
+	# Очистим сессию и состояние
+	try:
+		await delete_shipment_media(message.from_user.id, cargo_code)
+	except Exception:
+		pass
 	await state.finish()
 
 
+async def _save_shipment_photos(messages: List[types.Message], state: FSMContext, cargo_code: str) -> None:
+	data = await state.get_data()
+	if data.get("cargo_code") != cargo_code:
+		# Пока собирался альбом, сессию завершили или начали новую
+		return
+	file_ids = [m.photo[-1].file_id for m in messages]
+	# Лимит проверяет база: число фото в сессии знает только она (альбомы и одиночные фото параллельны)
+	accepted, total = await add_shipment_media(messages[0].from_user.id, cargo_code, file_ids, MAX_SHIPMENT_PHOTOS)
+	if accepted == 1:
+		text = f"Фото добавлено. Всего: {total}."
+	elif accepted:
+		text = f"Добавлено фото: {accepted}. Всего: {total}."
+	else:
+		text = f"Фото не добавлено. Всего: {total}."
+	if accepted < len(file_ids):
+		text += f"\n⚠️ Лимит — {MAX_SHIPMENT_PHOTOS} фото на груз, лишние фото не сохранены."
+	await messages[-1].answer(text + " Отправьте еще или напишите 'готово'.")
+
+
 @dp.message_handler(content_types=[ContentType.PHOTO], state=AdminShipmentStates.waiting_for_media)
 async def admin_shipped_collect_media(message: types.Message, state: FSMContext):
 	data = await state.get_data()
 	cargo_code = data.get("cargo_code")
 	if not cargo_code:
 		return
-	buffer_key = f"{message.from_user.id}:{cargo_code}"
-	items = _admin_album_buffers.setdefault(buffer_key, [])
-	items.append({"file_id": message.photo[-1].file_id})
-	await message.answer("Фото добавлено. Отправьте еще или напишите 'готово'.")
+	if message.media_group_id:
+		# Альбом — одна пачка и один ответ на все фото
+		album_collector.add(message, functools.partial(_save_shipment_photos, state=state, cargo_code=cargo_code))
+		return
+	try:
+		await _save_shipment_photos([message], state, cargo_code)
+	except Exception as e:
+		logger.exception("Failed to save shipment photo: %s", e)
+		await message.answer("❌ Ошибка сохранения фото. Попробуйте еще раз.")
 
 @dp.message_handler(commands=["findtracks"], state="*")
 async def admin_findtracks(message: types.Message, state: FSMContext):
@@ -1271,7 +1688,7 @@ async def admin_findtracks(message: types.Message, state: FSMContext):
 		await message.answer("Использование: /findtracks EM03-0001")
 		return
 	code = args.upper()
-	user_id = get_user_id_by_code(code)
+	user_id = await get_user_id_by_code(code)
 	if not user_id:
 		await message.answer(f"Пользователь с кодом <code>{code}</code> не найден.", parse_mode="HTML")
 		return
@@ -1288,7 +1705,7 @@ async def admin_findtracks(message: types.Message, state: FSMContext):
 	except Exception:
 		pass
 
-	tracks = get_tracks(user_id)
+	tracks = await get_tracks(user_id)
 	user_block = (
 		"🧑‍💼 Данные клиента\n\n"
 		f"🆔 Код клиента: <code>{code}</code>\n"
@@ -1310,7 +1727,7 @@ async def admin_findtracks(message: types.Message, state: FSMContext):
 	await message.answer(text, parse_mode="HTML")
 
 
-def _resolve_user_id_from_arg(arg: str) -> Optional[int]:
+async def _resolve_user_id_from_arg(arg: str) -> Optional[int]:
     a = (arg or "").strip()
     if not a:
         return None
@@ -1324,7 +1741,7 @@ def _resolve_user_id_from_arg(arg: str) -> Optional[int]:
     a_up = a.upper()
     if a_up.startswith("EM"):
         try:
-            uid = get_user_id_by_code(a_up)
+            uid = await get_user_id_by_code(a_up)
             return int(uid) if uid is not None else None
         except Exception:
             return None
@@ -1335,6 +1752,20 @@ def _is_admin(user_id: int) -> bool:
     return user_id in {MANAGER_ID, WAREHOUSE_ID}
 
 
+def _user_changed_everywhere(user_id: int) -> None:
+    # Бан и удаление меняют данные чужого пользователя: кэши остальных воркеров сбрасываем
+    broadcast({"_control": "user", "user_id": int(user_id)})
+
+
+async def process_worker_control(message: dict) -> None:
+    # Служебные сообщения от других воркеров (workers.notify_owner / workers.broadcast)
+    kind = message.get("_control")
+    if kind == "menu":
+        menu_registry.forget(int(message["chat_id"]))
+    elif kind == "user":
+        get_storage().invalidate_user(int(message["user_id"]))
+
+
 @dp.message_handler(commands=["ban"], state="*")
 async def admin_ban(message: types.Message, state: FSMContext):
     await state.finish()
@@ -1347,12 +1778,13 @@ async def admin_ban(message: types.Message, state: FSMContext):
     parts = args.split(maxsplit=1)
     target_raw = parts[0]
     reason = parts[1] if len(parts) > 1 else None
-    uid = _resolve_user_id_from_arg(target_raw)
+    uid = await _resolve_user_id_from_arg(target_raw)
     if not uid:
         await message.answer("Пользователь не найден по указанному идентификатору")
         return
     try:
-        block_user(int(uid), reason)
+        await block_user(int(uid), reason)
+        _user_changed_everywhere(uid)
         await message.answer(f"Пользователь <code>{uid}</code> заблокирован.", parse_mode="HTML")
     except Exception as e:
         await message.answer(f"Ошибка блокировки: {e}")
@@ -1367,12 +1799,13 @@ async def admin_unban(message: types.Message, state: FSMContext):
     if not args:
         await message.answer("Использование: /unban <telegram_id|EM03-xxxx>")
         return
-    uid = _resolve_user_id_from_arg(args)
+    uid = await _resolve_user_id_from_arg(args)
     if not uid:
         await message.answer("Пользователь не найден по указанному идентификатору")
         return
     try:
-        unblock_user(int(uid))
+        await unblock_user(int(uid))
+        _user_changed_everywhere(uid)
         await message.answer(f"Пользователь <code>{uid}</code> разблокирован.", parse_mode="HTML")
     except Exception as e:
         await message.answer(f"Ошибка разблокировки: {e}")
@@ -1387,12 +1820,13 @@ async def admin_wipe(message: types.Message, state: FSMContext):
     if not args:
         await message.answer("Использование: /wipe <telegram_id|EM03-xxxx>")
         return
-    uid = _resolve_user_id_from_arg(args)
+    uid = await _resolve_user_id_from_arg(args)
     if not uid:
         await message.answer("Пользователь не найден по указанному идентификатору")
         return
     try:
-        result = delete_user_everything(int(uid))
+        result = await delete_user_everything(int(uid))
+        _user_changed_everywhere(uid)
         await message.answer(
             (
                 "Удаление завершено.\n"
@@ -1412,7 +1846,7 @@ async def fallback(message: types.Message):
 
 
 async def on_startup(dp: Dispatcher):
-	init_db()
+	await init_db()
 	try:
 		# Order matters: ban first, then activity
 		dp.middleware.setup(BanMiddleware())
@@ -1424,36 +1858,52 @@ async def on_startup(dp: Dispatcher):
 	async def reminder_loop():
 		while True:
 			try:
-				# 5-day: address
-				for uid in get_users_for_address_reminder(days=5):
-					try:
-						await bot.send_message(int(uid), "Возникли сложности ? Свяжись с менеджером, мы все подскажем!")
-						mark_address_reminder_sent(int(uid))
-					except Exception:
-						pass
-				# 15-day: send cargo
-				for uid in get_users_for_sendcargo_reminder(days=15):
-					try:
-						await bot.send_message(int(uid), "Вы уже сделали свои покупки ? Мы готовы их Вам отправить!")
-						mark_sendcargo_reminder_sent(int(uid))
-					except Exception:
-						pass
-				# 30-day: inactivity
-				for uid in get_users_for_inactive_reminder(days=30):
-					try:
-						await bot.send_message(int(uid), "Совершайте свои покупки из Китая вместе с ProBuy!")
-						mark_inactive_reminder_sent(int(uid))
-					except Exception:
-						pass
+				# Сначала сбрасываем буфер активности, чтобы не напомнить тем, кто только что нажал кнопку
+				await activity_buffer.flush()
+				reminders = [
+					# 5-day: address
+					(get_users_for_address_reminder, 5, "Возникли сложности ? Свяжись с менеджером, мы все подскажем!", mark_address_reminder_sent),
+					# 15-day: send cargo
+					(get_users_for_sendcargo_reminder, 15, "Вы уже сделали свои покупки ? Мы готовы их Вам отправить!", mark_sendcargo_reminder_sent),
+					# 30-day: inactivity
+					(get_users_for_inactive_reminder, 30, "Совершайте свои покупки из Китая вместе с ProBuy!", mark_inactive_reminder_sent),
+				]
+				for get_users, days, text, mark_sent in reminders:
+					user_ids = await get_users(days=days)
+					report = await get_sender().deliver_many(
+						(int(uid), functools.partial(bot.send_message, int(uid), text))
+						for uid in user_ids
+					)
+					# Отмечаем только доставленные — недоставленным напомним в следующий раз
+					for uid in report.sent:
+						try:
+							await mark_sent(uid)
+						except Exception:
+							pass
 			except Exception:
 				pass
 			await asyncio.sleep(3600)
 
+	activity_buffer.start()
+	if not IS_PRIMARY_WORKER:
+		return
 	asyncio.get_running_loop().create_task(reminder_loop())
-	try:
-		await bot.delete_webhook(drop_pending_updates=True)
-	except Exception:
-		pass
+	if BOT_MODE == "webhook":
+		# Апдейты принимает api.py (POST /tg/webhook/<secret>), см. webhook.py
+		url = webhook_url()
+		if not url:
+			logger.error("BOT_MODE=webhook, but WEBHOOK_URL/WEBAPP_URL is not set: webhook not registered")
+		else:
+			try:
+				await bot.set_webhook(url, secret_token=WEBHOOK_SECRET)
+			except Exception as e:
+				logger.exception("Failed to set webhook: %s", e)
+	elif not BOT_WORKER_INDEX:
+		# С воркерами webhook снимает родительский процесс, который читает getUpdates
+		try:
+			await bot.delete_webhook(drop_pending_updates=True)
+		except Exception:
+			pass
 	try:
 		# Чистим системное меню команд
 		from aiogram.types import (
@@ -1486,7 +1936,23 @@ async def on_startup(dp: Dispatcher):
 		pass
 
 
+async def process_webhook_update(data: dict) -> None:
+	# Апдейт из webhook-очереди api.py; контекст Bot/Dispatcher нужен хендлерам (message.answer и т.п.)
+	Bot.set_current(bot)
+	Dispatcher.set_current(dp)
+	await dp.process_update(types.Update.to_object(data))
+
+
 async def on_shutdown(dp: Dispatcher):
+	await activity_buffer.stop()
+	# Недособранные альбомы /shipped сохраняем до закрытия хранилища состояний
+	await album_collector.stop()
+	# Незаписанные состояния диалогов сохраняем до выхода
+	await dp.storage.close()
+	await dp.storage.wait_closed()
+	await get_sender().close()
+	if not IS_PRIMARY_WORKER:
+		return
 	try:
 		if MANAGER_ID:
 			await bot.send_message(MANAGER_ID, "🔴 Бот остановлен")
@@ -1495,4 +1961,8 @@ async def on_shutdown(dp: Dispatcher):
 
 
 if __name__ == "__main__":
+	if BOT_MODE == "webhook":
+		raise SystemExit("BOT_MODE=webhook: бот работает внутри uvicorn api:app, отдельный процесс не нужен")
+	if BOT_WORKERS > 1:
+		raise SystemExit(f"BOT_WORKERS={BOT_WORKERS}: запускайте python workers.py run")
 	executor.start_polling(dp, skip_updates=False, on_startup=on_startup, on_shutdown=on_shutdown)
@@ -0,0 +1,43 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+
+from storage import OPERATIONS, get_storage
+
+# Асинхронные версии функций database.py с теми же именами.
+# psycopg2 и sqlite3 отпускают GIL на время ожидания, поэтому запросы выполняются в пуле потоков
+# и не блокируют event loop бота/API. Хранилище в памяти (inline backend) вызываем напрямую.
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        # По умолчанию потоков столько же, сколько соединений в пуле
+        workers = int(os.getenv("DB_THREADS") or os.getenv("DB_POOL_MAX") or 10)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+    return _executor
+
+
+def _wrap(op: str) -> Callable[..., Awaitable[Any]]:
+    # Метод хранилища берём в момент вызова: set_storage() действует и на async-обёртки
+    async def wrapper(*args, **kwargs):
+        storage = get_storage()
+        fn = getattr(storage, op)
+        if storage.inline:
+            return fn(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+    wrapper.__name__ = wrapper.__qualname__ = op
+    return wrapper
+
+
+# Корутины генерируются из storage.OPERATIONS, как и функции database.py
+for _op in OPERATIONS:
+    globals()[_op] = _wrap(_op)
+del _op
+
+__all__ = list(OPERATIONS)
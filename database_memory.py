@@ -0,0 +1,634 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from storage import keyset_page
+
+# Простой режим для разработки: все данные в памяти (исчезают при перезапуске)
+# Записи хранятся в индексах по ключам запросов, поэтому выборки не просматривают все данные.
+# Списки в индексах заполняются в порядке вставки — это порядок ORDER BY id в Postgres.
+
+class _TrackRow:
+    __slots__ = ("id", "user_id", "track", "delivery")
+
+    def __init__(self, id: int, user_id: int, track: str, delivery: Optional[str]):
+        self.id = id
+        self.user_id = user_id
+        self.track = track
+        self.delivery = delivery
+
+
+class _PhotoRow:
+    __slots__ = ("track", "file_id", "uploaded_by", "caption")
+
+    def __init__(self, track: str, file_id: str, uploaded_by: Optional[int], caption: Optional[str]):
+        self.track = track
+        self.file_id = file_id
+        self.uploaded_by = uploaded_by
+        self.caption = caption
+
+
+class _ShipmentRow:
+    __slots__ = ("id", "user_id", "cargo_num", "cargo_code", "fio", "phone", "city", "status", "status_updated_at")
+
+    def __init__(self, id: int, user_id: int, cargo_num: int, cargo_code: str, fio: str, phone: str, city: str,
+                 status: Optional[str], status_updated_at: Optional[str]):
+        self.id = id
+        self.user_id = user_id
+        self.cargo_num = cargo_num
+        self.cargo_code = cargo_code
+        self.fio = fio
+        self.phone = phone
+        self.city = city
+        self.status = status
+        self.status_updated_at = status_updated_at
+
+
+_users: dict[int, str] = {}
+_user_by_code: dict[str, int] = {}
+# Коды, которые после миграции init_db оказались у нескольких пользователей
+_shared_codes: set[str] = set()
+# Дополнительные метаданные пользователей для DEV режима
+_user_meta: dict[int, dict] = {}
+_all_user_ids: set[int] = set()
+_tracks_by_user: dict[int, list[_TrackRow]] = {}
+# трек -> {user_id: строка трека}; пара (user_id, трек) уникальна, как в Postgres
+_track_users: dict[str, dict[int, _TrackRow]] = {}
+_photos_by_track: dict[str, list[_PhotoRow]] = {}
+_next_track_id: int = 1
+_recipients: dict[int, dict] = {}
+_shipments_by_user: dict[int, list[_ShipmentRow]] = {}
+_shipments_by_code: dict[str, list[_ShipmentRow]] = {}
+_next_shipment_id: int = 1
+_blocked_users: set[int] = set()
+# Последний выданный номер кода EM03-xxxx (засевается в init_db)
+_last_code_num: int = 0
+_code_lock = threading.Lock()
+
+
+def init_db() -> None:
+    # Миграция кодов в новый формат EM03-xxxx
+    global _users, _last_code_num
+    if not _users:
+        return
+    migrated: dict[int, str] = {}
+    for uid, code in list(_users.items()):
+        if not code:
+            continue
+        if code.startswith("EM03-"):
+            # Нормализуем EM03-цифры к минимуму 4 цифры с сохранением числового значения
+            try:
+                num_part = code.split("-", 1)[1]
+                if num_part.isdigit():
+                    migrated[uid] = f"EM03-{int(num_part):04d}"
+                    continue
+            except Exception:
+                pass
+            migrated[uid] = code
+            continue
+        # PBxxxxx -> EM03-xxxx (мин. 4 цифры)
+        if code.startswith("PB") and len(code) >= 7 and code[2:].isdigit():
+            migrated[uid] = f"EM03-{int(code[2:]):04d}"
+            continue
+        # Попробуем извлечь числовую часть и нормализовать
+        digits = "".join(ch for ch in code if ch.isdigit())
+        if digits:
+            migrated[uid] = f"EM03-{int(digits):04d}"
+        else:
+            migrated[uid] = code
+    if migrated:
+        _users.clear()
+        _users.update(migrated)
+        _user_by_code.clear()
+        _shared_codes.clear()
+        for uid, code in _users.items():
+            if _user_by_code.setdefault(code, uid) != uid:
+                _shared_codes.add(code)
+    with _code_lock:
+        _last_code_num = max(_last_code_num, _max_code_num())
+
+
+def _ensure_user_row(user_id: int) -> None:
+    # В DEV режиме просто регистрируем пользователя в наборе
+    _all_user_ids.add(int(user_id))
+
+
+def _ensure_meta(user_id: int) -> dict:
+    _ensure_user_row(user_id)
+    meta = _user_meta.get(int(user_id))
+    if not meta:
+        meta = {
+            "first_seen_at": None,
+            "last_activity_at": None,
+            "last_address_pressed_at": None,
+            "last_sendcargo_pressed_at": None,
+            "last_address_reminder_at": None,
+            "last_sendcargo_reminder_at": None,
+            "last_inactive_reminder_at": None,
+        }
+        _user_meta[int(user_id)] = meta
+    return meta
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _max_code_num() -> int:
+    max_num = 0
+    for code in _users.values():
+        try:
+            if code and code.startswith("EM03-"):
+                num = int(code.split("-", 1)[1])
+                if num > max_num:
+                    max_num = num
+        except Exception:
+            continue
+    return max_num
+
+
+def _generate_next_code() -> str:
+    # Счетчик вместо перебора всех кодов: O(1) на каждого нового клиента. Вызывается под _code_lock.
+    global _last_code_num
+    _last_code_num += 1
+    return f"EM03-{_last_code_num:04d}"
+
+
+def get_user_code(user_id: int) -> Optional[str]:
+    return _users.get(user_id)
+
+
+def get_or_create_user_code(user_id: int) -> str:
+    code = _users.get(user_id)
+    if code:
+        return code
+    # Проверка и запись под одной блокировкой: два первых вызова для одного пользователя
+    # не должны выдать ему два кода
+    with _code_lock:
+        code = _users.get(user_id)
+        if code:
+            return code
+        code = _generate_next_code()
+        _users[user_id] = code
+        _user_by_code.setdefault(code, user_id)
+    _ensure_user_row(user_id)
+    return code
+
+
+def add_track(user_id: int, track: str, delivery: str = "") -> None:
+    # Повторная регистрация трека не создает строку, а обновляет способ доставки, если он указан
+    global _next_track_id
+    users = _track_users.setdefault(track, {})
+    row = users.get(user_id)
+    if row is not None:
+        if delivery:
+            row.delivery = delivery
+        return
+    row = _TrackRow(_next_track_id, user_id, track, delivery)
+    _next_track_id += 1
+    _tracks_by_user.setdefault(user_id, []).append(row)
+    users[user_id] = row
+
+
+def get_tracks(user_id: int) -> List[Tuple[str, Optional[str]]]:
+    return [(t.track, t.delivery) for t in _tracks_by_user.get(user_id, ())]
+
+
+def _rows_page(rows: list, cursor: Optional[int], backward: bool, limit: int) -> list:
+    # rows упорядочены по id — границу страницы находим двоичным поиском
+    lo, hi = 0, len(rows)
+    if cursor is not None:
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if rows[mid].id < cursor or (not backward and rows[mid].id == cursor):
+                lo = mid + 1
+            else:
+                hi = mid
+    else:
+        lo = len(rows) if backward else 0
+    if backward:
+        return rows[max(0, lo - limit - 1):lo][::-1]
+    return rows[lo:lo + limit + 1]
+
+
+def get_tracks_page(user_id: int, cursor: Optional[int] = None, backward: bool = False, limit: int = 20) -> dict:
+    # Страница треков по ключу id: {"items": [(id, track, delivery)], "next_cursor", "prev_cursor"}
+    rows = _rows_page(_tracks_by_user.get(user_id, []), cursor, backward, limit)
+    return keyset_page([(t.id, t.track, t.delivery) for t in rows], limit, cursor, backward)
+
+
+def add_track_photo(track: str, file_id: str, uploaded_by: Optional[int] = None, caption: Optional[str] = None) -> None:
+    _photos_by_track.setdefault(track, []).append(_PhotoRow(track, file_id, uploaded_by, caption))
+
+
+def get_track_photos(track: str) -> List[str]:
+    return [p.file_id for p in _photos_by_track.get(track, ())]
+
+
+def get_photos_for_tracks(tracks: List[str]) -> dict:
+    # Фото сразу для нескольких треков: {трек: [file_id, ...]}
+    return {t: get_track_photos(t) for t in tracks}
+
+
+def find_user_ids_by_track(track: str) -> List[int]:
+    return sorted(_track_users.get(track, ()))
+
+
+def delete_all_user_tracks(user_id: int) -> int:
+    rows = _tracks_by_user.pop(user_id, [])
+    for t in rows:
+        users = _track_users.get(t.track)
+        if users is None:
+            continue
+        users.pop(user_id, None)
+        if not users:
+            del _track_users[t.track]
+    return len(rows)
+
+
+def get_user_id_by_code(code: str) -> Optional[int]:
+    if not code:
+        return None
+    return _user_by_code.get(code)
+
+
+def get_recipient(user_id: int) -> Optional[dict]:
+    data = _recipients.get(user_id)
+    if not data:
+        return None
+    # return shallow copy to avoid accidental external mutation
+    return {"fio": data.get("fio", "").strip(), "phone": data.get("phone", "").strip(), "city": data.get("city", "").strip()}
+
+
+def set_recipient(user_id: int, fio: str, phone: str, city: str) -> None:
+    _recipients[user_id] = {"fio": fio.strip(), "phone": phone.strip(), "city": city.strip()}
+
+
+def get_next_cargo_num(user_id: int) -> int:
+    return max((s.cargo_num for s in _shipments_by_user.get(user_id, ())), default=0) + 1
+
+
+def create_shipment(user_id: int, cargo_num: int, cargo_code: str, fio: str, phone: str, city: str, status: Optional[str] = None) -> int:
+    global _next_shipment_id
+    shipment = _ShipmentRow(
+        _next_shipment_id,
+        int(user_id),
+        int(cargo_num),
+        cargo_code,
+        fio.strip(),
+        phone.strip(),
+        city.strip(),
+        status or None,
+        datetime.now(timezone.utc).isoformat() if status else None,
+    )
+    _shipments_by_user.setdefault(shipment.user_id, []).append(shipment)
+    _shipments_by_code.setdefault(cargo_code, []).append(shipment)
+    _next_shipment_id += 1
+    return shipment.id
+
+
+def get_user_id_by_cargo_code(cargo_code: str) -> Optional[int]:
+    rows = _shipments_by_code.get(cargo_code)
+    return rows[0].user_id if rows else None
+
+
+def update_shipment_status(cargo_code: str, status: str) -> None:
+    rows = _shipments_by_code.get(cargo_code)
+    if rows:
+        rows[0].status = status
+        rows[0].status_updated_at = datetime.now(timezone.utc).isoformat()
+
+
+def list_user_shipments_by_status(user_id: int, status: str) -> List[str]:
+    return [str(s.cargo_code) for s in _shipments_by_user.get(int(user_id), ()) if (s.status or "") == status]
+
+
+def list_user_shipments_page(user_id: int, status: str, cursor: Optional[int] = None, backward: bool = False, limit: int = 20) -> dict:
+    # Страница грузов со статусом: {"items": [(id, cargo_code)], "next_cursor", "prev_cursor"}
+    same_status = [s for s in _shipments_by_user.get(int(user_id), ()) if (s.status or "") == status]
+    rows = _rows_page(same_status, cursor, backward, limit)
+    return keyset_page([(s.id, str(s.cargo_code)) for s in rows], limit, cursor, backward)
+
+
+def delete_all_user_shipments(user_id: int) -> int:
+    rows = _shipments_by_user.pop(int(user_id), [])
+    for s in rows:
+        same_code = _shipments_by_code.get(s.cargo_code)
+        if same_code is None:
+            continue
+        same_code.remove(s)
+        if not same_code:
+            del _shipments_by_code[s.cargo_code]
+    return len(rows)
+
+
+def count_user_shipments(user_id: int, status: Optional[str] = None) -> int:
+    rows = _shipments_by_user.get(int(user_id), ())
+    if status is None:
+        return len(rows)
+    return sum(1 for s in rows if (s.status or "") == status)
+
+
+def get_profile_bundle(user_id: int, create_code: bool = False, photo_counts: bool = False) -> dict:
+    # Все данные профиля одним вызовом (в Postgres — одним запросом)
+    blocked = is_user_blocked(user_id)
+    code = get_user_code(user_id)
+    code_created = not code and create_code and not blocked
+    if code_created:
+        code = get_or_create_user_code(user_id)
+    counts: dict[str, int] = {}
+    for s in _shipments_by_user.get(int(user_id), ()):
+        status = s.status or ""
+        counts[status] = counts.get(status, 0) + 1
+    tracks = get_tracks(user_id)
+    bundle = {
+        "code": code,
+        "code_created": bool(code_created),
+        "blocked": blocked,
+        "tracks": tracks,
+        "recipient": get_recipient(user_id),
+        "shipments": counts,
+        "shipments_total": sum(counts.values()),
+        "next_cargo_num": get_next_cargo_num(user_id),
+    }
+    if photo_counts:
+        photos = get_photos_for_tracks([t for (t, _) in tracks])
+        bundle["photo_counts"] = {t: len(ids) for t, ids in photos.items()}
+    return bundle
+
+
+def add_track_and_get_tracks(user_id: int, track: str, delivery: str = "") -> List[Tuple[str, Optional[str]]]:
+    add_track(user_id, track, delivery)
+    return get_tracks(user_id)
+
+
+def add_tracks_bulk(user_id: int, tracks: List[str], delivery: str = "") -> Tuple[List[str], List[str]]:
+    # Пакетная регистрация: (добавленные, уже бывшие у пользователя); повторы во входном списке схлопываются
+    added: List[str] = []
+    duplicates: List[str] = []
+    for track in dict.fromkeys(tracks):
+        (duplicates if user_id in _track_users.get(track, ()) else added).append(track)
+        add_track(user_id, track, delivery)
+    return added, duplicates
+
+
+# --- Admin / moderation (DEV mode) ---
+def explain_hot_queries(verbose: bool = True) -> dict:
+    # В DEV режиме планов запросов нет
+    return {}
+
+
+def pool_stats() -> dict:
+    # В DEV режиме пула соединений нет
+    return {}
+
+
+def blocklist_cache_stats() -> dict:
+    # В DEV режиме баны и так хранятся в памяти — кэш не подключается (см. storage.CachedStorage)
+    return {"enabled": False}
+
+
+def profile_cache_stats() -> dict:
+    # В DEV режиме данные и так в памяти
+    return {"enabled": False}
+
+
+def is_user_blocked(user_id: int) -> bool:
+    return int(user_id) in _blocked_users
+
+
+def list_blocked_user_ids() -> List[int]:
+    return list(_blocked_users)
+
+
+def block_user(user_id: int, reason: Optional[str] = None) -> None:
+    _blocked_users.add(int(user_id))
+
+
+def unblock_user(user_id: int) -> None:
+    _blocked_users.discard(int(user_id))
+
+
+def delete_user_everything(user_id: int) -> dict:
+    # Collect user's tracks to also remove photos
+    user_id_int = int(user_id)
+    user_tracks = {t[0] for t in get_tracks(user_id_int)}
+    # Delete track photos for user's tracks
+    deleted_photos = sum(len(_photos_by_track.pop(t, ())) for t in user_tracks)
+
+    # Delete tracks
+    deleted_tracks = delete_all_user_tracks(user_id_int)
+
+    # Delete shipments
+    deleted_shipments = delete_all_user_shipments(user_id_int)
+
+    # Delete recipient
+    had_recipient = 1 if _recipients.pop(user_id_int, None) else 0
+
+    # Delete user code and meta
+    code = _users.pop(user_id_int, None)
+    had_code = 1 if code else 0
+    if code and _user_by_code.get(code) == user_id_int:
+        del _user_by_code[code]
+    if code in _shared_codes:
+        # Тот же код у другого пользователя (старые данные) — искать владельца приходится перебором
+        owners = [uid for uid, c in _users.items() if c == code]
+        if owners:
+            _user_by_code.setdefault(code, owners[0])
+        if len(owners) < 2:
+            _shared_codes.discard(code)
+    _user_meta.pop(user_id_int, None)
+    _all_user_ids.discard(user_id_int)
+
+    # Remove from blocklist
+    unblock_user(user_id_int)
+
+    return {
+        "deleted_tracks": int(deleted_tracks),
+        "deleted_photos": int(deleted_photos),
+        "deleted_shipments": int(deleted_shipments),
+        "deleted_recipient": int(had_recipient),
+        "deleted_user": int(had_code),
+    }
+
+
+# --- Reminders & activity (DEV mode) ---
+def record_user_activity(user_id: int) -> None:
+    meta = _ensure_meta(user_id)
+    now = _now_iso()
+    if not meta.get("first_seen_at"):
+        meta["first_seen_at"] = now
+    meta["last_activity_at"] = now
+
+
+def mark_pressed_address(user_id: int) -> None:
+    meta = _ensure_meta(user_id)
+    now = _now_iso()
+    meta["last_address_pressed_at"] = now
+
+
+def mark_pressed_sendcargo(user_id: int) -> None:
+    meta = _ensure_meta(user_id)
+    now = _now_iso()
+    meta["last_sendcargo_pressed_at"] = now
+
+
+def flush_user_activity(entries: List[tuple]) -> None:
+    # entries: (user_id, first_seen_at, last_activity_at, address_pressed_at|None, sendcargo_pressed_at|None)
+    for user_id, first_seen, last_activity, address_pressed, sendcargo_pressed in entries:
+        meta = _ensure_meta(user_id)
+        if not meta.get("first_seen_at"):
+            meta["first_seen_at"] = first_seen.isoformat()
+        if not meta.get("last_activity_at") or meta["last_activity_at"] < last_activity.isoformat():
+            meta["last_activity_at"] = last_activity.isoformat()
+        if address_pressed:
+            meta["last_address_pressed_at"] = address_pressed.isoformat()
+        if sendcargo_pressed:
+            meta["last_sendcargo_pressed_at"] = sendcargo_pressed.isoformat()
+
+
+def _older_than(ts_iso: Optional[str], days: int) -> bool:
+    if not ts_iso:
+        return False
+    try:
+        ts = datetime.fromisoformat(ts_iso.replace("Z", "+00:00"))
+    except Exception:
+        return False
+    delta = datetime.now(timezone.utc) - ts
+    return delta.total_seconds() >= days * 86400
+
+
+def get_users_for_address_reminder(days: int = 5) -> List[int]:
+    result: List[int] = []
+    for uid, meta in _user_meta.items():
+        if meta.get("last_address_reminder_at"):
+            continue
+        if meta.get("last_address_pressed_at"):
+            continue
+        first_seen = meta.get("first_seen_at")
+        if first_seen and _older_than(first_seen, days):
+            result.append(int(uid))
+    return result
+
+
+def get_users_for_sendcargo_reminder(days: int = 15) -> List[int]:
+    result: List[int] = []
+    for uid, meta in _user_meta.items():
+        if meta.get("last_sendcargo_reminder_at"):
+            continue
+        if meta.get("last_sendcargo_pressed_at"):
+            continue
+        first_seen = meta.get("first_seen_at")
+        if first_seen and _older_than(first_seen, days):
+            result.append(int(uid))
+    return result
+
+
+def get_users_for_inactive_reminder(days: int = 30) -> List[int]:
+    result: List[int] = []
+    for uid, meta in _user_meta.items():
+        last_act = meta.get("last_activity_at")
+        if not last_act:
+            continue
+        if not _older_than(last_act, days):
+            continue
+        last_sent = meta.get("last_inactive_reminder_at")
+        # Отправляем один раз за период неактивности
+        if last_sent and last_sent >= last_act:
+            continue
+        result.append(int(uid))
+    return result
+
+
+def mark_address_reminder_sent(user_id: int) -> None:
+    meta = _ensure_meta(user_id)
+    meta["last_address_reminder_at"] = _now_iso()
+
+
+def mark_sendcargo_reminder_sent(user_id: int) -> None:
+    meta = _ensure_meta(user_id)
+    meta["last_sendcargo_reminder_at"] = _now_iso()
+
+
+def mark_inactive_reminder_sent(user_id: int) -> None:
+    meta = _ensure_meta(user_id)
+    meta["last_inactive_reminder_at"] = _now_iso()
+
+
+# --- Bot FSM states (DEV mode) ---
+# (chat_id, user_id) -> (state, data, updated_at)
+_fsm_states: dict[Tuple[int, int], tuple] = {}
+
+
+def get_fsm_state(chat_id: int, user_id: int, max_age: int = 0) -> Optional[Tuple[Optional[str], dict]]:
+    row = _fsm_states.get((int(chat_id), int(user_id)))
+    if row is None or (max_age and row[2] < time.time() - max_age):
+        return None
+    return row[0], dict(row[1])
+
+
+def save_fsm_states(entries: List[tuple]) -> None:
+    # entries: (chat_id, user_id, state|None, data); пустое состояние без данных удаляет запись
+    now = time.time()
+    for chat_id, user_id, state, data in entries:
+        key = (int(chat_id), int(user_id))
+        if state or data:
+            _fsm_states[key] = (state, dict(data or {}), now)
+        else:
+            _fsm_states.pop(key, None)
+
+
+def delete_expired_fsm_states(max_age: int) -> int:
+    cutoff = time.time() - max_age
+    expired = [key for key, row in _fsm_states.items() if row[2] < cutoff]
+    for key in expired:
+        del _fsm_states[key]
+    return len(expired)
+
+
+# --- Shipment media sessions (DEV mode) ---
+# (admin_id, cargo_code) -> ([file_id, ...], updated_at)
+_shipment_media: dict[Tuple[int, str], tuple] = {}
+
+
+def add_shipment_media(admin_id: int, cargo_code: str, file_ids: List[str], max_count: int = 0) -> Tuple[int, int]:
+    # Фото сессии /shipped, не больше max_count в сессии (0 — без лимита);
+    # возвращает (сколько фото принято, сколько их в сессии теперь)
+    key = (int(admin_id), cargo_code)
+    items = _shipment_media.get(key, ([], 0.0))[0]
+    accepted = list(file_ids) if not max_count else list(file_ids)[:max(0, max_count - len(items))]
+    items.extend(accepted)
+    _shipment_media[key] = (items, time.time())
+    return len(accepted), len(items)
+
+
+def get_shipment_media(admin_id: int, cargo_code: str, max_age: int = 0) -> List[str]:
+    # Фото сессии, если она не истекла: max_age считается от последнего добавления фото
+    session = _shipment_media.get((int(admin_id), cargo_code))
+    if session is None or (max_age and session[1] <= time.time() - max_age):
+        return []
+    return list(session[0])
+
+
+def delete_shipment_media(admin_id: int, cargo_code: str) -> int:
+    return len(_shipment_media.pop((int(admin_id), cargo_code), ([], 0.0))[0])
+
+
+def delete_expired_shipment_media(max_age: int) -> int:
+    cutoff = time.time() - max_age
+    expired = [key for key, session in _shipment_media.items() if session[1] < cutoff]
+    return sum(len(_shipment_media.pop(key)[0]) for key in expired)
+
+
+# --- Menu message registry (DEV mode) ---
+# chat_id -> (message_id, keyboard_removed)
+_menu_messages: dict[int, Tuple[Optional[int], bool]] = {}
+
+
+def get_menu_message(chat_id: int) -> Optional[Tuple[Optional[int], bool]]:
+    return _menu_messages.get(int(chat_id))
+
+
+def save_menu_message(chat_id: int, message_id: Optional[int], keyboard_removed: bool) -> None:
+    _menu_messages[int(chat_id)] = (message_id, bool(keyboard_removed))
@@ -0,0 +1,1277 @@
+import os
+import json
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from psycopg2.extras import execute_values
+from psycopg2.pool import PoolError
+
+from storage import MAX_ROW_ID, keyset_page
+
+# Хранилище PostgreSQL (DB_ENGINE=postgres, по умолчанию вне DEV_MODE)
+
+# Railway Postgres плагин обычно создает переменную окружения DATABASE_URL
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    raise RuntimeError("DATABASE_URL is not set (add Railway PostgreSQL plugin and redeploy)")
+
+# Настройки пула (одинаковые для процессов uvicorn и бота)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1") or 1)
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10") or 10)
+# Сколько секунд ждать свободное соединение, прежде чем отдать ошибку
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30") or 30)
+# Максимальный возраст соединения в секундах (0 — без ограничения)
+DB_POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "1800") or 0)
+# Проверять соединение SELECT 1, если оно простаивало дольше стольких секунд
+DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30") or 0)
+
+
+class _BoundedPool:
+    # Потокобезопасный пул: при нехватке соединений ждет до timeout вместо немедленной ошибки,
+    # проверяет простаивавшие соединения и пересоздает старые.
+
+    def __init__(self, dsn: str, minconn: int, maxconn: int, timeout: float, recycle: float, ping_after: float):
+        self._dsn = dsn
+        self._maxconn = max(1, maxconn)
+        self._timeout = timeout
+        self._recycle = recycle
+        self._ping_after = ping_after
+        self._cond = threading.Condition()
+        self._pid = os.getpid()
+        # Свободные соединения: (conn, время последнего использования)
+        self._idle: List[tuple] = []
+        # id(conn) -> время создания
+        self._created: dict[int, float] = {}
+        self._size = 0
+        self._borrowed = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._recycled = 0
+        for _ in range(min(minconn, self._maxconn)):
+            conn = self._connect()
+            self._size += 1
+            self._idle.append((conn, time.monotonic()))
+
+    @property
+    def pid(self) -> int:
+        return self._pid
+
+    def _connect(self):
+        conn = psycopg2.connect(self._dsn)
+        self._created[id(conn)] = time.monotonic()
+        return conn
+
+    def _close(self, conn) -> None:
+        self._created.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        if self._recycle and now - self._created.get(id(conn), now) > self._recycle:
+            return False
+        if self._ping_after and now - last_used > self._ping_after:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self._timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self._maxconn:
+                    # Занимаем слот, само соединение откроем вне блокировки
+                    self._size += 1
+                    conn, last_used = None, 0.0
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolError("connection pool exhausted")
+                if not waited:
+                    waited = True
+                    self._waits += 1
+                self._cond.wait(remaining)
+            self._borrowed += 1
+            self._checkouts += 1
+            if waited:
+                wait_time = time.monotonic() - started
+                self._wait_time_total += wait_time
+                self._wait_time_max = max(self._wait_time_max, wait_time)
+        try:
+            if conn is not None and not self._is_usable(conn, last_used):
+                self._close(conn)
+                with self._cond:
+                    self._recycled += 1
+                conn = None
+            if conn is None:
+                conn = self._connect()
+            return conn
+        except Exception:
+            # Не удалось открыть соединение — освобождаем слот
+            with self._cond:
+                self._size -= 1
+                self._borrowed -= 1
+                self._cond.notify()
+            raise
+
+    def putconn(self, conn, close: bool = False) -> None:
+        if not close and not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                close = True
+        with self._cond:
+            self._borrowed -= 1
+            if close or conn.closed:
+                self._close(conn)
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self) -> None:
+        with self._cond:
+            for conn, _ in self._idle:
+                self._close(conn)
+            self._size -= len(self._idle)
+            self._idle.clear()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self._size,
+                "max": self._maxconn,
+                "idle": len(self._idle),
+                "borrowed": self._borrowed,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time_total": round(self._wait_time_total, 6),
+                "wait_time_max": round(self._wait_time_max, 6),
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+            }
+
+
+_pool: _BoundedPool = None  # type: ignore
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> _BoundedPool:
+    # Пул создается заново в дочернем процессе: соединения родителя использовать нельзя
+    global _pool
+    if _pool is None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = _BoundedPool(
+                    DATABASE_URL,
+                    minconn=DB_POOL_MIN,
+                    maxconn=DB_POOL_MAX,
+                    timeout=DB_POOL_TIMEOUT,
+                    recycle=DB_POOL_RECYCLE,
+                    ping_after=DB_POOL_PING_AFTER,
+                )
+    return _pool
+
+
+def pool_stats() -> dict:
+    return _get_pool().stats()
+
+
+def _execute(query: str, params: Optional[tuple] = None) -> None:
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                if params is None:
+                    cur.execute(query)
+                else:
+                    cur.execute(query, params)
+    finally:
+        pool.putconn(conn)
+
+
+def _fetchone(query: str, params: Optional[tuple] = None) -> Optional[tuple]:
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                if params is None:
+                    cur.execute(query)
+                else:
+                    cur.execute(query, params)
+                return cur.fetchone()
+    finally:
+        pool.putconn(conn)
+
+
+def _fetchall(query: str, params: Optional[tuple] = None) -> List[tuple]:
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                if params is None:
+                    cur.execute(query)
+                else:
+                    cur.execute(query, params)
+                return cur.fetchall()
+    finally:
+        pool.putconn(conn)
+
+
+def init_db() -> None:
+    _execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id BIGINT PRIMARY KEY,
+            code TEXT UNIQUE,
+            first_seen_at TIMESTAMPTZ,
+            last_activity_at TIMESTAMPTZ,
+            last_address_pressed_at TIMESTAMPTZ,
+            last_sendcargo_pressed_at TIMESTAMPTZ,
+            last_address_reminder_at TIMESTAMPTZ,
+            last_sendcargo_reminder_at TIMESTAMPTZ,
+            last_inactive_reminder_at TIMESTAMPTZ
+        )
+        """
+    )
+    _execute(
+        """
+        CREATE TABLE IF NOT EXISTS tracks (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT REFERENCES users(user_id) ON DELETE CASCADE,
+            track TEXT NOT NULL,
+            delivery TEXT,
+            created_at TIMESTAMPTZ DEFAULT NOW()
+        )
+        """
+    )
+    _execute(
+        """
+        CREATE TABLE IF NOT EXISTS track_photos (
+            id SERIAL PRIMARY KEY,
+            track TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            uploaded_by BIGINT,
+            caption TEXT,
+            created_at TIMESTAMPTZ DEFAULT NOW()
+        )
+        """
+    )
+    _execute(
+        """
+        CREATE TABLE IF NOT EXISTS recipients (
+            user_id BIGINT PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+            fio TEXT,
+            phone TEXT,
+            city TEXT,
+            updated_at TIMESTAMPTZ DEFAULT NOW()
+        )
+        """
+    )
+    _execute(
+        """
+        CREATE TABLE IF NOT EXISTS shipments (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT REFERENCES users(user_id) ON DELETE CASCADE,
+            cargo_num INTEGER NOT NULL,
+            cargo_code TEXT NOT NULL,
+            fio TEXT,
+            phone TEXT,
+            city TEXT,
+            created_at TIMESTAMPTZ DEFAULT NOW(),
+            UNIQUE (user_id, cargo_num)
+        )
+        """
+    )
+    # Table for blocked users
+    _execute(
+        """
+        CREATE TABLE IF NOT EXISTS blocked_users (
+            user_id BIGINT PRIMARY KEY,
+            banned_at TIMESTAMPTZ DEFAULT NOW(),
+            reason TEXT
+        )
+        """
+    )
+    # Состояния FSM бота (fsm_storage.DatabaseStorage)
+    _execute(
+        """
+        CREATE TABLE IF NOT EXISTS fsm_states (
+            chat_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            state TEXT,
+            data JSONB NOT NULL DEFAULT '{}',
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (chat_id, user_id)
+        )
+        """
+    )
+    # Фото незавершенных сессий /shipped
+    _execute(
+        """
+        CREATE TABLE IF NOT EXISTS shipment_media (
+            id SERIAL PRIMARY KEY,
+            admin_id BIGINT NOT NULL,
+            cargo_code TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+        """
+    )
+    # Сессия /shipped: истекает целиком, когда в нее давно не добавляли фото
+    _execute(
+        """
+        CREATE TABLE IF NOT EXISTS shipment_media_sessions (
+            admin_id BIGINT NOT NULL,
+            cargo_code TEXT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (admin_id, cargo_code)
+        )
+        """
+    )
+    # Экранное сообщение меню чата (show_menu_screen в bot.py)
+    _execute(
+        """
+        CREATE TABLE IF NOT EXISTS menu_messages (
+            chat_id BIGINT PRIMARY KEY,
+            message_id BIGINT,
+            keyboard_removed BOOLEAN NOT NULL DEFAULT FALSE,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+        """
+    )
+    # Расширение схемы: добавляем статус отправки и дату обновления статуса
+    _execute("ALTER TABLE shipments ADD COLUMN IF NOT EXISTS status TEXT")
+    _execute("ALTER TABLE shipments ADD COLUMN IF NOT EXISTS status_updated_at TIMESTAMPTZ")
+    # Расширение схемы пользователей: добавляем поля активности/напоминаний, если их нет
+    _execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS first_seen_at TIMESTAMPTZ")
+    _execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_activity_at TIMESTAMPTZ")
+    _execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_address_pressed_at TIMESTAMPTZ")
+    _execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_sendcargo_pressed_at TIMESTAMPTZ")
+    _execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_address_reminder_at TIMESTAMPTZ")
+    _execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_sendcargo_reminder_at TIMESTAMPTZ")
+    _execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_inactive_reminder_at TIMESTAMPTZ")
+    # Миграции кодов:
+    # 1) Любые не-EM коды -> EM03-xxxx (минимум 4 цифры, без обрезания длинных значений)
+    _execute(
+        """
+        UPDATE users
+        SET code = 'EM03-' || (
+            CASE
+                WHEN REGEXP_REPLACE(code, '\\D', '', 'g') <> '' THEN
+                    (
+                        CASE
+                            WHEN LENGTH(CAST(CAST(REGEXP_REPLACE(code, '\\D', '', 'g') AS BIGINT) AS TEXT)) < 4
+                                THEN LPAD(CAST(CAST(REGEXP_REPLACE(code, '\\D', '', 'g') AS BIGINT) AS TEXT), 4, '0')
+                            ELSE CAST(CAST(REGEXP_REPLACE(code, '\\D', '', 'g') AS BIGINT) AS TEXT)
+                        END
+                    )
+                ELSE NULL
+            END
+        )
+        WHERE code IS NOT NULL
+          AND code NOT LIKE 'EM03-%'
+          AND REGEXP_REPLACE(code, '\\D', '', 'g') <> ''
+        """
+    )
+
+    # 2) Нормализация уже существующих EM-кодов к формату EM03-xxxx (минимум 4 цифры)
+    _execute(
+        """
+        UPDATE users u
+        SET code = 'EM03-' || (
+            CASE
+                WHEN LENGTH(CAST(CAST(REGEXP_REPLACE(SUBSTRING(u.code FROM '^EM\\d{2}-(\\d+)$'), '\\D', '', 'g') AS BIGINT) AS TEXT)) < 4
+                    THEN LPAD(CAST(CAST(REGEXP_REPLACE(SUBSTRING(u.code FROM '^EM\\d{2}-(\\d+)$'), '\\D', '', 'g') AS BIGINT) AS TEXT), 4, '0')
+                ELSE CAST(CAST(REGEXP_REPLACE(SUBSTRING(u.code FROM '^EM\\d{2}-(\\d+)$'), '\\D', '', 'g') AS BIGINT) AS TEXT)
+            END
+        )
+        WHERE u.code ~ '^EM\\d{2}-\\d+$'
+        """
+    )
+
+    # Последовательность для выдачи новых кодов. Засеваем максимумом из существующих
+    # кодов, но никогда не откатываем назад уже выданные номера.
+    _execute("CREATE SEQUENCE IF NOT EXISTS user_code_seq")
+    _execute(
+        """
+        SELECT setval('user_code_seq', GREATEST(
+            (SELECT COALESCE(MAX(CAST(SUBSTRING(code FROM '^EM03-(\\d+)$') AS BIGINT)), 0) FROM users),
+            (SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM user_code_seq)
+        ) + 1, false)
+        """
+    )
+
+    _ensure_unique_tracks()
+    _ensure_indexes()
+    if os.getenv("DB_EXPLAIN_ON_INIT", "").lower() in ("1", "true", "yes"):
+        explain_hot_queries()
+
+
+# Индексы под горячие запросы: (имя, таблица, колонки)
+_HOT_INDEXES: List[Tuple[str, str, str]] = [
+    ("idx_tracks_user_id", "tracks", "user_id, id"),
+    ("idx_tracks_track", "tracks", "track"),
+    ("idx_track_photos_track", "track_photos", "track, id"),
+    ("idx_shipments_cargo_code", "shipments", "cargo_code"),
+    ("idx_shipments_user_status", "shipments", "user_id, status, id"),
+    ("idx_fsm_states_updated_at", "fsm_states", "updated_at"),
+    ("idx_shipment_media_session", "shipment_media", "admin_id, cargo_code, id"),
+    ("idx_shipment_media_sessions_updated_at", "shipment_media_sessions", "updated_at"),
+]
+
+# Горячие запросы и примерные параметры для проверки планов
+_HOT_QUERIES: List[Tuple[str, str, tuple]] = [
+    ("get_tracks", "SELECT track, delivery FROM tracks WHERE user_id=%s ORDER BY id ASC", (0,)),
+    ("find_user_ids_by_track", "SELECT user_id FROM tracks WHERE track=%s", ("",)),
+    ("get_track_photos", "SELECT file_id FROM track_photos WHERE track=%s ORDER BY id ASC", ("",)),
+    ("get_user_id_by_cargo_code", "SELECT user_id FROM shipments WHERE cargo_code=%s", ("",)),
+    ("update_shipment_status", "UPDATE shipments SET status=%s, status_updated_at=NOW() WHERE cargo_code=%s", ("", "")),
+    (
+        "list_user_shipments_by_status",
+        "SELECT cargo_code FROM shipments WHERE user_id=%s AND status=%s ORDER BY id ASC",
+        (0, ""),
+    ),
+    (
+        "get_tracks_page",
+        "SELECT id, track, delivery FROM tracks WHERE user_id=%s AND id>%s ORDER BY id ASC LIMIT %s",
+        (0, 0, 21),
+    ),
+    (
+        "list_user_shipments_page",
+        "SELECT id, cargo_code FROM shipments WHERE user_id=%s AND status=%s AND id>%s ORDER BY id ASC LIMIT %s",
+        (0, "", 0, 21),
+    ),
+]
+
+
+def _execute_autocommit(query: str, params: Optional[tuple] = None) -> None:
+    # CREATE/DROP INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    pool = _get_pool()
+    conn = pool.getconn()
+    prev_autocommit = conn.autocommit
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            if params is None:
+                cur.execute(query)
+            else:
+                cur.execute(query, params)
+    finally:
+        conn.autocommit = prev_autocommit
+        pool.putconn(conn)
+
+
+def _ensure_unique_tracks() -> None:
+    # Миграция: пара (user_id, track) уникальна. Повторы схлопываются в самую раннюю строку
+    # (порядок истории сохраняется) с последним указанным способом доставки.
+    if _fetchone("SELECT 1 FROM pg_class WHERE relname = 'uq_tracks_user_track'"):
+        return
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                # Вставки ждут конца миграции, иначе между DELETE и CREATE INDEX появится новый дубль
+                cur.execute("LOCK TABLE tracks IN SHARE ROW EXCLUSIVE MODE")
+                cur.execute(
+                    """
+                    UPDATE tracks t
+                    SET delivery = d.delivery
+                    FROM (
+                        SELECT DISTINCT ON (user_id, track) user_id, track, delivery
+                        FROM tracks
+                        WHERE COALESCE(delivery, '') <> ''
+                        ORDER BY user_id, track, id DESC
+                    ) d
+                    WHERE t.user_id = d.user_id AND t.track = d.track
+                      AND t.id IN (SELECT MIN(id) FROM tracks GROUP BY user_id, track HAVING COUNT(*) > 1)
+                    """
+                )
+                cur.execute("DELETE FROM tracks WHERE id NOT IN (SELECT MIN(id) FROM tracks GROUP BY user_id, track)")
+                cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_tracks_user_track ON tracks (user_id, track)")
+    finally:
+        pool.putconn(conn)
+
+
+def _ensure_indexes() -> None:
+    for name, table, columns in _HOT_INDEXES:
+        # Прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс — пересоздаем его
+        row = _fetchone(
+            """
+            SELECT i.indisvalid
+            FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+            WHERE c.relname = %s
+            """,
+            (name,),
+        )
+        if row and not row[0]:
+            _execute_autocommit(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        elif row:
+            continue
+        try:
+            _execute_autocommit(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})")
+        except psycopg2.Error:
+            # Например, за pgbouncer в режиме транзакций — строим обычным способом
+            _execute_autocommit(f"DROP INDEX IF EXISTS {name}")
+            _execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def explain_hot_queries(verbose: bool = True) -> dict:
+    # Печатает планы горячих запросов. Seq scan отключаем: на маленьких таблицах планировщик
+    # и так выберет его, а если он остался в плане — у запроса нет подходящего индекса.
+    plans: dict = {}
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL enable_seqscan = off")
+            for name, query, params in _HOT_QUERIES:
+                cur.execute("EXPLAIN " + query, params)
+                plan = "\n".join(r[0] for r in cur.fetchall())
+                plans[name] = plan
+                if verbose:
+                    print(f"--- {name}\n{plan}")
+                if "Seq Scan" in plan:
+                    print(f"WARNING: {name} uses a sequential scan")
+    finally:
+        # Откатываем SET LOCAL и UPDATE из EXPLAIN (он не выполняется, но транзакция открыта)
+        conn.rollback()
+        pool.putconn(conn)
+    return plans
+
+
+def get_user_code(user_id: int) -> Optional[str]:
+    row = _fetchone("SELECT code FROM users WHERE user_id=%s", (user_id,))
+    return row[0] if row else None
+
+
+def _generate_next_code_tx(cur) -> str:
+    # Номер берем из последовательности: один nextval вместо сканирования всех кодов
+    cur.execute("SELECT nextval('user_code_seq')")
+    next_num = int(cur.fetchone()[0])
+    return f"EM03-{next_num:04d}"
+
+
+def _get_or_create_user_code_tx(cur, user_id: int) -> str:
+    cur.execute("SELECT code FROM users WHERE user_id=%s", (user_id,))
+    row = cur.fetchone()
+    if row and row[0]:
+        return row[0]
+
+    new_code = _generate_next_code_tx(cur)
+    # При гонке двух первых запросов одного пользователя сохраняется первый код
+    cur.execute(
+        """
+        INSERT INTO users (user_id, code)
+        VALUES (%s, %s)
+        ON CONFLICT (user_id) DO UPDATE
+        SET code = COALESCE(users.code, EXCLUDED.code)
+        RETURNING code
+        """,
+        (user_id, new_code),
+    )
+    return cur.fetchone()[0]
+
+
+def get_or_create_user_code(user_id: int) -> str:
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                code = _get_or_create_user_code_tx(cur, user_id)
+    finally:
+        pool.putconn(conn)
+    return code
+
+
+def add_track(user_id: int, track: str, delivery: str = "") -> None:
+    # Повторная регистрация трека не создает строку, а обновляет способ доставки, если он указан
+    _execute(
+        """
+        INSERT INTO tracks (user_id, track, delivery) VALUES (%s, %s, %s)
+        ON CONFLICT (user_id, track) DO UPDATE SET delivery = EXCLUDED.delivery WHERE EXCLUDED.delivery <> ''
+        """,
+        (user_id, track, delivery),
+    )
+
+
+def get_tracks(user_id: int) -> List[Tuple[str, Optional[str]]]:
+    rows = _fetchall(
+        "SELECT track, delivery FROM tracks WHERE user_id=%s ORDER BY id ASC",
+        (user_id,),
+    )
+    return [(r[0], r[1]) for r in rows]
+
+
+def get_tracks_page(user_id: int, cursor: Optional[int] = None, backward: bool = False, limit: int = 20) -> dict:
+    # Страница треков по ключу id (индекс idx_tracks_user_id): читается только limit + 1 строк.
+    # {"items": [(id, track, delivery)], "next_cursor", "prev_cursor"}
+    if backward:
+        rows = _fetchall(
+            "SELECT id, track, delivery FROM tracks WHERE user_id=%s AND id<%s ORDER BY id DESC LIMIT %s",
+            (user_id, MAX_ROW_ID if cursor is None else cursor, limit + 1),
+        )
+    else:
+        rows = _fetchall(
+            "SELECT id, track, delivery FROM tracks WHERE user_id=%s AND id>%s ORDER BY id ASC LIMIT %s",
+            (user_id, cursor or 0, limit + 1),
+        )
+    return keyset_page([tuple(r) for r in rows], limit, cursor, backward)
+
+
+def add_track_photo(track: str, file_id: str, uploaded_by: Optional[int] = None, caption: Optional[str] = None) -> None:
+    _execute(
+        "INSERT INTO track_photos (track, file_id, uploaded_by, caption) VALUES (%s, %s, %s, %s)",
+        (track, file_id, uploaded_by, caption),
+    )
+
+
+def get_track_photos(track: str) -> List[str]:
+    rows = _fetchall(
+        "SELECT file_id FROM track_photos WHERE track=%s ORDER BY id ASC",
+        (track,),
+    )
+    return [r[0] for r in rows]
+
+
+def get_photos_for_tracks(tracks: List[str]) -> dict:
+    # Фото сразу для нескольких треков одним запросом: {трек: [file_id, ...]}
+    result: dict = {t: [] for t in tracks}
+    if not result:
+        return result
+    rows = _fetchall(
+        "SELECT track, file_id FROM track_photos WHERE track = ANY(%s) ORDER BY track, id ASC",
+        (list(result),),
+    )
+    for track, file_id in rows:
+        result[track].append(file_id)
+    return result
+
+
+def find_user_ids_by_track(track: str) -> List[int]:
+    rows = _fetchall(
+        "SELECT user_id FROM tracks WHERE track=%s",
+        (track,),
+    )
+    return [r[0] for r in rows if r and r[0] is not None]
+
+
+def delete_all_user_tracks(user_id: int) -> int:
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM tracks WHERE user_id=%s", (user_id,))
+                return cur.rowcount or 0
+    finally:
+        pool.putconn(conn)
+
+
+def get_user_id_by_code(code: str) -> Optional[int]:
+    row = _fetchone("SELECT user_id FROM users WHERE code=%s", (code,))
+    return row[0] if row else None
+
+
+def get_recipient(user_id: int) -> Optional[dict]:
+    row = _fetchone("SELECT fio, phone, city FROM recipients WHERE user_id=%s", (user_id,))
+    if not row:
+        return None
+    fio, phone, city = row
+    return {"fio": (fio or "").strip(), "phone": (phone or "").strip(), "city": (city or "").strip()}
+
+
+def set_recipient(user_id: int, fio: str, phone: str, city: str) -> None:
+    _execute(
+        """
+        INSERT INTO recipients (user_id, fio, phone, city, updated_at)
+        VALUES (%s, %s, %s, %s, NOW())
+        ON CONFLICT (user_id) DO UPDATE
+        SET fio = EXCLUDED.fio,
+            phone = EXCLUDED.phone,
+            city = EXCLUDED.city,
+            updated_at = NOW()
+        """,
+        (user_id, fio.strip(), phone.strip(), city.strip()),
+    )
+
+
+def get_next_cargo_num(user_id: int) -> int:
+    row = _fetchone("SELECT COALESCE(MAX(cargo_num), 0) + 1 FROM shipments WHERE user_id=%s", (user_id,))
+    return int(row[0] if row and row[0] is not None else 1)
+
+
+def create_shipment(user_id: int, cargo_num: int, cargo_code: str, fio: str, phone: str, city: str, status: Optional[str] = None) -> int:
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO shipments (user_id, cargo_num, cargo_code, fio, phone, city, status, status_updated_at)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, CASE WHEN %s IS NULL THEN NULL ELSE NOW() END)
+                    RETURNING id
+                    """,
+                    (user_id, int(cargo_num), cargo_code, fio.strip(), phone.strip(), city.strip(), status, status),
+                )
+                row = cur.fetchone()
+                return int(row[0])
+    finally:
+        pool.putconn(conn)
+
+
+def get_user_id_by_cargo_code(cargo_code: str) -> Optional[int]:
+    row = _fetchone("SELECT user_id FROM shipments WHERE cargo_code=%s", (cargo_code,))
+    return int(row[0]) if row and row[0] is not None else None
+
+
+def update_shipment_status(cargo_code: str, status: str) -> None:
+    _execute(
+        "UPDATE shipments SET status=%s, status_updated_at=NOW() WHERE cargo_code=%s",
+        (status, cargo_code),
+    )
+
+
+def list_user_shipments_by_status(user_id: int, status: str) -> List[str]:
+    rows = _fetchall(
+        "SELECT cargo_code FROM shipments WHERE user_id=%s AND status=%s ORDER BY id ASC",
+        (user_id, status),
+    )
+    return [r[0] for r in rows]
+
+
+def list_user_shipments_page(user_id: int, status: str, cursor: Optional[int] = None, backward: bool = False, limit: int = 20) -> dict:
+    # Страница грузов со статусом (индекс idx_shipments_user_status):
+    # {"items": [(id, cargo_code)], "next_cursor", "prev_cursor"}
+    if backward:
+        rows = _fetchall(
+            "SELECT id, cargo_code FROM shipments WHERE user_id=%s AND status=%s AND id<%s ORDER BY id DESC LIMIT %s",
+            (user_id, status, MAX_ROW_ID if cursor is None else cursor, limit + 1),
+        )
+    else:
+        rows = _fetchall(
+            "SELECT id, cargo_code FROM shipments WHERE user_id=%s AND status=%s AND id>%s ORDER BY id ASC LIMIT %s",
+            (user_id, status, cursor or 0, limit + 1),
+        )
+    return keyset_page([tuple(r) for r in rows], limit, cursor, backward)
+
+
+def delete_all_user_shipments(user_id: int) -> int:
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM shipments WHERE user_id=%s", (user_id,))
+                return cur.rowcount or 0
+    finally:
+        pool.putconn(conn)
+
+
+def count_user_shipments(user_id: int, status: Optional[str] = None) -> int:
+    # Со статусом счет идет по индексу idx_shipments_user_status
+    if status is None:
+        row = _fetchone("SELECT COUNT(*) FROM shipments WHERE user_id=%s", (user_id,))
+    else:
+        row = _fetchone("SELECT COUNT(*) FROM shipments WHERE user_id=%s AND status=%s", (user_id, status))
+    return int(row[0]) if row and row[0] is not None else 0
+
+
+def get_profile_bundle(user_id: int, create_code: bool = False, photo_counts: bool = False) -> dict:
+    # Код, блокировка, треки, получатель и счетчики грузов — одним запросом.
+    # Если кода нет и create_code=True, он создается в той же транзакции.
+    # photo_counts=True добавляет число фото по каждому треку.
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    WITH p AS (SELECT %s::BIGINT AS uid)
+                    SELECT
+                        (SELECT code FROM users WHERE user_id = p.uid),
+                        EXISTS (SELECT 1 FROM blocked_users WHERE user_id = p.uid),
+                        COALESCE(
+                            (SELECT json_agg(json_build_array(track, delivery) ORDER BY id)
+                             FROM tracks WHERE user_id = p.uid),
+                            '[]'::json
+                        ),
+                        (SELECT json_build_object('fio', fio, 'phone', phone, 'city', city)
+                         FROM recipients WHERE user_id = p.uid),
+                        COALESCE(
+                            (SELECT json_object_agg(status, cnt)
+                             FROM (
+                                 SELECT COALESCE(status, '') AS status, COUNT(*) AS cnt
+                                 FROM shipments WHERE user_id = p.uid
+                                 GROUP BY 1
+                             ) s),
+                            '{}'::json
+                        ),
+                        (SELECT COALESCE(MAX(cargo_num), 0) + 1 FROM shipments WHERE user_id = p.uid),
+                        CASE WHEN %s THEN COALESCE(
+                            (SELECT json_object_agg(track, cnt)
+                             FROM (
+                                 SELECT ph.track, COUNT(*) AS cnt
+                                 FROM track_photos ph
+                                 WHERE ph.track IN (SELECT track FROM tracks WHERE user_id = p.uid)
+                                 GROUP BY ph.track
+                             ) c),
+                            '{}'::json
+                        ) END
+                    FROM p
+                    """,
+                    (user_id, bool(photo_counts)),
+                )
+                code, blocked, tracks, recipient, counts, next_cargo_num, photos = cur.fetchone()
+                code_created = not code and create_code and not blocked
+                if code_created:
+                    code = _get_or_create_user_code_tx(cur, user_id)
+    finally:
+        pool.putconn(conn)
+    if recipient:
+        recipient = {k: (recipient.get(k) or "").strip() for k in ("fio", "phone", "city")}
+    counts = {str(k): int(v) for k, v in (counts or {}).items()}
+    tracks = [(t, d) for (t, d) in tracks]
+    bundle = {
+        "code": code,
+        "code_created": bool(code_created),
+        "blocked": bool(blocked),
+        "tracks": tracks,
+        "recipient": recipient or None,
+        "shipments": counts,
+        "shipments_total": sum(counts.values()),
+        "next_cargo_num": int(next_cargo_num or 1),
+    }
+    if photo_counts:
+        photos = photos or {}
+        bundle["photo_counts"] = {t: int(photos.get(t, 0)) for (t, _) in tracks}
+    return bundle
+
+
+def add_track_and_get_tracks(user_id: int, track: str, delivery: str = "") -> List[Tuple[str, Optional[str]]]:
+    # Upsert и перечитывание списка за один запрос. Основной SELECT видит таблицу до изменения,
+    # поэтому вставленную или обновленную строку берем из CTE, а ее старую версию исключаем.
+    rows = _fetchall(
+        """
+        WITH ins AS (
+            INSERT INTO tracks (user_id, track, delivery) VALUES (%s, %s, %s)
+            ON CONFLICT (user_id, track) DO UPDATE SET delivery = EXCLUDED.delivery WHERE EXCLUDED.delivery <> ''
+            RETURNING id, track, delivery
+        )
+        SELECT track, delivery FROM (
+            SELECT id, track, delivery FROM tracks WHERE user_id=%s AND id NOT IN (SELECT id FROM ins)
+            UNION ALL
+            SELECT id, track, delivery FROM ins
+        ) t
+        ORDER BY id ASC
+        """,
+        (user_id, track, delivery, user_id),
+    )
+    return [(r[0], r[1]) for r in rows]
+
+
+def add_tracks_bulk(user_id: int, tracks: List[str], delivery: str = "") -> Tuple[List[str], List[str]]:
+    # Пакетная регистрация одним upsert в порядке списка. Возвращает (добавленные, уже бывшие
+    # у пользователя). xmax = 0 только у вставленных строк, у обновленных доставкой — нет.
+    unique = list(dict.fromkeys(tracks))
+    if not unique:
+        return [], []
+    rows = _fetchall(
+        """
+        WITH input AS (
+            SELECT t, ord FROM unnest(%s::text[]) WITH ORDINALITY AS u(t, ord)
+        ), ins AS (
+            INSERT INTO tracks (user_id, track, delivery)
+            SELECT %s, input.t, %s FROM input
+            ORDER BY input.ord
+            ON CONFLICT (user_id, track) DO UPDATE SET delivery = EXCLUDED.delivery WHERE EXCLUDED.delivery <> ''
+            RETURNING track, xmax = 0 AS inserted
+        )
+        SELECT track FROM ins WHERE inserted
+        """,
+        (unique, user_id, delivery),
+    )
+    inserted = {r[0] for r in rows}
+    return [t for t in unique if t in inserted], [t for t in unique if t not in inserted]
+
+
+# --- Admin / moderation (PostgreSQL mode) ---
+def is_user_blocked(user_id: int) -> bool:
+    return bool(_fetchone("SELECT 1 FROM blocked_users WHERE user_id=%s", (user_id,)))
+
+
+def list_blocked_user_ids() -> List[int]:
+    return [int(r[0]) for r in _fetchall("SELECT user_id FROM blocked_users")]
+
+
+def block_user(user_id: int, reason: Optional[str] = None) -> None:
+    _execute(
+        """
+        INSERT INTO blocked_users (user_id, reason, banned_at)
+        VALUES (%s, %s, NOW())
+        ON CONFLICT (user_id) DO UPDATE
+        SET reason = EXCLUDED.reason,
+            banned_at = NOW()
+        """,
+        (user_id, reason),
+    )
+
+
+def unblock_user(user_id: int) -> None:
+    _execute("DELETE FROM blocked_users WHERE user_id=%s", (user_id,))
+
+
+def delete_user_everything(user_id: int) -> dict:
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                # Count related records for reporting
+                cur.execute("SELECT COUNT(*) FROM tracks WHERE user_id=%s", (user_id,))
+                tracks_count = int(cur.fetchone()[0])
+                cur.execute("SELECT COUNT(*) FROM shipments WHERE user_id=%s", (user_id,))
+                shipments_count = int(cur.fetchone()[0])
+                cur.execute("SELECT COUNT(*) FROM recipients WHERE user_id=%s", (user_id,))
+                recipients_count = int(cur.fetchone()[0])
+
+                # Delete photos for user's tracks
+                cur.execute(
+                    """
+                    DELETE FROM track_photos
+                    WHERE track IN (SELECT track FROM tracks WHERE user_id=%s)
+                    """,
+                    (user_id,)
+                )
+                deleted_photos = cur.rowcount or 0
+
+                # Remove from blocklist first
+                cur.execute("DELETE FROM blocked_users WHERE user_id=%s", (user_id,))
+
+                # Delete the user row (cascades to tracks/shipments/recipients)
+                cur.execute("DELETE FROM users WHERE user_id=%s", (user_id,))
+                deleted_users = cur.rowcount or 0
+
+                return {
+                    "deleted_tracks": int(tracks_count),
+                    "deleted_photos": int(deleted_photos),
+                    "deleted_shipments": int(shipments_count),
+                    "deleted_recipient": int(recipients_count),
+                    "deleted_user": int(deleted_users),
+                }
+    finally:
+        pool.putconn(conn)
+
+
+# --- Reminders & activity (PostgreSQL mode) ---
+def record_user_activity(user_id: int) -> None:
+    _execute(
+        """
+        INSERT INTO users (user_id, first_seen_at, last_activity_at)
+        VALUES (%s, NOW(), NOW())
+        ON CONFLICT (user_id) DO UPDATE
+        SET last_activity_at = NOW(),
+            first_seen_at = COALESCE(users.first_seen_at, EXCLUDED.first_seen_at)
+        """,
+        (user_id,)
+    )
+
+
+def mark_pressed_address(user_id: int) -> None:
+    _execute(
+        """
+        INSERT INTO users (user_id, first_seen_at, last_activity_at, last_address_pressed_at)
+        VALUES (%s, NOW(), NOW(), NOW())
+        ON CONFLICT (user_id) DO UPDATE
+        SET last_activity_at = NOW(),
+            last_address_pressed_at = NOW(),
+            first_seen_at = COALESCE(users.first_seen_at, EXCLUDED.first_seen_at)
+        """,
+        (user_id,)
+    )
+
+
+def mark_pressed_sendcargo(user_id: int) -> None:
+    _execute(
+        """
+        INSERT INTO users (user_id, first_seen_at, last_activity_at, last_sendcargo_pressed_at)
+        VALUES (%s, NOW(), NOW(), NOW())
+        ON CONFLICT (user_id) DO UPDATE
+        SET last_activity_at = NOW(),
+            last_sendcargo_pressed_at = NOW(),
+            first_seen_at = COALESCE(users.first_seen_at, EXCLUDED.first_seen_at)
+        """,
+        (user_id,)
+    )
+
+
+def flush_user_activity(entries: List[tuple]) -> None:
+    # Пакетная запись активности одним multi-row upsert.
+    # entries: (user_id, first_seen_at, last_activity_at, address_pressed_at|None, sendcargo_pressed_at|None)
+    if not entries:
+        return
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    """
+                    INSERT INTO users (user_id, first_seen_at, last_activity_at, last_address_pressed_at, last_sendcargo_pressed_at)
+                    VALUES %s
+                    ON CONFLICT (user_id) DO UPDATE
+                    SET last_activity_at = GREATEST(users.last_activity_at, EXCLUDED.last_activity_at),
+                        last_address_pressed_at = COALESCE(EXCLUDED.last_address_pressed_at, users.last_address_pressed_at),
+                        last_sendcargo_pressed_at = COALESCE(EXCLUDED.last_sendcargo_pressed_at, users.last_sendcargo_pressed_at),
+                        first_seen_at = COALESCE(users.first_seen_at, EXCLUDED.first_seen_at)
+                    """,
+                    entries,
+                )
+    finally:
+        pool.putconn(conn)
+
+
+def get_users_for_address_reminder(days: int = 5) -> List[int]:
+    rows = _fetchall(
+        f"""
+        SELECT user_id FROM users
+        WHERE first_seen_at IS NOT NULL
+          AND first_seen_at <= NOW() - INTERVAL '{int(days)} days'
+          AND last_address_pressed_at IS NULL
+          AND last_address_reminder_at IS NULL
+        """
+    )
+    return [int(r[0]) for r in rows]
+
+
+def get_users_for_sendcargo_reminder(days: int = 15) -> List[int]:
+    rows = _fetchall(
+        f"""
+        SELECT user_id FROM users
+        WHERE first_seen_at IS NOT NULL
+          AND first_seen_at <= NOW() - INTERVAL '{int(days)} days'
+          AND last_sendcargo_pressed_at IS NULL
+          AND last_sendcargo_reminder_at IS NULL
+        """
+    )
+    return [int(r[0]) for r in rows]
+
+
+def get_users_for_inactive_reminder(days: int = 30) -> List[int]:
+    rows = _fetchall(
+        f"""
+        SELECT user_id FROM users
+        WHERE last_activity_at IS NOT NULL
+          AND last_activity_at <= NOW() - INTERVAL '{int(days)} days'
+          AND (
+                last_inactive_reminder_at IS NULL
+             OR last_inactive_reminder_at < last_activity_at
+          )
+        """
+    )
+    return [int(r[0]) for r in rows]
+
+
+def mark_address_reminder_sent(user_id: int) -> None:
+    _execute("UPDATE users SET last_address_reminder_at=NOW() WHERE user_id=%s", (user_id,))
+
+
+def mark_sendcargo_reminder_sent(user_id: int) -> None:
+    _execute("UPDATE users SET last_sendcargo_reminder_at=NOW() WHERE user_id=%s", (user_id,))
+
+
+def mark_inactive_reminder_sent(user_id: int) -> None:
+    _execute("UPDATE users SET last_inactive_reminder_at=NOW() WHERE user_id=%s", (user_id,))
+
+
+# --- Bot FSM states (PostgreSQL mode) ---
+def get_fsm_state(chat_id: int, user_id: int, max_age: int = 0) -> Optional[Tuple[Optional[str], dict]]:
+    # max_age — секунды с последнего изменения; более старые состояния считаются брошенными
+    row = _fetchone(
+        """
+        SELECT state, data FROM fsm_states
+        WHERE chat_id=%s AND user_id=%s AND (%s = 0 OR updated_at > NOW() - %s * INTERVAL '1 second')
+        """,
+        (chat_id, user_id, max_age, max_age),
+    )
+    if not row:
+        return None
+    return row[0], dict(row[1] or {})
+
+
+def save_fsm_states(entries: List[tuple]) -> None:
+    # Пачка изменений одной транзакцией: multi-row upsert и одно удаление.
+    # entries: (chat_id, user_id, state|None, data); пустое состояние без данных удаляет запись
+    if not entries:
+        return
+    upserts = [(c, u, s, json.dumps(d, ensure_ascii=False, default=str)) for c, u, s, d in entries if s or d]
+    deletes = [(c, u) for c, u, s, d in entries if not (s or d)]
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                if upserts:
+                    execute_values(
+                        cur,
+                        """
+                        INSERT INTO fsm_states (chat_id, user_id, state, data, updated_at)
+                        VALUES %s
+                        ON CONFLICT (chat_id, user_id) DO UPDATE
+                        SET state = EXCLUDED.state, data = EXCLUDED.data, updated_at = EXCLUDED.updated_at
+                        """,
+                        upserts,
+                        template="(%s, %s, %s, %s::jsonb, NOW())",
+                    )
+                if deletes:
+                    execute_values(cur, "DELETE FROM fsm_states WHERE (chat_id, user_id) IN (VALUES %s)", deletes)
+    finally:
+        pool.putconn(conn)
+
+
+def delete_expired_fsm_states(max_age: int) -> int:
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM fsm_states WHERE updated_at < NOW() - %s * INTERVAL '1 second'", (max_age,))
+                return cur.rowcount
+    finally:
+        pool.putconn(conn)
+
+
+# --- Shipment media sessions (PostgreSQL mode) ---
+def add_shipment_media(admin_id: int, cargo_code: str, file_ids: List[str], max_count: int = 0) -> Tuple[int, int]:
+    # Фото сессии /shipped (альбом — одним INSERT), не больше max_count в сессии (0 — без лимита).
+    # Возвращает (сколько фото принято, сколько их в сессии теперь). Upsert строки сессии
+    # блокирует ее до конца транзакции: параллельные вызовы считают фото по очереди.
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO shipment_media_sessions (admin_id, cargo_code, updated_at) VALUES (%s, %s, NOW())
+                    ON CONFLICT (admin_id, cargo_code) DO UPDATE SET updated_at = EXCLUDED.updated_at
+                    """,
+                    (admin_id, cargo_code),
+                )
+                cur.execute(
+                    """
+                    WITH cur_count AS (
+                        SELECT COUNT(*) AS n FROM shipment_media WHERE admin_id=%s AND cargo_code=%s
+                    ), ins AS (
+                        INSERT INTO shipment_media (admin_id, cargo_code, file_id)
+                        SELECT %s, %s, f FROM unnest(%s::text[]) WITH ORDINALITY AS u(f, ord)
+                        WHERE %s = 0 OR ord <= %s - (SELECT n FROM cur_count)
+                        ORDER BY ord
+                        RETURNING 1
+                    )
+                    SELECT (SELECT COUNT(*) FROM ins), (SELECT n FROM cur_count) + (SELECT COUNT(*) FROM ins)
+                    """,
+                    (admin_id, cargo_code, admin_id, cargo_code, list(file_ids), max_count, max_count),
+                )
+                accepted, total = cur.fetchone()
+    finally:
+        pool.putconn(conn)
+    return int(accepted), int(total)
+
+
+def get_shipment_media(admin_id: int, cargo_code: str, max_age: int = 0) -> List[str]:
+    # Фото сессии, если она не истекла: max_age считается от последнего добавления фото
+    rows = _fetchall(
+        """
+        SELECT m.file_id FROM shipment_media_sessions s
+        JOIN shipment_media m ON m.admin_id = s.admin_id AND m.cargo_code = s.cargo_code
+        WHERE s.admin_id=%s AND s.cargo_code=%s AND (%s = 0 OR s.updated_at > NOW() - %s * INTERVAL '1 second')
+        ORDER BY m.id ASC
+        """,
+        (admin_id, cargo_code, max_age, max_age),
+    )
+    return [r[0] for r in rows]
+
+
+def delete_shipment_media(admin_id: int, cargo_code: str) -> int:
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM shipment_media_sessions WHERE admin_id=%s AND cargo_code=%s", (admin_id, cargo_code))
+                cur.execute("DELETE FROM shipment_media WHERE admin_id=%s AND cargo_code=%s", (admin_id, cargo_code))
+                return cur.rowcount
+    finally:
+        pool.putconn(conn)
+
+
+def delete_expired_shipment_media(max_age: int) -> int:
+    # Сессия истекает целиком; фото без живой сессии (в том числе без записи о сессии) удаляются
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "DELETE FROM shipment_media_sessions WHERE updated_at < NOW() - %s * INTERVAL '1 second'",
+                    (max_age,),
+                )
+                cur.execute(
+                    """
+                    DELETE FROM shipment_media m WHERE NOT EXISTS (
+                        SELECT 1 FROM shipment_media_sessions s
+                        WHERE s.admin_id = m.admin_id AND s.cargo_code = m.cargo_code
+                    )
+                    """
+                )
+                return cur.rowcount
+    finally:
+        pool.putconn(conn)
+
+
+# --- Menu message registry (PostgreSQL mode) ---
+def get_menu_message(chat_id: int) -> Optional[Tuple[Optional[int], bool]]:
+    row = _fetchone("SELECT message_id, keyboard_removed FROM menu_messages WHERE chat_id=%s", (chat_id,))
+    if not row:
+        return None
+    return row[0], bool(row[1])
+
+
+def save_menu_message(chat_id: int, message_id: Optional[int], keyboard_removed: bool) -> None:
+    _execute(
+        """
+        INSERT INTO menu_messages (chat_id, message_id, keyboard_removed, updated_at) VALUES (%s, %s, %s, NOW())
+        ON CONFLICT (chat_id) DO UPDATE
+        SET message_id = EXCLUDED.message_id, keyboard_removed = EXCLUDED.keyboard_removed, updated_at = EXCLUDED.updated_at
+        """,
+        (chat_id, message_id, bool(keyboard_removed)),
+    )
@@ -0,0 +1,871 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple
+
+from storage import MAX_ROW_ID, keyset_page
+
+# Встроенная база SQLite: данные переживают перезапуск, отдельный сервер не нужен.
+# Подходит для небольших установок и staging. Включается через DB_ENGINE=sqlite,
+# путь к файлу — SQLITE_PATH. Функции повторяют database.py с теми же именами и семантикой.
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", "probuy.sqlite3")
+# Сколько миллисекунд ждать освобождения блокировки записи другим процессом (бот/API)
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "30000") or 30000)
+# UPDATE ... RETURNING (выдача кодов, счетчики) появился в SQLite 3.35; upsert и json_each — раньше
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+# Соединение на поток: sqlite3 кэширует подготовленные выражения внутри соединения,
+# поэтому все запросы ниже — постоянные строки с параметрами.
+_local = threading.local()
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "pid", None) != os.getpid():
+        conn = sqlite3.connect(
+            SQLITE_PATH,
+            timeout=SQLITE_BUSY_TIMEOUT / 1000,
+            isolation_level=None,
+            cached_statements=256,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+@contextmanager
+def _transaction(write: bool = False) -> Iterator[sqlite3.Connection]:
+    # BEGIN IMMEDIATE сразу берет блокировку записи: чтение-затем-запись не упадет с SQLITE_BUSY
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _execute(query: str, params: tuple = ()) -> int:
+    return _conn().execute(query, params).rowcount
+
+
+def _fetchone(query: str, params: tuple = ()) -> Optional[tuple]:
+    return _conn().execute(query, params).fetchone()
+
+
+def _fetchall(query: str, params: tuple = ()) -> List[tuple]:
+    return _conn().execute(query, params).fetchall()
+
+
+def _ts(dt: datetime) -> str:
+    # Время хранится строкой в UTC одного формата — строки сравниваются как даты
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _now() -> str:
+    return _ts(datetime.now(timezone.utc))
+
+
+def _days_ago(days: int) -> str:
+    return _ts(datetime.now(timezone.utc) - timedelta(days=int(days)))
+
+
+def _normalize_code(code: str) -> str:
+    # Те же правила миграции, что и в Postgres: любые коды -> EM03-xxxx (минимум 4 цифры)
+    if code.startswith("EM03-"):
+        return f"EM03-{int(code[5:]):04d}" if code[5:].isdigit() else code
+    digits = "".join(ch for ch in code if ch.isdigit())
+    return f"EM03-{int(digits):04d}" if digits else code
+
+
+def _check_sqlite_version() -> None:
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        raise RuntimeError(
+            f"DB_ENGINE=sqlite requires SQLite >= {'.'.join(map(str, MIN_SQLITE_VERSION))}, "
+            f"but Python is linked against SQLite {sqlite3.sqlite_version}. "
+            "Upgrade the system SQLite (or use a Python build with a newer one) or set DB_ENGINE=postgres."
+        )
+
+
+def init_db() -> None:
+    _check_sqlite_version()
+    conn = _conn()
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            code TEXT UNIQUE,
+            first_seen_at TEXT,
+            last_activity_at TEXT,
+            last_address_pressed_at TEXT,
+            last_sendcargo_pressed_at TEXT,
+            last_address_reminder_at TEXT,
+            last_sendcargo_reminder_at TEXT,
+            last_inactive_reminder_at TEXT
+        );
+        CREATE TABLE IF NOT EXISTS tracks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER REFERENCES users(user_id) ON DELETE CASCADE,
+            track TEXT NOT NULL,
+            delivery TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS track_photos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            track TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            uploaded_by INTEGER,
+            caption TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS recipients (
+            user_id INTEGER PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+            fio TEXT,
+            phone TEXT,
+            city TEXT,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS shipments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER REFERENCES users(user_id) ON DELETE CASCADE,
+            cargo_num INTEGER NOT NULL,
+            cargo_code TEXT NOT NULL,
+            fio TEXT,
+            phone TEXT,
+            city TEXT,
+            status TEXT,
+            status_updated_at TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (user_id, cargo_num)
+        );
+        CREATE TABLE IF NOT EXISTS blocked_users (
+            user_id INTEGER PRIMARY KEY,
+            banned_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            reason TEXT
+        );
+        -- Состояния FSM бота (fsm_storage.DatabaseStorage)
+        CREATE TABLE IF NOT EXISTS fsm_states (
+            chat_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}',
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (chat_id, user_id)
+        );
+        -- Фото незавершенных сессий /shipped
+        CREATE TABLE IF NOT EXISTS shipment_media (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            admin_id INTEGER NOT NULL,
+            cargo_code TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        -- Сессия /shipped: истекает целиком, когда в нее давно не добавляли фото
+        CREATE TABLE IF NOT EXISTS shipment_media_sessions (
+            admin_id INTEGER NOT NULL,
+            cargo_code TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (admin_id, cargo_code)
+        );
+        -- Экранное сообщение меню чата (show_menu_screen в bot.py)
+        CREATE TABLE IF NOT EXISTS menu_messages (
+            chat_id INTEGER PRIMARY KEY,
+            message_id INTEGER,
+            keyboard_removed INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL
+        );
+        -- Замена последовательности user_code_seq
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        """
+    )
+    _ensure_unique_tracks()
+    _ensure_indexes()
+
+    with _transaction(write=True) as conn:
+        max_num = 0
+        for user_id, code in conn.execute("SELECT user_id, code FROM users WHERE code IS NOT NULL").fetchall():
+            new_code = _normalize_code(code)
+            if new_code != code:
+                conn.execute("UPDATE users SET code=? WHERE user_id=?", (new_code, user_id))
+            if new_code.startswith("EM03-") and new_code[5:].isdigit():
+                max_num = max(max_num, int(new_code[5:]))
+        # Никогда не откатываем назад уже выданные номера
+        conn.execute(
+            """
+            INSERT INTO counters (name, value) VALUES ('user_code', ?)
+            ON CONFLICT (name) DO UPDATE SET value = MAX(counters.value, EXCLUDED.value)
+            """,
+            (max_num,),
+        )
+
+    if os.getenv("DB_EXPLAIN_ON_INIT", "").lower() in ("1", "true", "yes"):
+        explain_hot_queries()
+
+
+# Те же индексы, что и в Postgres: (имя, таблица, колонки)
+_HOT_INDEXES: List[Tuple[str, str, str]] = [
+    ("idx_tracks_user_id", "tracks", "user_id, id"),
+    ("idx_tracks_track", "tracks", "track"),
+    ("idx_track_photos_track", "track_photos", "track, id"),
+    ("idx_shipments_cargo_code", "shipments", "cargo_code"),
+    ("idx_shipments_user_status", "shipments", "user_id, status, id"),
+    ("idx_fsm_states_updated_at", "fsm_states", "updated_at"),
+    ("idx_shipment_media_session", "shipment_media", "admin_id, cargo_code, id"),
+    ("idx_shipment_media_sessions_updated_at", "shipment_media_sessions", "updated_at"),
+]
+
+_HOT_QUERIES: List[Tuple[str, str, tuple]] = [
+    ("get_tracks", "SELECT track, delivery FROM tracks WHERE user_id=? ORDER BY id ASC", (0,)),
+    ("find_user_ids_by_track", "SELECT user_id FROM tracks WHERE track=?", ("",)),
+    ("get_track_photos", "SELECT file_id FROM track_photos WHERE track=? ORDER BY id ASC", ("",)),
+    ("get_user_id_by_cargo_code", "SELECT user_id FROM shipments WHERE cargo_code=?", ("",)),
+    ("update_shipment_status", "UPDATE shipments SET status=?, status_updated_at=? WHERE cargo_code=?", ("", "", "")),
+    (
+        "list_user_shipments_by_status",
+        "SELECT cargo_code FROM shipments WHERE user_id=? AND status=? ORDER BY id ASC",
+        (0, ""),
+    ),
+    (
+        "get_tracks_page",
+        "SELECT id, track, delivery FROM tracks WHERE user_id=? AND id>? ORDER BY id ASC LIMIT ?",
+        (0, 0, 21),
+    ),
+    (
+        "list_user_shipments_page",
+        "SELECT id, cargo_code FROM shipments WHERE user_id=? AND status=? AND id>? ORDER BY id ASC LIMIT ?",
+        (0, "", 0, 21),
+    ),
+]
+
+
+def _ensure_unique_tracks() -> None:
+    # Миграция: пара (user_id, track) уникальна. Повторы схлопываются в самую раннюю строку
+    # (порядок истории сохраняется) с последним указанным способом доставки.
+    if _fetchone("SELECT 1 FROM sqlite_master WHERE type='index' AND name='uq_tracks_user_track'"):
+        return
+    with _transaction(write=True) as conn:
+        conn.execute(
+            """
+            UPDATE tracks
+            SET delivery = (
+                SELECT d.delivery FROM tracks d
+                WHERE d.user_id = tracks.user_id AND d.track = tracks.track AND COALESCE(d.delivery, '') <> ''
+                ORDER BY d.id DESC LIMIT 1
+            )
+            WHERE id IN (SELECT MIN(id) FROM tracks GROUP BY user_id, track HAVING COUNT(*) > 1)
+              AND EXISTS (
+                SELECT 1 FROM tracks d
+                WHERE d.user_id = tracks.user_id AND d.track = tracks.track AND COALESCE(d.delivery, '') <> ''
+              )
+            """
+        )
+        conn.execute("DELETE FROM tracks WHERE id NOT IN (SELECT MIN(id) FROM tracks GROUP BY user_id, track)")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_tracks_user_track ON tracks (user_id, track)")
+
+
+def _ensure_indexes() -> None:
+    conn = _conn()
+    for name, table, columns in _HOT_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def explain_hot_queries(verbose: bool = True) -> dict:
+    # В плане SQLite полный просмотр таблицы выглядит как строка "SCAN <таблица>" без индекса
+    plans: dict = {}
+    conn = _conn()
+    for name, query, params in _HOT_QUERIES:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+        plan = "\n".join(r[-1] for r in rows)
+        plans[name] = plan
+        if verbose:
+            print(f"--- {name}\n{plan}")
+        if any(line.startswith("SCAN ") and "INDEX" not in line for line in plan.splitlines()):
+            print(f"WARNING: {name} uses a sequential scan")
+    return plans
+
+
+def pool_stats() -> dict:
+    # Пула нет: у каждого потока свое соединение с файлом
+    return {}
+
+
+def get_user_code(user_id: int) -> Optional[str]:
+    row = _fetchone("SELECT code FROM users WHERE user_id=?", (user_id,))
+    return row[0] if row else None
+
+
+def _get_or_create_user_code_tx(conn: sqlite3.Connection, user_id: int) -> str:
+    row = conn.execute("SELECT code FROM users WHERE user_id=?", (user_id,)).fetchone()
+    if row and row[0]:
+        return row[0]
+    next_num = conn.execute(
+        "UPDATE counters SET value = value + 1 WHERE name='user_code' RETURNING value"
+    ).fetchone()[0]
+    return conn.execute(
+        """
+        INSERT INTO users (user_id, code) VALUES (?, ?)
+        ON CONFLICT (user_id) DO UPDATE SET code = COALESCE(users.code, EXCLUDED.code)
+        RETURNING code
+        """,
+        (user_id, f"EM03-{int(next_num):04d}"),
+    ).fetchone()[0]
+
+
+def get_or_create_user_code(user_id: int) -> str:
+    with _transaction(write=True) as conn:
+        return _get_or_create_user_code_tx(conn, user_id)
+
+
+# Повторная регистрация трека не создает строку, а обновляет способ доставки, если он указан
+_UPSERT_TRACK = (
+    "INSERT INTO tracks (user_id, track, delivery) VALUES (?, ?, ?) "
+    "ON CONFLICT (user_id, track) DO UPDATE SET delivery = excluded.delivery WHERE excluded.delivery <> ''"
+)
+
+
+def add_track(user_id: int, track: str, delivery: str = "") -> None:
+    _execute(_UPSERT_TRACK, (user_id, track, delivery))
+
+
+def get_tracks(user_id: int) -> List[Tuple[str, Optional[str]]]:
+    rows = _fetchall("SELECT track, delivery FROM tracks WHERE user_id=? ORDER BY id ASC", (user_id,))
+    return [(r[0], r[1]) for r in rows]
+
+
+def get_tracks_page(user_id: int, cursor: Optional[int] = None, backward: bool = False, limit: int = 20) -> dict:
+    # Страница треков по ключу id: {"items": [(id, track, delivery)], "next_cursor", "prev_cursor"}
+    if backward:
+        rows = _fetchall(
+            "SELECT id, track, delivery FROM tracks WHERE user_id=? AND id<? ORDER BY id DESC LIMIT ?",
+            (user_id, MAX_ROW_ID if cursor is None else cursor, limit + 1),
+        )
+    else:
+        rows = _fetchall(
+            "SELECT id, track, delivery FROM tracks WHERE user_id=? AND id>? ORDER BY id ASC LIMIT ?",
+            (user_id, cursor or 0, limit + 1),
+        )
+    return keyset_page([tuple(r) for r in rows], limit, cursor, backward)
+
+
+def add_track_photo(track: str, file_id: str, uploaded_by: Optional[int] = None, caption: Optional[str] = None) -> None:
+    _execute(
+        "INSERT INTO track_photos (track, file_id, uploaded_by, caption) VALUES (?, ?, ?, ?)",
+        (track, file_id, uploaded_by, caption),
+    )
+
+
+def get_track_photos(track: str) -> List[str]:
+    rows = _fetchall("SELECT file_id FROM track_photos WHERE track=? ORDER BY id ASC", (track,))
+    return [r[0] for r in rows]
+
+
+def get_photos_for_tracks(tracks: List[str]) -> dict:
+    # Список треков передается одним JSON-параметром, чтобы текст запроса не зависел от их числа
+    result: dict = {t: [] for t in tracks}
+    if not result:
+        return result
+    rows = _fetchall(
+        """
+        SELECT track, file_id FROM track_photos
+        WHERE track IN (SELECT value FROM json_each(?))
+        ORDER BY track, id ASC
+        """,
+        (json.dumps(list(result)),),
+    )
+    for track, file_id in rows:
+        result[track].append(file_id)
+    return result
+
+
+def find_user_ids_by_track(track: str) -> List[int]:
+    rows = _fetchall("SELECT user_id FROM tracks WHERE track=?", (track,))
+    return [r[0] for r in rows if r and r[0] is not None]
+
+
+def delete_all_user_tracks(user_id: int) -> int:
+    return _execute("DELETE FROM tracks WHERE user_id=?", (user_id,)) or 0
+
+
+def get_user_id_by_code(code: str) -> Optional[int]:
+    row = _fetchone("SELECT user_id FROM users WHERE code=?", (code,))
+    return row[0] if row else None
+
+
+def get_recipient(user_id: int) -> Optional[dict]:
+    row = _fetchone("SELECT fio, phone, city FROM recipients WHERE user_id=?", (user_id,))
+    if not row:
+        return None
+    fio, phone, city = row
+    return {"fio": (fio or "").strip(), "phone": (phone or "").strip(), "city": (city or "").strip()}
+
+
+def set_recipient(user_id: int, fio: str, phone: str, city: str) -> None:
+    _execute(
+        """
+        INSERT INTO recipients (user_id, fio, phone, city, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (user_id) DO UPDATE
+        SET fio = EXCLUDED.fio,
+            phone = EXCLUDED.phone,
+            city = EXCLUDED.city,
+            updated_at = EXCLUDED.updated_at
+        """,
+        (user_id, fio.strip(), phone.strip(), city.strip(), _now()),
+    )
+
+
+def get_next_cargo_num(user_id: int) -> int:
+    row = _fetchone("SELECT COALESCE(MAX(cargo_num), 0) + 1 FROM shipments WHERE user_id=?", (user_id,))
+    return int(row[0] if row and row[0] is not None else 1)
+
+
+def create_shipment(user_id: int, cargo_num: int, cargo_code: str, fio: str, phone: str, city: str, status: Optional[str] = None) -> int:
+    row = _fetchone(
+        """
+        INSERT INTO shipments (user_id, cargo_num, cargo_code, fio, phone, city, status, status_updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        RETURNING id
+        """,
+        (user_id, int(cargo_num), cargo_code, fio.strip(), phone.strip(), city.strip(), status, _now() if status else None),
+    )
+    return int(row[0])
+
+
+def get_user_id_by_cargo_code(cargo_code: str) -> Optional[int]:
+    row = _fetchone("SELECT user_id FROM shipments WHERE cargo_code=?", (cargo_code,))
+    return int(row[0]) if row and row[0] is not None else None
+
+
+def update_shipment_status(cargo_code: str, status: str) -> None:
+    _execute("UPDATE shipments SET status=?, status_updated_at=? WHERE cargo_code=?", (status, _now(), cargo_code))
+
+
+def list_user_shipments_by_status(user_id: int, status: str) -> List[str]:
+    rows = _fetchall(
+        "SELECT cargo_code FROM shipments WHERE user_id=? AND status=? ORDER BY id ASC",
+        (user_id, status),
+    )
+    return [r[0] for r in rows]
+
+
+def list_user_shipments_page(user_id: int, status: str, cursor: Optional[int] = None, backward: bool = False, limit: int = 20) -> dict:
+    # Страница грузов со статусом: {"items": [(id, cargo_code)], "next_cursor", "prev_cursor"}
+    if backward:
+        rows = _fetchall(
+            "SELECT id, cargo_code FROM shipments WHERE user_id=? AND status=? AND id<? ORDER BY id DESC LIMIT ?",
+            (user_id, status, MAX_ROW_ID if cursor is None else cursor, limit + 1),
+        )
+    else:
+        rows = _fetchall(
+            "SELECT id, cargo_code FROM shipments WHERE user_id=? AND status=? AND id>? ORDER BY id ASC LIMIT ?",
+            (user_id, status, cursor or 0, limit + 1),
+        )
+    return keyset_page([tuple(r) for r in rows], limit, cursor, backward)
+
+
+def delete_all_user_shipments(user_id: int) -> int:
+    return _execute("DELETE FROM shipments WHERE user_id=?", (user_id,)) or 0
+
+
+def count_user_shipments(user_id: int, status: Optional[str] = None) -> int:
+    # Со статусом счет идет по индексу idx_shipments_user_status
+    if status is None:
+        row = _fetchone("SELECT COUNT(*) FROM shipments WHERE user_id=?", (user_id,))
+    else:
+        row = _fetchone("SELECT COUNT(*) FROM shipments WHERE user_id=? AND status=?", (user_id, status))
+    return int(row[0]) if row and row[0] is not None else 0
+
+
+def get_profile_bundle(user_id: int, create_code: bool = False, photo_counts: bool = False) -> dict:
+    # Все данные профиля из одного снимка базы; при create_code — в транзакции записи
+    with _transaction(write=create_code) as conn:
+        row = conn.execute(
+            "SELECT code, EXISTS (SELECT 1 FROM blocked_users WHERE user_id=?) FROM (SELECT ? AS uid) p "
+            "LEFT JOIN users u ON u.user_id = p.uid",
+            (user_id, user_id),
+        ).fetchone()
+        code, blocked = row[0], bool(row[1])
+        code_created = not code and create_code and not blocked
+        if code_created:
+            code = _get_or_create_user_code_tx(conn, user_id)
+        tracks = [
+            (r[0], r[1])
+            for r in conn.execute("SELECT track, delivery FROM tracks WHERE user_id=? ORDER BY id ASC", (user_id,))
+        ]
+        rec = conn.execute("SELECT fio, phone, city FROM recipients WHERE user_id=?", (user_id,)).fetchone()
+        counts = {
+            str(status): int(cnt)
+            for status, cnt in conn.execute(
+                "SELECT COALESCE(status, ''), COUNT(*) FROM shipments WHERE user_id=? GROUP BY 1",
+                (user_id,),
+            )
+        }
+        next_cargo_num = conn.execute(
+            "SELECT COALESCE(MAX(cargo_num), 0) + 1 FROM shipments WHERE user_id=?", (user_id,)
+        ).fetchone()[0]
+        photos = None
+        if photo_counts:
+            photos = dict(
+                conn.execute(
+                    """
+                    SELECT track, COUNT(*) FROM track_photos
+                    WHERE track IN (SELECT track FROM tracks WHERE user_id=?)
+                    GROUP BY track
+                    """,
+                    (user_id,),
+                ).fetchall()
+            )
+    recipient = None
+    if rec:
+        recipient = {"fio": (rec[0] or "").strip(), "phone": (rec[1] or "").strip(), "city": (rec[2] or "").strip()}
+    bundle = {
+        "code": code,
+        "code_created": bool(code_created),
+        "blocked": blocked,
+        "tracks": tracks,
+        "recipient": recipient,
+        "shipments": counts,
+        "shipments_total": sum(counts.values()),
+        "next_cargo_num": int(next_cargo_num or 1),
+    }
+    if photos is not None:
+        bundle["photo_counts"] = {t: int(photos.get(t, 0)) for (t, _) in tracks}
+    return bundle
+
+
+def add_track_and_get_tracks(user_id: int, track: str, delivery: str = "") -> List[Tuple[str, Optional[str]]]:
+    with _transaction(write=True) as conn:
+        conn.execute(_UPSERT_TRACK, (user_id, track, delivery))
+        rows = conn.execute("SELECT track, delivery FROM tracks WHERE user_id=? ORDER BY id ASC", (user_id,)).fetchall()
+    return [(r[0], r[1]) for r in rows]
+
+
+def add_tracks_bulk(user_id: int, tracks: List[str], delivery: str = "") -> Tuple[List[str], List[str]]:
+    # Пакетная регистрация в одной транзакции: проверка существующих и upsert одним INSERT.
+    # Возвращает (добавленные, уже бывшие у пользователя); повторы во входном списке схлопываются.
+    unique = list(dict.fromkeys(tracks))
+    if not unique:
+        return [], []
+    with _transaction(write=True) as conn:
+        existing = {
+            r[0]
+            for r in conn.execute(
+                "SELECT track FROM tracks WHERE user_id=? AND track IN (SELECT value FROM json_each(?))",
+                (user_id, json.dumps(unique)),
+            )
+        }
+        conn.execute(
+            "INSERT INTO tracks (user_id, track, delivery) SELECT ?, value, ? FROM json_each(?) WHERE true ORDER BY key "
+            "ON CONFLICT (user_id, track) DO UPDATE SET delivery = excluded.delivery WHERE excluded.delivery <> ''",
+            (user_id, delivery, json.dumps(unique)),
+        )
+    return [t for t in unique if t not in existing], [t for t in unique if t in existing]
+
+
+# --- Admin / moderation (SQLite mode) ---
+def is_user_blocked(user_id: int) -> bool:
+    return _fetchone("SELECT 1 FROM blocked_users WHERE user_id=?", (int(user_id),)) is not None
+
+
+def list_blocked_user_ids() -> List[int]:
+    return [int(r[0]) for r in _fetchall("SELECT user_id FROM blocked_users")]
+
+
+def block_user(user_id: int, reason: Optional[str] = None) -> None:
+    _execute(
+        """
+        INSERT INTO blocked_users (user_id, reason, banned_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT (user_id) DO UPDATE
+        SET reason = EXCLUDED.reason,
+            banned_at = EXCLUDED.banned_at
+        """,
+        (int(user_id), reason, _now()),
+    )
+
+
+def unblock_user(user_id: int) -> None:
+    _execute("DELETE FROM blocked_users WHERE user_id=?", (int(user_id),))
+
+
+def delete_user_everything(user_id: int) -> dict:
+    with _transaction(write=True) as conn:
+        tracks_count = conn.execute("SELECT COUNT(*) FROM tracks WHERE user_id=?", (user_id,)).fetchone()[0]
+        shipments_count = conn.execute("SELECT COUNT(*) FROM shipments WHERE user_id=?", (user_id,)).fetchone()[0]
+        recipients_count = conn.execute("SELECT COUNT(*) FROM recipients WHERE user_id=?", (user_id,)).fetchone()[0]
+        deleted_photos = conn.execute(
+            "DELETE FROM track_photos WHERE track IN (SELECT track FROM tracks WHERE user_id=?)",
+            (user_id,),
+        ).rowcount
+        conn.execute("DELETE FROM blocked_users WHERE user_id=?", (user_id,))
+        # Треки, грузы и получатель удаляются каскадом (PRAGMA foreign_keys=ON)
+        deleted_users = conn.execute("DELETE FROM users WHERE user_id=?", (user_id,)).rowcount
+    return {
+        "deleted_tracks": int(tracks_count),
+        "deleted_photos": int(deleted_photos or 0),
+        "deleted_shipments": int(shipments_count),
+        "deleted_recipient": int(recipients_count),
+        "deleted_user": int(deleted_users or 0),
+    }
+
+
+# --- Reminders & activity (SQLite mode) ---
+def record_user_activity(user_id: int) -> None:
+    now = _now()
+    _execute(
+        """
+        INSERT INTO users (user_id, first_seen_at, last_activity_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT (user_id) DO UPDATE
+        SET last_activity_at = EXCLUDED.last_activity_at,
+            first_seen_at = COALESCE(users.first_seen_at, EXCLUDED.first_seen_at)
+        """,
+        (user_id, now, now),
+    )
+
+
+def mark_pressed_address(user_id: int) -> None:
+    now = _now()
+    _execute(
+        """
+        INSERT INTO users (user_id, first_seen_at, last_activity_at, last_address_pressed_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (user_id) DO UPDATE
+        SET last_activity_at = EXCLUDED.last_activity_at,
+            last_address_pressed_at = EXCLUDED.last_address_pressed_at,
+            first_seen_at = COALESCE(users.first_seen_at, EXCLUDED.first_seen_at)
+        """,
+        (user_id, now, now, now),
+    )
+
+
+def mark_pressed_sendcargo(user_id: int) -> None:
+    now = _now()
+    _execute(
+        """
+        INSERT INTO users (user_id, first_seen_at, last_activity_at, last_sendcargo_pressed_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (user_id) DO UPDATE
+        SET last_activity_at = EXCLUDED.last_activity_at,
+            last_sendcargo_pressed_at = EXCLUDED.last_sendcargo_pressed_at,
+            first_seen_at = COALESCE(users.first_seen_at, EXCLUDED.first_seen_at)
+        """,
+        (user_id, now, now, now),
+    )
+
+
+def flush_user_activity(entries: List[tuple]) -> None:
+    # entries: (user_id, first_seen_at, last_activity_at, address_pressed_at|None, sendcargo_pressed_at|None)
+    if not entries:
+        return
+    rows = [
+        (
+            user_id,
+            _ts(first_seen),
+            _ts(last_activity),
+            _ts(address_pressed) if address_pressed else None,
+            _ts(sendcargo_pressed) if sendcargo_pressed else None,
+        )
+        for user_id, first_seen, last_activity, address_pressed, sendcargo_pressed in entries
+    ]
+    with _transaction(write=True) as conn:
+        conn.executemany(
+            """
+            INSERT INTO users (user_id, first_seen_at, last_activity_at, last_address_pressed_at, last_sendcargo_pressed_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE
+            SET last_activity_at = MAX(COALESCE(users.last_activity_at, ''), EXCLUDED.last_activity_at),
+                last_address_pressed_at = COALESCE(EXCLUDED.last_address_pressed_at, users.last_address_pressed_at),
+                last_sendcargo_pressed_at = COALESCE(EXCLUDED.last_sendcargo_pressed_at, users.last_sendcargo_pressed_at),
+                first_seen_at = COALESCE(users.first_seen_at, EXCLUDED.first_seen_at)
+            """,
+            rows,
+        )
+
+
+def get_users_for_address_reminder(days: int = 5) -> List[int]:
+    rows = _fetchall(
+        """
+        SELECT user_id FROM users
+        WHERE first_seen_at IS NOT NULL
+          AND first_seen_at <= ?
+          AND last_address_pressed_at IS NULL
+          AND last_address_reminder_at IS NULL
+        """,
+        (_days_ago(days),),
+    )
+    return [int(r[0]) for r in rows]
+
+
+def get_users_for_sendcargo_reminder(days: int = 15) -> List[int]:
+    rows = _fetchall(
+        """
+        SELECT user_id FROM users
+        WHERE first_seen_at IS NOT NULL
+          AND first_seen_at <= ?
+          AND last_sendcargo_pressed_at IS NULL
+          AND last_sendcargo_reminder_at IS NULL
+        """,
+        (_days_ago(days),),
+    )
+    return [int(r[0]) for r in rows]
+
+
+def get_users_for_inactive_reminder(days: int = 30) -> List[int]:
+    rows = _fetchall(
+        """
+        SELECT user_id FROM users
+        WHERE last_activity_at IS NOT NULL
+          AND last_activity_at <= ?
+          AND (
+                last_inactive_reminder_at IS NULL
+             OR last_inactive_reminder_at < last_activity_at
+          )
+        """,
+        (_days_ago(days),),
+    )
+    return [int(r[0]) for r in rows]
+
+
+def mark_address_reminder_sent(user_id: int) -> None:
+    _execute("UPDATE users SET last_address_reminder_at=? WHERE user_id=?", (_now(), user_id))
+
+
+def mark_sendcargo_reminder_sent(user_id: int) -> None:
+    _execute("UPDATE users SET last_sendcargo_reminder_at=? WHERE user_id=?", (_now(), user_id))
+
+
+def mark_inactive_reminder_sent(user_id: int) -> None:
+    _execute("UPDATE users SET last_inactive_reminder_at=? WHERE user_id=?", (_now(), user_id))
+
+
+# --- Bot FSM states (SQLite mode) ---
+def get_fsm_state(chat_id: int, user_id: int, max_age: int = 0) -> Optional[Tuple[Optional[str], dict]]:
+    cutoff = _ts(datetime.now(timezone.utc) - timedelta(seconds=max_age)) if max_age else ""
+    row = _fetchone(
+        "SELECT state, data FROM fsm_states WHERE chat_id=? AND user_id=? AND updated_at > ?",
+        (chat_id, user_id, cutoff),
+    )
+    if not row:
+        return None
+    return row[0], json.loads(row[1] or "{}")
+
+
+def save_fsm_states(entries: List[tuple]) -> None:
+    # Пачка изменений одной транзакцией. entries: (chat_id, user_id, state|None, data);
+    # пустое состояние без данных удаляет запись
+    if not entries:
+        return
+    now = _now()
+    upserts = [(c, u, s, json.dumps(d, ensure_ascii=False, default=str), now) for c, u, s, d in entries if s or d]
+    deletes = [(c, u) for c, u, s, d in entries if not (s or d)]
+    with _transaction(write=True) as conn:
+        if upserts:
+            conn.executemany(
+                """
+                INSERT INTO fsm_states (chat_id, user_id, state, data, updated_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (chat_id, user_id) DO UPDATE
+                SET state = excluded.state, data = excluded.data, updated_at = excluded.updated_at
+                """,
+                upserts,
+            )
+        if deletes:
+            conn.executemany("DELETE FROM fsm_states WHERE chat_id=? AND user_id=?", deletes)
+
+
+def delete_expired_fsm_states(max_age: int) -> int:
+    cutoff = _ts(datetime.now(timezone.utc) - timedelta(seconds=max_age))
+    return _execute("DELETE FROM fsm_states WHERE updated_at < ?", (cutoff,))
+
+
+# --- Shipment media sessions (SQLite mode) ---
+def add_shipment_media(admin_id: int, cargo_code: str, file_ids: List[str], max_count: int = 0) -> Tuple[int, int]:
+    # Фото сессии /shipped одной транзакцией, не больше max_count в сессии (0 — без лимита).
+    # Возвращает (сколько фото принято, сколько их в сессии теперь). BEGIN IMMEDIATE
+    # сериализует параллельные вызовы, поэтому лимит не превышается.
+    now = _now()
+    with _transaction(write=True) as conn:
+        conn.execute(
+            """
+            INSERT INTO shipment_media_sessions (admin_id, cargo_code, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT (admin_id, cargo_code) DO UPDATE SET updated_at = excluded.updated_at
+            """,
+            (admin_id, cargo_code, now),
+        )
+        count = conn.execute(
+            "SELECT COUNT(*) FROM shipment_media WHERE admin_id=? AND cargo_code=?",
+            (admin_id, cargo_code),
+        ).fetchone()[0]
+        accepted = list(file_ids) if not max_count else list(file_ids)[:max(0, max_count - count)]
+        conn.executemany(
+            "INSERT INTO shipment_media (admin_id, cargo_code, file_id, created_at) VALUES (?, ?, ?, ?)",
+            [(admin_id, cargo_code, file_id, now) for file_id in accepted],
+        )
+    return len(accepted), int(count) + len(accepted)
+
+
+def get_shipment_media(admin_id: int, cargo_code: str, max_age: int = 0) -> List[str]:
+    # Фото сессии, если она не истекла: max_age считается от последнего добавления фото
+    cutoff = _ts(datetime.now(timezone.utc) - timedelta(seconds=max_age)) if max_age else ""
+    rows = _fetchall(
+        """
+        SELECT m.file_id FROM shipment_media_sessions s
+        JOIN shipment_media m ON m.admin_id = s.admin_id AND m.cargo_code = s.cargo_code
+        WHERE s.admin_id=? AND s.cargo_code=? AND s.updated_at > ?
+        ORDER BY m.id ASC
+        """,
+        (admin_id, cargo_code, cutoff),
+    )
+    return [r[0] for r in rows]
+
+
+def delete_shipment_media(admin_id: int, cargo_code: str) -> int:
+    with _transaction(write=True) as conn:
+        conn.execute("DELETE FROM shipment_media_sessions WHERE admin_id=? AND cargo_code=?", (admin_id, cargo_code))
+        return conn.execute("DELETE FROM shipment_media WHERE admin_id=? AND cargo_code=?", (admin_id, cargo_code)).rowcount
+
+
+def delete_expired_shipment_media(max_age: int) -> int:
+    # Сессия истекает целиком; фото без живой сессии (в том числе без записи о сессии) удаляются
+    cutoff = _ts(datetime.now(timezone.utc) - timedelta(seconds=max_age))
+    with _transaction(write=True) as conn:
+        conn.execute("DELETE FROM shipment_media_sessions WHERE updated_at < ?", (cutoff,))
+        return conn.execute(
+            """
+            DELETE FROM shipment_media WHERE NOT EXISTS (
+                SELECT 1 FROM shipment_media_sessions s
+                WHERE s.admin_id = shipment_media.admin_id AND s.cargo_code = shipment_media.cargo_code
+            )
+            """
+        ).rowcount
+
+
+# --- Menu message registry (SQLite mode) ---
+def get_menu_message(chat_id: int) -> Optional[Tuple[Optional[int], bool]]:
+    row = _fetchone("SELECT message_id, keyboard_removed FROM menu_messages WHERE chat_id=?", (chat_id,))
+    if not row:
+        return None
+    return row[0], bool(row[1])
+
+
+def save_menu_message(chat_id: int, message_id: Optional[int], keyboard_removed: bool) -> None:
+    _execute(
+        """
+        INSERT INTO menu_messages (chat_id, message_id, keyboard_removed, updated_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (chat_id) DO UPDATE
+        SET message_id = excluded.message_id, keyboard_removed = excluded.keyboard_removed, updated_at = excluded.updated_at
+        """,
+        (chat_id, message_id, int(bool(keyboard_removed)), _now()),
+    )
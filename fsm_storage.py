@@ -0,0 +1,169 @@
+import os
+import asyncio
+import copy
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from aiogram.dispatcher.storage import BaseStorage
+
+from database_async import delete_expired_fsm_states, get_fsm_state, save_fsm_states
+
+# Хранилище состояний FSM бота в базе проекта (таблица fsm_states, DB_ENGINE=postgres/sqlite):
+# незавершенные сценарии переживают перезапуск, а несколько воркеров бота видят одни и те же состояния.
+# Горячие состояния держим в памяти: запись сразу видна в памяти и ставится в очередь,
+# очередь пишется в базу одной пачкой раз в FSM_FLUSH_INTERVAL секунд и при остановке.
+# Состояние, не менявшееся FSM_STATE_TTL секунд, считается брошенным и удаляется.
+
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000") or 10000)
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", "1") or 1)
+FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", str(24 * 3600)) or 0)
+# Как часто чистить брошенные состояния в базе
+FSM_PURGE_INTERVAL = float(os.getenv("FSM_PURGE_INTERVAL", "3600") or 3600)
+
+logger = logging.getLogger("fsm_storage")
+
+
+class DatabaseStorage(BaseStorage):
+    """aiogram FSM storage backed by the project database with an in-memory hot layer."""
+
+    def __init__(
+        self,
+        cache_size: int = FSM_CACHE_SIZE,
+        flush_interval: float = FSM_FLUSH_INTERVAL,
+        ttl: int = FSM_STATE_TTL,
+    ):
+        self._cache_size = cache_size
+        self._flush_interval = flush_interval
+        self._ttl = ttl
+        # (chat, user) -> [state, data, expires_at]
+        self._cache: "OrderedDict[Tuple[int, int], list]" = OrderedDict()
+        # (chat, user) -> (state, data), еще не записанные в базу
+        self._dirty: Dict[Tuple[int, int], tuple] = {}
+        # (chat, user) -> (state, data), которые сейчас пишутся в базу: до конца записи
+        # в базе может лежать старая версия, читать ее нельзя
+        self._inflight: Dict[Tuple[int, int], tuple] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+
+    def _key(self, chat, user) -> Tuple[int, int]:
+        chat, user = self.check_address(chat=chat, user=user)
+        return int(chat), int(user)
+
+    def _expires_at(self) -> float:
+        return time.time() + self._ttl if self._ttl else float("inf")
+
+    def _remember(self, key: Tuple[int, int], state: Optional[str], data: dict) -> list:
+        entry = [state, data, self._expires_at()]
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            # Вытесненная запись с несохраненными изменениями остается в _dirty/_inflight и читается оттуда
+            self._cache.popitem(last=False)
+        return entry
+
+    async def _entry(self, key: Tuple[int, int]) -> list:
+        entry = self._cache.get(key)
+        if entry is not None:
+            if entry[2] > time.time():
+                self._cache.move_to_end(key)
+                return entry
+            return self._remember(key, None, {})
+        pending = self._dirty.get(key) or self._inflight.get(key)
+        if pending is not None:
+            return self._remember(key, pending[0], pending[1])
+        row = await get_fsm_state(key[0], key[1], self._ttl)
+        # Пока шел запрос, состояние могли записать — запись новее прочитанного
+        entry = self._cache.get(key)
+        if entry is not None:
+            return entry
+        state, data = row if row else (None, {})
+        return self._remember(key, state, data)
+
+    def _write(self, key: Tuple[int, int], state: Optional[str], data: dict) -> None:
+        self._remember(key, state, data)
+        self._dirty[key] = (state, data)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def get_state(self, *, chat=None, user=None, default: Optional[str] = None) -> Optional[str]:
+        entry = await self._entry(self._key(chat, user))
+        return entry[0] if entry[0] is not None else self.resolve_state(default)
+
+    async def get_data(self, *, chat=None, user=None, default: Optional[dict] = None) -> Dict:
+        entry = await self._entry(self._key(chat, user))
+        return copy.deepcopy(entry[1] if entry[1] or default is None else default)
+
+    async def set_state(self, *, chat=None, user=None, state=None) -> None:
+        key = self._key(chat, user)
+        entry = await self._entry(key)
+        self._write(key, self.resolve_state(state), entry[1])
+
+    async def set_data(self, *, chat=None, user=None, data: Optional[dict] = None) -> None:
+        key = self._key(chat, user)
+        entry = await self._entry(key)
+        self._write(key, entry[0], copy.deepcopy(data or {}))
+
+    async def update_data(self, *, chat=None, user=None, data: Optional[dict] = None, **kwargs) -> None:
+        key = self._key(chat, user)
+        entry = await self._entry(key)
+        new_data = copy.deepcopy(entry[1])
+        new_data.update(data or {}, **kwargs)
+        self._write(key, entry[0], new_data)
+
+    async def reset_state(self, *, chat=None, user=None, with_data: bool = True) -> None:
+        key = self._key(chat, user)
+        entry = await self._entry(key)
+        self._write(key, None, {} if with_data else entry[1])
+
+    async def flush(self) -> None:
+        if self._dirty:
+            pending, self._dirty = self._dirty, {}
+            self._inflight.update(pending)
+            try:
+                await save_fsm_states([(chat, user, state, data) for (chat, user), (state, data) in pending.items()])
+            except BaseException as e:
+                if isinstance(e, Exception):
+                    logger.exception("Failed to flush FSM states: %s", e)
+                # Возвращаем в очередь всё, что не перезаписано более свежими изменениями
+                for key, value in pending.items():
+                    self._dirty.setdefault(key, value)
+                if not isinstance(e, Exception):
+                    raise
+            finally:
+                for key, value in pending.items():
+                    if self._inflight.get(key) is value:
+                        del self._inflight[key]
+        if self._ttl and time.monotonic() - self._last_purge >= FSM_PURGE_INTERVAL:
+            self._last_purge = time.monotonic()
+            try:
+                await delete_expired_fsm_states(self._ttl)
+            except Exception as e:
+                logger.exception("Failed to purge FSM states: %s", e)
+            now = time.time()
+            for key in [k for k, entry in self._cache.items() if entry[2] <= now]:
+                del self._cache[key]
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            # Дождаться отмены: прерванная запись вернет свои состояния в очередь до последнего flush
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def wait_closed(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"cached": len(self._cache), "pending": len(self._dirty), "inflight": len(self._inflight)}
+
@@ -0,0 +1,379 @@
+import os
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+logger = logging.getLogger("photo_proxy")
+
+# Прокси фотографий Telegram для Mini App.
+# file_id -> file_path кэшируется (ссылка на скачивание живет не меньше часа),
+# сами файлы небольшого размера складываются на диск с вытеснением по общему объему.
+# Содержимое файла для file_id не меняется, поэтому ETag строится от file_id.
+
+
+class _FilePathCache:
+    # LRU с TTL: file_id -> file_path
+
+    def __init__(self, max_items: int, ttl: float):
+        self._max_items = max(1, max_items)
+        self._ttl = ttl
+        self._items: "OrderedDict[str, Tuple[str, Optional[int], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_id: str) -> Optional[Tuple[str, Optional[int]]]:
+        item = self._items.get(file_id)
+        if item is None or time.monotonic() - item[2] >= self._ttl:
+            if item is not None:
+                del self._items[file_id]
+            self.misses += 1
+            return None
+        self._items.move_to_end(file_id)
+        self.hits += 1
+        return item[0], item[1]
+
+    def put(self, file_id: str, file_path: str, file_size: Optional[int]) -> None:
+        self._items[file_id] = (file_path, file_size, time.monotonic())
+        self._items.move_to_end(file_id)
+        while len(self._items) > self._max_items:
+            self._items.popitem(last=False)
+
+    def invalidate(self, file_id: str) -> None:
+        self._items.pop(file_id, None)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class _DiskCache:
+    # Файлы в каталоге, имя — sha1(file_id). Тип содержимого хранится во втором файле рядом.
+    # Вытесняются давно не запрошенные, когда общий объем превышает max_bytes.
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._loaded = False
+        # read/write вызываются из потоков (asyncio.to_thread)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _load(self) -> None:
+        # Восстанавливаем индекс после перезапуска: порядок по времени последнего доступа
+        if self._loaded:
+            return
+        self._loaded = True
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".type") or name.endswith(".tmp"):
+                continue
+            try:
+                st = os.stat(self._path(name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._total += size
+        self._evict()
+
+    def _remove(self, key: str) -> None:
+        size = self._index.pop(key, 0)
+        self._total -= size
+        for path in (self._path(key), self._path(key) + ".type"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and self._index:
+            key = next(iter(self._index))
+            self._remove(key)
+            self.evictions += 1
+
+    def read(self, key: str) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            return self._read(key)
+
+    def write(self, key: str, content: bytes, content_type: str) -> None:
+        with self._lock:
+            self._write(key, content, content_type)
+
+    def _read(self, key: str) -> Optional[Tuple[bytes, str]]:
+        self._load()
+        if key not in self._index:
+            self.misses += 1
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                content = f.read()
+            try:
+                with open(self._path(key) + ".type", "r", encoding="utf-8") as f:
+                    content_type = f.read().strip() or "application/octet-stream"
+            except OSError:
+                content_type = "application/octet-stream"
+            os.utime(self._path(key))
+        except OSError:
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._index.move_to_end(key)
+        self.hits += 1
+        return content, content_type
+
+    def _write(self, key: str, content: bytes, content_type: str) -> None:
+        self._load()
+        if len(content) > self.max_bytes:
+            return
+        tmp = self._path(key) + ".tmp"
+        try:
+            with open(self._path(key) + ".type", "w", encoding="utf-8") as f:
+                f.write(content_type)
+            with open(tmp, "wb") as f:
+                f.write(content)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            logger.warning("Photo cache write failed: %s", e)
+            return
+        self._total -= self._index.pop(key, 0)
+        self._index[key] = len(content)
+        self._total += len(content)
+        self._evict()
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self._index),
+            "bytes": self._total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    # Поддерживается один диапазон bytes=start-end; None — отдать файл целиком
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_s, _, end_s = header[6:].strip().partition("-")
+    try:
+        if start_s:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+        else:
+            # bytes=-N — последние N байт
+            start = max(size - int(end_s), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+class TelegramPhotoProxy:
+    def __init__(
+        self,
+        bot_token: str,
+        path_cache_size: int = 5000,
+        path_cache_ttl: float = 3000.0,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: int = 200 * 1024 * 1024,
+        cache_max_file: int = 10 * 1024 * 1024,
+        max_age: int = 7 * 24 * 3600,
+        connections: int = 20,
+    ):
+        self._bot_token = bot_token
+        self._paths = _FilePathCache(path_cache_size, path_cache_ttl)
+        self._disk = _DiskCache(cache_dir or os.path.join(tempfile.gettempdir(), "probuy_photos"), cache_max_bytes)
+        self._max_file = cache_max_file
+        self._max_age = max_age
+        self._connections = connections
+        self._client: Optional[httpx.AsyncClient] = None
+        # Параллельные запросы одного и того же файла ждут одну загрузку
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def from_env(cls, bot_token: str) -> "TelegramPhotoProxy":
+        return cls(
+            bot_token,
+            path_cache_size=int(os.getenv("PHOTO_PATH_CACHE_SIZE", "5000") or 5000),
+            path_cache_ttl=float(os.getenv("PHOTO_PATH_CACHE_TTL", "3000") or 3000),
+            cache_dir=os.getenv("PHOTO_CACHE_DIR") or None,
+            cache_max_bytes=int(os.getenv("PHOTO_CACHE_MAX_BYTES", str(200 * 1024 * 1024)) or 0),
+            cache_max_file=int(os.getenv("PHOTO_CACHE_MAX_FILE", str(10 * 1024 * 1024)) or 0),
+            max_age=int(os.getenv("PHOTO_CACHE_MAX_AGE", str(7 * 24 * 3600)) or 0),
+            connections=int(os.getenv("PHOTO_HTTP_CONNECTIONS", "20") or 20),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=30,
+                limits=httpx.Limits(max_connections=self._connections, max_keepalive_connections=self._connections),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _headers(self, etag: str) -> Dict[str, str]:
+        return {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={self._max_age}, immutable",
+            "Accept-Ranges": "bytes",
+        }
+
+    async def _resolve(self, file_id: str) -> Tuple[str, Optional[int]]:
+        cached = self._paths.get(file_id)
+        if cached is not None:
+            return cached
+        try:
+            r = await self.client.get(
+                f"https://api.telegram.org/bot{self._bot_token}/getFile", params={"file_id": file_id}
+            )
+            data = r.json()
+        except (httpx.HTTPError, ValueError):
+            raise HTTPException(status_code=502, detail="Telegram is unavailable")
+        if not data.get("ok"):
+            raise HTTPException(status_code=404, detail="File not found")
+        file_path = data["result"].get("file_path")
+        if not file_path:
+            raise HTTPException(status_code=404, detail="No file_path")
+        file_size = data["result"].get("file_size")
+        self._paths.put(file_id, file_path, file_size)
+        return file_path, file_size
+
+    def _file_url(self, file_path: str) -> str:
+        return f"https://api.telegram.org/file/bot{self._bot_token}/{file_path}"
+
+    async def _download(self, file_id: str) -> Tuple[bytes, str]:
+        file_path, _ = await self._resolve(file_id)
+        try:
+            r = await self.client.get(self._file_url(file_path))
+            if r.status_code == 404:
+                # Ссылка устарела раньше TTL — запрашиваем file_path заново
+                self._paths.invalidate(file_id)
+                file_path, _ = await self._resolve(file_id)
+                r = await self.client.get(self._file_url(file_path))
+        except httpx.HTTPError:
+            raise HTTPException(status_code=502, detail="Telegram is unavailable")
+        if r.status_code != 200:
+            raise HTTPException(status_code=404, detail="File not found")
+        return r.content, r.headers.get("Content-Type", "application/octet-stream")
+
+    async def _fetch(self, key: str, file_id: str) -> Tuple[bytes, str]:
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            content, content_type = await self._download(file_id)
+            if len(content) <= self._max_file:
+                await asyncio.to_thread(self._disk.write, key, content, content_type)
+            future.set_result((content, content_type))
+            return content, content_type
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _stream(self, file_id: str, request: Request, headers: Dict[str, str]) -> Response:
+        # Большие файлы не кэшируем: отдаем потоком, Range пробрасываем в Telegram
+        file_path, _ = await self._resolve(file_id)
+        upstream_headers = {}
+        if request.headers.get("range"):
+            upstream_headers["Range"] = request.headers["range"]
+        req = self.client.build_request("GET", self._file_url(file_path), headers=upstream_headers)
+        try:
+            upstream = await self.client.send(req, stream=True)
+        except httpx.HTTPError:
+            raise HTTPException(status_code=502, detail="Telegram is unavailable")
+        if upstream.status_code not in (200, 206):
+            await upstream.aclose()
+            if upstream.status_code == 404:
+                self._paths.invalidate(file_id)
+            raise HTTPException(status_code=404, detail="File not found")
+        for name in ("Content-Length", "Content-Range"):
+            if name in upstream.headers:
+                headers[name] = upstream.headers[name]
+        return StreamingResponse(
+            upstream.aiter_raw(),
+            status_code=upstream.status_code,
+            headers=headers,
+            media_type=upstream.headers.get("Content-Type", "application/octet-stream"),
+            # Соединение возвращается в пул и при обрыве клиента
+            background=BackgroundTask(upstream.aclose),
+        )
+
+    async def respond(self, file_id: str, request: Request) -> Response:
+        key = hashlib.sha1(file_id.encode("utf-8")).hexdigest()
+        etag = f'"{key}"'
+        headers = self._headers(etag)
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+
+        cached = await asyncio.to_thread(self._disk.read, key) if self._disk.enabled else None
+        if cached is None:
+            _, file_size = await self._resolve(file_id)
+            if not self._disk.enabled or (file_size or 0) > self._max_file:
+                return await self._stream(file_id, request, headers)
+            cached = await self._fetch(key, file_id)
+        content, content_type = cached
+        byte_range = None
+        if_range = request.headers.get("if-range")
+        if not if_range or if_range.strip() == etag:
+            byte_range = _parse_range(request.headers.get("range"), len(content))
+        if byte_range is None:
+            return Response(content=content, media_type=content_type, headers=headers)
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(content)}"
+        return Response(content=content[start:end + 1], status_code=206, media_type=content_type, headers=headers)
+
+    def stats(self) -> dict:
+        return {
+            "paths_cached": len(self._paths),
+            "path_hits": self._paths.hits,
+            "path_misses": self._paths.misses,
+            "disk": self._disk.stats(),
+        }
+
+
+_proxy: Optional[TelegramPhotoProxy] = None
+
+
+def get_photo_proxy(bot_token: str) -> TelegramPhotoProxy:
+    global _proxy
+    if _proxy is None:
+        _proxy = TelegramPhotoProxy.from_env(bot_token)
+    return _proxy
@@ -0,0 +1,265 @@
+import os
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from aiogram.utils import exceptions as tg_exceptions
+except Exception:
+    tg_exceptions = None  # type: ignore
+
+logger = logging.getLogger("sender")
+
+# Рассылка сообщений в Telegram с соблюдением лимитов:
+# общий лимит ~30 сообщений/с на бота, не чаще 1 сообщения/с в один чат,
+# ожидание по RetryAfter (429) и повторы при сетевых ошибках.
+
+SendFactory = Callable[[], Awaitable[Any]]
+
+if tg_exceptions is not None:
+    _RETRY_AFTER: Tuple[type, ...] = (tg_exceptions.RetryAfter,)
+    # Ошибки, которые не исправятся повтором: бот заблокирован, чат не найден, неверный запрос
+    _PERMANENT: Tuple[type, ...] = (tg_exceptions.Unauthorized, tg_exceptions.BadRequest)
+    _TRANSIENT: Tuple[type, ...] = (tg_exceptions.NetworkError, tg_exceptions.TelegramAPIError, asyncio.TimeoutError)
+else:
+    _RETRY_AFTER = ()
+    _PERMANENT = ()
+    _TRANSIENT = (asyncio.TimeoutError,)
+
+
+@dataclass
+class DeliveryReport:
+    sent: List[int] = field(default_factory=list)
+    failed: Dict[int, str] = field(default_factory=dict)
+
+    @property
+    def sent_count(self) -> int:
+        return len(self.sent)
+
+    @property
+    def failed_count(self) -> int:
+        return len(self.failed)
+
+
+class _Job:
+    __slots__ = ("chat_id", "factory", "future", "attempts", "metered")
+
+    def __init__(self, chat_id: int, factory: SendFactory, future: asyncio.Future, metered: bool = False):
+        self.chat_id = chat_id
+        self.factory = factory
+        self.future = future
+        self.attempts = 0
+        self.metered = metered
+
+
+class _TokenBucket:
+    def __init__(self, rate: float):
+        self._rate = max(rate, 0.1)
+        self._capacity = max(self._rate, 1.0)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        # До этого момента отправка приостановлена целиком (RetryAfter)
+        self.paused_until = 0.0
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class OutboundSender:
+    """Shared worker pool for outgoing bot messages.
+
+    Jobs for the same chat run one at a time in submission order; different
+    chats are served concurrently by up to ``workers`` tasks.
+    """
+
+    def __init__(
+        self,
+        workers: int = 8,
+        global_rate: float = 30.0,
+        per_chat_interval: float = 1.0,
+        max_retries: int = 3,
+        base_backoff: float = 1.0,
+    ):
+        self._workers_count = max(1, workers)
+        self._bucket = _TokenBucket(global_rate)
+        self._per_chat_interval = per_chat_interval
+        self._max_retries = max_retries
+        self._base_backoff = base_backoff
+        self._pending: Dict[int, Deque[_Job]] = {}
+        self._chat_next: Dict[int, float] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rate_limited = 0
+
+    @classmethod
+    def from_env(cls) -> "OutboundSender":
+        return cls(
+            workers=int(os.getenv("SEND_WORKERS", "8") or 8),
+            global_rate=float(os.getenv("SEND_RATE", "30") or 30),
+            per_chat_interval=float(os.getenv("SEND_CHAT_INTERVAL", "1") or 0),
+            max_retries=int(os.getenv("SEND_MAX_RETRIES", "3") or 0),
+        )
+
+    def _ensure_started(self) -> None:
+        if self._ready is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._ready = asyncio.Queue()
+        self._workers = [loop.create_task(self._worker()) for _ in range(self._workers_count)]
+
+    def _schedule(self, chat_id: int) -> None:
+        delay = self._chat_next.get(chat_id, 0.0) - time.monotonic()
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._ready.put_nowait, chat_id)
+        else:
+            self._ready.put_nowait(chat_id)
+
+    def submit(self, chat_id: int, factory: SendFactory, metered: bool = False) -> asyncio.Future:
+        # factory — функция без аргументов, возвращающая корутину отправки.
+        # Обычная задача — один вызов Bot API и один токен общего лимита. metered=True — задача
+        # из нескольких вызовов: токен перед каждым вызовом берет она сама через throttle().
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        # Результат могут не ждать (уведомление «в фоне») — не даем asyncio ругаться на непрочитанную ошибку
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        job = _Job(int(chat_id), factory, future, metered)
+        queue = self._pending.get(job.chat_id)
+        if queue is None:
+            self._pending[job.chat_id] = deque([job])
+            self._schedule(job.chat_id)
+        else:
+            queue.append(job)
+        return future
+
+    def submit_many(self, jobs: Iterable[Tuple[int, SendFactory]], metered: bool = False) -> List[Tuple[int, asyncio.Future]]:
+        return [(chat_id, self.submit(chat_id, factory, metered)) for chat_id, factory in jobs]
+
+    async def throttle(self) -> None:
+        # Токен общего лимита на один вызов Bot API внутри задачи с metered=True
+        await self._bucket.acquire()
+
+    async def deliver_many(self, jobs: Iterable[Tuple[int, SendFactory]]) -> DeliveryReport:
+        return await self.collect(self.submit_many(jobs))
+
+    @staticmethod
+    async def collect(submitted: List[Tuple[int, asyncio.Future]]) -> DeliveryReport:
+        report = DeliveryReport()
+        for chat_id, future in submitted:
+            try:
+                await future
+                report.sent.append(chat_id)
+            except Exception as e:
+                report.failed[chat_id] = f"{type(e).__name__}: {e}"
+        return report
+
+    def _requeue(self, job: _Job, delay: float) -> None:
+        self._pending[job.chat_id].appendleft(job)
+        self._chat_next[job.chat_id] = time.monotonic() + delay
+        self._schedule(job.chat_id)
+
+    async def _worker(self) -> None:
+        while True:
+            chat_id = await self._ready.get()
+            queue = self._pending.get(chat_id)
+            if not queue:
+                self._pending.pop(chat_id, None)
+                continue
+            job = queue.popleft()
+            if not job.metered:
+                await self._bucket.acquire()
+            job.attempts += 1
+            try:
+                result = await job.factory()
+            except _RETRY_AFTER as e:
+                timeout = float(getattr(e, "timeout", 1) or 1)
+                self.rate_limited += 1
+                logger.warning("Telegram flood control: retry after %ss (chat %s)", timeout, chat_id)
+                self._bucket.paused_until = max(self._bucket.paused_until, time.monotonic() + timeout)
+                self._requeue(job, timeout)
+                continue
+            except _PERMANENT as e:
+                self._fail(job, e)
+            except _TRANSIENT as e:
+                if job.attempts > self._max_retries:
+                    self._fail(job, e)
+                else:
+                    self.retried += 1
+                    backoff = self._base_backoff * (2 ** (job.attempts - 1))
+                    self._requeue(job, backoff + random.uniform(0, backoff / 2))
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._fail(job, e)
+            else:
+                self.sent += 1
+                if not job.future.done():
+                    job.future.set_result(result)
+            self._chat_next[chat_id] = time.monotonic() + self._per_chat_interval
+            if queue:
+                self._schedule(chat_id)
+            else:
+                self._pending.pop(chat_id, None)
+                self._prune_chat_next()
+
+    def _fail(self, job: _Job, error: BaseException) -> None:
+        self.failed += 1
+        if not job.future.done():
+            job.future.set_exception(error)
+
+    def _prune_chat_next(self) -> None:
+        if len(self._chat_next) < 10000:
+            return
+        now = time.monotonic()
+        for chat_id in [c for c, t in self._chat_next.items() if t <= now]:
+            del self._chat_next[chat_id]
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "rate_limited": self.rate_limited,
+            "pending_chats": len(self._pending),
+        }
+
+    async def close(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._ready = None
+        for queue in self._pending.values():
+            for job in queue:
+                if not job.future.done():
+                    job.future.cancel()
+        self._pending.clear()
+
+
+_sender: Optional[OutboundSender] = None
+
+
+def get_sender() -> OutboundSender:
+    global _sender
+    if _sender is None:
+        _sender = OutboundSender.from_env()
+    return _sender
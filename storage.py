@@ -0,0 +1,485 @@
+import os
+import importlib
+import threading
+import time
+from collections import OrderedDict
+from types import ModuleType
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# Слой хранилища: единый интерфейс Storage и реестр реализаций.
+# Реализация выбирается через DB_ENGINE (memory / sqlite / postgres) или set_storage()
+# во время работы. database.py и database_async.py вызывают методы текущего хранилища.
+
+DEV_MODE = os.getenv("DEV_MODE", "").lower() in ("1", "true", "yes", "dev")
+# memory — данные в памяти (по умолчанию в DEV_MODE), sqlite — файл SQLITE_PATH,
+# postgres — DATABASE_URL (по умолчанию)
+DB_ENGINE = os.getenv("DB_ENGINE", "").strip().lower() or ("memory" if DEV_MODE else "postgres")
+
+# Операции хранилища — имена функций database.py
+OPERATIONS: Tuple[str, ...] = (
+    "init_db",
+    "explain_hot_queries",
+    "pool_stats",
+    "blocklist_cache_stats",
+    "profile_cache_stats",
+    # codes / tracks / photos
+    "get_user_code",
+    "get_or_create_user_code",
+    "add_track",
+    "get_tracks",
+    "add_track_photo",
+    "get_track_photos",
+    "get_photos_for_tracks",
+    "get_tracks_page",
+    "find_user_ids_by_track",
+    "delete_all_user_tracks",
+    "get_user_id_by_code",
+    # recipients / shipments
+    "get_recipient",
+    "set_recipient",
+    "get_next_cargo_num",
+    "create_shipment",
+    "get_user_id_by_cargo_code",
+    "update_shipment_status",
+    "list_user_shipments_by_status",
+    "list_user_shipments_page",
+    "delete_all_user_shipments",
+    "count_user_shipments",
+    "get_profile_bundle",
+    "add_track_and_get_tracks",
+    "add_tracks_bulk",
+    # admin
+    "is_user_blocked",
+    "list_blocked_user_ids",
+    "block_user",
+    "unblock_user",
+    "delete_user_everything",
+    # reminders / activity
+    "record_user_activity",
+    "mark_pressed_address",
+    "mark_pressed_sendcargo",
+    "flush_user_activity",
+    "get_users_for_address_reminder",
+    "get_users_for_sendcargo_reminder",
+    "get_users_for_inactive_reminder",
+    "mark_address_reminder_sent",
+    "mark_sendcargo_reminder_sent",
+    "mark_inactive_reminder_sent",
+    # bot FSM states
+    "get_fsm_state",
+    "save_fsm_states",
+    "delete_expired_fsm_states",
+    # shipment media sessions (/shipped)
+    "add_shipment_media",
+    "get_shipment_media",
+    "delete_shipment_media",
+    "delete_expired_shipment_media",
+    # menu message registry (show_menu_screen)
+    "get_menu_message",
+    "save_menu_message",
+)
+
+# Курсор постраничных выборок — id последней/первой строки страницы.
+# Без курсора выборка идёт с начала (вперёд) или с конца (назад).
+MAX_ROW_ID = 2 ** 63 - 1
+
+
+def keyset_page(rows: list, limit: int, cursor: Optional[int], backward: bool) -> dict:
+    # rows — не больше limit + 1 строк с id первым полем, в порядке обхода (назад — по убыванию id).
+    # Лишняя строка означает, что дальше в направлении обхода есть ещё данные.
+    more = len(rows) > limit
+    items = list(rows[:limit])
+    if backward:
+        items.reverse()
+    if not items:
+        return {"items": [], "next_cursor": None, "prev_cursor": None}
+    if backward:
+        has_prev, has_next = more, cursor is not None
+    else:
+        has_prev, has_next = cursor is not None, more
+    return {
+        "items": items,
+        "next_cursor": items[-1][0] if has_next else None,
+        "prev_cursor": items[0][0] if has_prev else None,
+    }
+
+
+class Storage:
+    """Storage backend interface.
+
+    Every name in OPERATIONS is a method with the signature and semantics of the
+    function of the same name in database.py. ``inline`` is True for backends that
+    never block on I/O, so the async layer may call them on the event loop.
+    """
+
+    name = "base"
+    inline = False
+
+    def invalidate_user(self, user_id: int) -> None:
+        # Сбросить закэшированные данные пользователя (изменены в другом процессе)
+        pass
+
+    def missing_operations(self) -> List[str]:
+        return [op for op in OPERATIONS if not callable(getattr(type(self), op, None)) and op not in vars(self)]
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name}>"
+
+
+class ModuleStorage(Storage):
+    # Реализация, записанная функциями модуля (database_memory, database_sqlite, database_postgres)
+
+    def __init__(self, name: str, module: ModuleType, inline: bool = False):
+        self.name = name
+        self.inline = inline
+        self.module = module
+        for op in OPERATIONS:
+            fn = getattr(module, op, None)
+            if fn is not None:
+                setattr(self, op, fn)
+
+
+# Кэш профиля пользователя (код, треки, получатель) в памяти процесса.
+# PROFILE_CACHE=0 отключает кэш; TTL ограничивает устаревание при записи из другого процесса.
+PROFILE_CACHE = os.getenv("PROFILE_CACHE", "1").lower() not in ("0", "false", "no", "off")
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000") or 10000)
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "15") or 15)
+# Сколько секунд доверять кэшу банов. Изменения из другого процесса (API/бот) видны не позже
+# чем через BLOCKLIST_TTL секунд; 0 — без кэша, запрос на каждую проверку.
+BLOCKLIST_TTL = float(os.getenv("BLOCKLIST_TTL", "30") or 0)
+
+
+class ProfileCache:
+    # LRU по пользователям. У каждой записи есть поколение: запись/сброс увеличивает его,
+    # и результат чтения, начатого до изменения, в кэш уже не попадет.
+
+    def __init__(self, enabled: bool, max_users: int, ttl: float):
+        self.enabled = enabled
+        self._max_users = max(1, max_users)
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # user_id -> {"gen": int, "fields": {field: (value, stored_at)}}
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _entry(self, user_id: int) -> dict:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            entry = {"gen": 0, "fields": {}}
+            self._entries[user_id] = entry
+            if len(self._entries) > self._max_users:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def get(self, user_id: int, field: str) -> Tuple[bool, object, Optional[int]]:
+        # Возвращает (найдено, значение, поколение для последующего put)
+        if not self.enabled:
+            return False, None, None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return False, None, None
+            self._entries.move_to_end(user_id)
+            item = entry["fields"].get(field)
+            if item is not None and time.monotonic() - item[1] < self._ttl:
+                self.hits += 1
+                return True, item[0], entry["gen"]
+            self.misses += 1
+            return False, None, entry["gen"]
+
+    def generation(self, user_id: int) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            return entry["gen"] if entry is not None else None
+
+    def put(self, user_id: int, field: str, value, gen: Optional[int]) -> None:
+        # Сохраняем прочитанное значение, если с момента get запись не менялась
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if (entry["gen"] if entry is not None else None) != gen:
+                return
+            entry = self._entry(user_id)
+            entry["fields"][field] = (value, time.monotonic())
+
+    def store(self, user_id: int, field: str, value) -> None:
+        # Значение только что записано в базу этим процессом
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self._entry(user_id)
+            entry["gen"] += 1
+            entry["fields"][field] = (value, time.monotonic())
+
+    def invalidate(self, user_id: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self._entry(user_id)
+            entry["gen"] += 1
+            entry["fields"].clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "users": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                # Каждое попадание — несостоявшийся запрос к базе
+                "queries_saved": self.hits,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class BlocklistCache:
+    # Вся таблица банов в памяти: баны меняются редко, а проверка идет на каждый апдейт
+
+    def __init__(self, ttl: float, load_all: Callable[[], List[int]], check_one: Callable[[int], bool]):
+        self._ttl = ttl
+        self._load_all = load_all
+        self._check_one = check_one
+        self._lock = threading.Lock()
+        self._ids: Set[int] = set()
+        self._loaded_at: Optional[float] = None
+        # Растет при каждом локальном изменении, чтобы параллельная перезагрузка не затерла его
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def contains(self, user_id: int) -> bool:
+        if self._ttl <= 0:
+            return self._check_one(user_id)
+        started = time.monotonic()
+        with self._lock:
+            if self._loaded_at is not None and started - self._loaded_at < self._ttl:
+                self.hits += 1
+                return user_id in self._ids
+            self.misses += 1
+            version = self._version
+        ids = {int(uid) for uid in self._load_all()}
+        with self._lock:
+            self.reloads += 1
+            if version == self._version:
+                self._ids = ids
+                self._loaded_at = started
+            else:
+                self._loaded_at = None
+        return user_id in ids
+
+    def add(self, user_id: int) -> None:
+        with self._lock:
+            self._ids.add(user_id)
+            self._version += 1
+
+    def discard(self, user_id: int) -> None:
+        with self._lock:
+            self._ids.discard(user_id)
+            self._version += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+            self._version += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self._ttl > 0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "size": len(self._ids),
+                "ttl": self._ttl,
+            }
+
+
+class CachedStorage(Storage):
+    """Profile and blocklist caches on top of any backend.
+
+    Operations that read or change the cached data are wrapped; every other
+    operation is the backend's own function.
+    """
+
+    def __init__(self, inner: Storage):
+        self.name = inner.name
+        self.inline = inner.inline
+        self.inner = inner
+        self.profile = ProfileCache(PROFILE_CACHE, PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL)
+        self.blocklist = BlocklistCache(BLOCKLIST_TTL, inner.list_blocked_user_ids, inner.is_user_blocked)
+        for op in OPERATIONS:
+            if not callable(getattr(type(self), op, None)):
+                setattr(self, op, getattr(inner, op))
+
+    def invalidate_user(self, user_id: int) -> None:
+        self.profile.invalidate(int(user_id))
+        self.blocklist.invalidate()
+
+    def blocklist_cache_stats(self) -> dict:
+        return self.blocklist.stats()
+
+    def profile_cache_stats(self) -> dict:
+        return self.profile.stats()
+
+    def get_user_code(self, user_id: int) -> Optional[str]:
+        found, code, gen = self.profile.get(user_id, "code")
+        if found:
+            return code
+        code = self.inner.get_user_code(user_id)
+        # Отсутствие кода не кэшируем: его может создать другой процесс (Mini App)
+        if code:
+            self.profile.put(user_id, "code", code, gen)
+        return code
+
+    def get_or_create_user_code(self, user_id: int) -> str:
+        code = self.inner.get_or_create_user_code(user_id)
+        self.profile.store(user_id, "code", code)
+        return code
+
+    def get_tracks(self, user_id: int) -> List[Tuple[str, Optional[str]]]:
+        found, tracks, gen = self.profile.get(user_id, "tracks")
+        if found:
+            return list(tracks)
+        tracks = self.inner.get_tracks(user_id)
+        self.profile.put(user_id, "tracks", tuple(tracks), gen)
+        return tracks
+
+    def add_track(self, user_id: int, track: str, delivery: str = "") -> None:
+        try:
+            self.inner.add_track(user_id, track, delivery)
+        finally:
+            self.profile.invalidate(user_id)
+
+    def add_track_and_get_tracks(self, user_id: int, track: str, delivery: str = "") -> List[Tuple[str, Optional[str]]]:
+        tracks = self.inner.add_track_and_get_tracks(user_id, track, delivery)
+        self.profile.store(user_id, "tracks", tuple(tracks))
+        return tracks
+
+    def add_tracks_bulk(self, user_id: int, tracks: List[str], delivery: str = "") -> Tuple[List[str], List[str]]:
+        try:
+            return self.inner.add_tracks_bulk(user_id, tracks, delivery)
+        finally:
+            self.profile.invalidate(user_id)
+
+    def delete_all_user_tracks(self, user_id: int) -> int:
+        try:
+            return self.inner.delete_all_user_tracks(user_id)
+        finally:
+            self.profile.invalidate(user_id)
+
+    def get_recipient(self, user_id: int) -> Optional[dict]:
+        found, recipient, gen = self.profile.get(user_id, "recipient")
+        if found:
+            return dict(recipient) if recipient else None
+        recipient = self.inner.get_recipient(user_id)
+        self.profile.put(user_id, "recipient", dict(recipient) if recipient else None, gen)
+        return recipient
+
+    def set_recipient(self, user_id: int, fio: str, phone: str, city: str) -> None:
+        self.inner.set_recipient(user_id, fio, phone, city)
+        self.profile.store(user_id, "recipient", {"fio": fio.strip(), "phone": phone.strip(), "city": city.strip()})
+
+    def create_shipment(self, user_id: int, *args, **kwargs) -> int:
+        try:
+            return self.inner.create_shipment(user_id, *args, **kwargs)
+        finally:
+            self.profile.invalidate(user_id)
+
+    def delete_all_user_shipments(self, user_id: int) -> int:
+        try:
+            return self.inner.delete_all_user_shipments(user_id)
+        finally:
+            self.profile.invalidate(user_id)
+
+    def get_profile_bundle(self, user_id: int, create_code: bool = False, photo_counts: bool = False) -> dict:
+        gen = self.profile.generation(user_id)
+        bundle = self.inner.get_profile_bundle(user_id, create_code, photo_counts)
+        # Прогреваем кэш профиля, если данные не менялись, пока шел запрос
+        if bundle["code"]:
+            self.profile.put(user_id, "code", bundle["code"], gen)
+        self.profile.put(user_id, "tracks", tuple(bundle["tracks"]), gen)
+        recipient = bundle["recipient"]
+        self.profile.put(user_id, "recipient", dict(recipient) if recipient else None, gen)
+        return bundle
+
+    def is_user_blocked(self, user_id: int) -> bool:
+        return self.blocklist.contains(int(user_id))
+
+    def block_user(self, user_id: int, reason: Optional[str] = None) -> None:
+        self.inner.block_user(user_id, reason)
+        self.blocklist.add(int(user_id))
+
+    def unblock_user(self, user_id: int) -> None:
+        self.inner.unblock_user(user_id)
+        self.blocklist.discard(int(user_id))
+
+    def delete_user_everything(self, user_id: int) -> dict:
+        try:
+            return self.inner.delete_user_everything(user_id)
+        finally:
+            self.blocklist.discard(int(user_id))
+            self.profile.invalidate(int(user_id))
+
+
+_BACKENDS: Dict[str, Callable[[], Storage]] = {}
+_storage: Optional[Storage] = None
+_storage_lock = threading.Lock()
+
+
+def register_backend(name: str, factory: Callable[[], Storage]) -> None:
+    _BACKENDS[name.lower()] = factory
+
+
+def available_backends() -> List[str]:
+    return sorted(_BACKENDS)
+
+
+def create_storage(name: str) -> Storage:
+    factory = _BACKENDS.get(name.lower())
+    if factory is None:
+        raise ValueError(f"Unknown storage backend: {name} (available: {', '.join(available_backends())})")
+    storage = factory()
+    missing = storage.missing_operations()
+    if missing:
+        raise TypeError(f"Storage backend {name} is missing: {', '.join(missing)}")
+    return storage
+
+
+def get_storage() -> Storage:
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage(DB_ENGINE)
+    return _storage
+
+
+def set_storage(storage: Storage) -> None:
+    # Подменить хранилище во время работы (например, для нагрузочных прогонов)
+    global _storage
+    with _storage_lock:
+        _storage = storage
+
+
+def _module_backend(name: str, module_name: str, inline: bool = False, cached: bool = False) -> Callable[[], Storage]:
+    # Модуль реализации импортируется только при выборе backend: psycopg2 нужен лишь для postgres
+    def factory() -> Storage:
+        storage: Storage = ModuleStorage(name, importlib.import_module(module_name), inline=inline)
+        return CachedStorage(storage) if cached else storage
+    return factory
+
+
+# memory без кэшей: данные и так в памяти процесса
+register_backend("memory", _module_backend("memory", "database_memory", inline=True))
+register_backend("sqlite", _module_backend("sqlite", "database_sqlite", cached=True))
+register_backend("postgres", _module_backend("postgres", "database_postgres", cached=True))
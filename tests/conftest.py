@@ -0,0 +1,53 @@
+import os
+import sys
+import tempfile
+import itertools
+
+import pytest
+
+# Тесты импортируют модули из корня репозитория; SQLite — во временный файл
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="probuy-tests-"), "probuy.sqlite3"))
+
+import storage  # noqa: E402
+
+ENGINES = ["memory", "sqlite", "postgres"]
+
+# Синтетические пользователи с большими id, чтобы не пересекаться с реальными данными в Postgres
+_ids = itertools.count(9_100_000_000 + (os.getpid() % 1000) * 100_000)
+_initialized: dict = {}
+
+
+def _engine_storage(name: str) -> storage.Storage:
+    if name == "postgres":
+        if not os.getenv("DATABASE_URL"):
+            pytest.skip("DATABASE_URL is not set")
+        pytest.importorskip("psycopg2")
+    if name not in _initialized:
+        st = storage.create_storage(name)
+        st.init_db()
+        _initialized[name] = st
+    return _initialized[name]
+
+
+@pytest.fixture(params=ENGINES)
+def store(request) -> storage.Storage:
+    return _engine_storage(request.param)
+
+
+@pytest.fixture
+def new_user(store):
+    # Пользователь с кодом; все его данные удаляются после теста
+    created = []
+
+    def make() -> int:
+        user_id = next(_ids)
+        store.get_or_create_user_code(user_id)
+        created.append(user_id)
+        return user_id
+
+    yield make
+    for user_id in created:
+        store.delete_user_everything(user_id)
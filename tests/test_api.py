@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+import api  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+
+TOKEN = "123:test"
+
+
+def _init_data(user_id: int = 1, auth_date=None, token: str = TOKEN) -> str:
+    params = {"user": json.dumps({"id": user_id, "first_name": "Test"})}
+    if auth_date is not None:
+        params["auth_date"] = str(auth_date)
+    data_check_string = "\n".join(f"{k}={params[k]}" for k in sorted(params))
+    secret_key = hmac.new(b"WebAppData", token.encode("utf-8"), hashlib.sha256).digest()
+    params["hash"] = hmac.new(secret_key, data_check_string.encode("utf-8"), hashlib.sha256).hexdigest()
+    return urlencode(params)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Часы кэша init_data, которые двигает тест
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(api, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_init_data_cache_hit_skips_hmac(clock, monkeypatch):
+    cache = api._InitDataCache(10, 3600)
+    data = _init_data(7, auth_date=int(clock.value))
+    assert cache.verify(data, TOKEN)["id"] == 7
+
+    calls = []
+    real_new = api.hmac.new
+    monkeypatch.setattr(api.hmac, "new", lambda *args, **kwargs: calls.append(args) or real_new(*args, **kwargs))
+    assert cache.verify(data, TOKEN)["id"] == 7
+    assert calls == []
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_init_data_cache_rejects_expired_auth_date(clock):
+    cache = api._InitDataCache(10, 3600)
+    with pytest.raises(HTTPException) as exc:
+        cache.verify(_init_data(7, auth_date=int(clock.value) - 3601), TOKEN)
+    assert exc.value.status_code == 401
+    assert cache.stats()["size"] == 0
+
+
+def test_init_data_cache_rejects_missing_auth_date(clock):
+    cache = api._InitDataCache(10, 3600)
+    with pytest.raises(HTTPException) as exc:
+        cache.verify(_init_data(7), TOKEN)
+    assert exc.value.status_code == 401
+
+
+def test_init_data_cache_rejects_bad_signature(clock):
+    cache = api._InitDataCache(10, 3600)
+    with pytest.raises(HTTPException) as exc:
+        cache.verify(_init_data(7, auth_date=int(clock.value), token="456:other"), TOKEN)
+    assert exc.value.status_code == 401
+
+
+def test_init_data_cache_entry_expires_with_auth_date(clock):
+    cache = api._InitDataCache(10, 3600)
+    auth_date = int(clock.value)
+    data = _init_data(7, auth_date=auth_date)
+    cache.verify(data, TOKEN)
+
+    clock.value = auth_date + 3600 - 0.5
+    assert cache.verify(data, TOKEN)["id"] == 7
+    assert cache.stats()["hits"] == 1
+
+    # Срок считается от auth_date, а не от момента первой проверки
+    clock.value = auth_date + 3600
+    with pytest.raises(HTTPException) as exc:
+        cache.verify(data, TOKEN)
+    assert exc.value.status_code == 401
+    assert cache.stats()["size"] == 0
+
+
+def test_init_data_cache_lru_is_bounded(clock):
+    cache = api._InitDataCache(2, 3600)
+    first, second, third = (_init_data(uid, auth_date=int(clock.value)) for uid in (1, 2, 3))
+    cache.verify(first, TOKEN)
+    cache.verify(second, TOKEN)
+    # first становится самым свежим — вытесняется second
+    cache.verify(first, TOKEN)
+    cache.verify(third, TOKEN)
+    assert cache.stats() == {"size": 2, "hits": 1, "misses": 3}
+
+    cache.verify(first, TOKEN)
+    assert cache.stats()["hits"] == 2
+    cache.verify(second, TOKEN)
+    assert cache.stats()["misses"] == 4
+    assert cache.stats()["size"] == 2
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Настоящая проверка подписи и хранилище в памяти вместо базы по умолчанию
+    import httpx
+    import storage
+
+    monkeypatch.setattr(api, "DEV_MODE", False)
+    monkeypatch.setattr(api, "BOT_TOKEN", TOKEN)
+    monkeypatch.setattr(api, "MANAGER_ID", 0)
+    monkeypatch.setattr(storage, "_storage", storage.create_storage("memory"))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test")
+
+
+async def _post(client, url, **kwargs):
+    async with client:
+        return await client.post(url, **kwargs)
+
+
+def test_init_data_in_body_is_accepted(client):
+    resp = asyncio.run(_post(client, "/api/buy", json={"text": "hi", "init_data": _init_data(7, auth_date=int(time.time()))}))
+    assert resp.status_code == 200
+    assert resp.json() == {"ok": True, "sent": False}
+
+
+def test_malformed_json_body_is_400(client):
+    resp = asyncio.run(_post(client, "/api/track", content=b'{"track": ', headers={"Content-Type": "application/json"}))
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Invalid JSON body"
+
+
+def test_body_over_limit_with_content_length_is_413(client):
+    body = json.dumps({"text": "x" * (api.MAX_BODY_BYTES + 1)}).encode()
+    resp = asyncio.run(_post(client, "/api/buy", content=body, headers={"Content-Type": "application/json"}))
+    assert resp.status_code == 413
+
+
+def test_chunked_body_over_limit_is_413(client):
+    body = json.dumps({"init_data": _init_data(7, auth_date=int(time.time())), "text": "x" * api.MAX_BODY_BYTES}).encode()
+
+    async def chunks():
+        # Без Content-Length: лимит срабатывает по прочитанным байтам
+        for start in range(0, len(body), 64 * 1024):
+            yield body[start:start + 64 * 1024]
+
+    resp = asyncio.run(_post(client, "/api/buy", content=chunks(), headers={"Content-Type": "application/json"}))
+    assert resp.status_code == 413
+
+
+def test_init_data_from_body_rejects_malformed_json():
+    from starlette.requests import Request
+
+    async def receive():
+        return {"type": "http.request", "body": b"init_data=", "more_body": False}
+
+    request = Request({"type": "http", "method": "POST", "headers": [], "query_string": b""}, receive)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(api._init_data_from_body(request))
+    assert exc.value.status_code == 400
+
+
+def test_invalid_body_fields_stay_422(client):
+    resp = asyncio.run(_post(client, "/api/buy", json={"init_data": _init_data(7, auth_date=int(time.time()))}))
+    assert resp.status_code == 422
@@ -0,0 +1,241 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("aiogram")
+os.environ.setdefault("BOT_TOKEN", "123:test")
+
+import bot  # noqa: E402
+
+
+class FakeMenuDb:
+    # get_menu_message/save_menu_message из database_async на словаре
+    def __init__(self):
+        self.rows = {}
+        self.reads = []
+        self.saves = []
+
+    async def get_menu_message(self, chat_id):
+        self.reads.append(chat_id)
+        return self.rows.get(chat_id)
+
+    async def save_menu_message(self, chat_id, message_id, keyboard_removed):
+        self.saves.append((chat_id, message_id, keyboard_removed))
+        self.rows[chat_id] = (message_id, keyboard_removed)
+
+
+class FakeBot:
+    # Запоминает вызовы Bot API, которые делает show_menu_screen
+    def __init__(self):
+        self.calls = []
+        self._ids = iter(range(100, 10_000))
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls.append(("send", chat_id, text))
+        return SimpleNamespace(message_id=next(self._ids))
+
+    async def delete_message(self, chat_id, message_id):
+        self.calls.append(("delete", chat_id, message_id))
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        self.calls.append(("edit", chat_id, message_id))
+
+
+@pytest.fixture
+def menu_db(monkeypatch):
+    fake = FakeMenuDb()
+    monkeypatch.setattr(bot, "get_menu_message", fake.get_menu_message)
+    monkeypatch.setattr(bot, "save_menu_message", fake.save_menu_message)
+    monkeypatch.setattr(bot, "owns_chat", lambda chat_id: True)
+    return fake
+
+
+@pytest.fixture
+def fake_bot(monkeypatch, menu_db):
+    fake = FakeBot()
+    monkeypatch.setattr(bot, "bot", fake)
+    monkeypatch.setattr(bot, "menu_registry", bot.MenuRegistry(100))
+    return fake
+
+
+def test_menu_registry_is_bounded_lru(menu_db):
+    async def scenario():
+        registry = bot.MenuRegistry(2)
+        await registry.set(1, 11, True)
+        await registry.set(2, 22, True)
+        await registry.get(1)
+        # 2 давно не запрашивали — вытесняется он
+        await registry.set(3, 33, True)
+        assert list(registry._entries) == [1, 3]
+
+        menu_db.reads.clear()
+        assert await registry.get(1) == [11, True]
+        assert menu_db.reads == []
+        # Вытесненный чат читается из базы
+        assert await registry.get(2) == [22, True]
+        assert menu_db.reads == [2]
+        assert len(registry._entries) == 2
+
+    asyncio.run(scenario())
+
+
+def test_menu_registry_loads_from_db_on_miss(menu_db):
+    menu_db.rows[5] = (55, True)
+
+    async def scenario():
+        registry = bot.MenuRegistry(10)
+        assert await registry.get(5) == [55, True]
+        assert await registry.get(5) == [55, True]
+        # Незнакомый чат: ни сообщения, ни снятой клавиатуры
+        assert await registry.get(6) == [None, False]
+
+    asyncio.run(scenario())
+    assert menu_db.reads == [5, 6]
+
+
+def test_show_menu_screen_removes_reply_keyboard_once_per_chat(fake_bot, menu_db):
+    async def scenario():
+        await bot.show_menu_screen(1, "first")
+        await bot.show_menu_screen(1, "second")
+        # После перезапуска отметка читается из базы — клавиатуру повторно не снимаем
+        bot.menu_registry = bot.MenuRegistry(100)
+        await bot.show_menu_screen(1, "third")
+
+    asyncio.run(scenario())
+    removals = [c for c in fake_bot.calls if c[0] == "send" and c[2] == "⁣"]
+    assert len(removals) == 1
+    assert menu_db.rows[1] == (101, True)
+    assert [c[0] for c in fake_bot.calls] == ["send", "delete", "send", "edit", "edit"]
+
+
+def test_show_menu_screen_writes_only_changes(fake_bot, menu_db):
+    menu_db.rows[1] = (77, True)
+
+    async def scenario():
+        await bot.show_menu_screen(1, "edit in place")
+        await bot.show_menu_screen(1, "edit again")
+
+    asyncio.run(scenario())
+    # Сообщение отредактировано, клавиатура уже снята — записывать в базу нечего
+    assert fake_bot.calls == [("edit", 1, 77), ("edit", 1, 77)]
+    assert menu_db.saves == []
+
+
+def test_show_menu_screen_saves_new_message_when_edit_fails(fake_bot, menu_db):
+    menu_db.rows[1] = (77, True)
+
+    async def failing_edit(chat_id, message_id, text, **kwargs):
+        raise RuntimeError("message to edit not found")
+
+    fake_bot.edit_message_text = failing_edit
+
+    asyncio.run(bot.show_menu_screen(1, "resend"))
+    assert menu_db.saves == [(1, 100, True)]
+
+
+class FakeActivityDb:
+    def __init__(self):
+        self.batches = []
+        self.fail = 0
+        self.gate = None
+
+    async def flush_user_activity(self, rows):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("database is down")
+        self.batches.append(rows)
+
+
+@pytest.fixture
+def activity_db(monkeypatch):
+    fake = FakeActivityDb()
+    monkeypatch.setattr(bot, "flush_user_activity", fake.flush_user_activity)
+    return fake
+
+
+def test_activity_buffer_failed_flush_keeps_entries(activity_db):
+    async def scenario():
+        buffer = bot.ActivityBuffer(3600)
+        buffer.touch(1, address=True)
+        buffer.touch(2)
+        first_seen = buffer._pending[1][0]
+
+        activity_db.fail = 1
+        await buffer.flush()
+        assert activity_db.batches == [] and set(buffer._pending) == {1, 2}
+
+        # Новая активность после сбоя не теряет ни first_seen, ни нажатие «Адрес»
+        buffer.touch(1, sendcargo=True)
+        await buffer.flush()
+        return first_seen
+
+    first_seen = asyncio.run(scenario())
+    rows = {row[0]: row[1:] for row in activity_db.batches[0]}
+    assert set(rows) == {1, 2}
+    assert rows[1][0] == first_seen
+    assert rows[1][2] is not None and rows[1][3] is not None
+    assert len(activity_db.batches) == 1
+
+
+def test_activity_buffer_stop_during_flush_keeps_entries(activity_db):
+    async def scenario():
+        buffer = bot.ActivityBuffer(0)
+        activity_db.gate = asyncio.Event()
+        buffer.touch(1)
+        buffer.start()
+        await asyncio.sleep(0.01)
+        # Периодическая запись висит на базе — stop ее отменяет и пишет заново
+        assert buffer._pending == {}
+        activity_db.gate = None
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    assert [[row[0] for row in batch] for batch in activity_db.batches] == [[1]]
+
+
+def _album_message(chat_id, message_id, group_id="g1"):
+    return SimpleNamespace(chat=SimpleNamespace(id=chat_id), message_id=message_id, media_group_id=group_id)
+
+
+def test_album_flush_chat_saves_pending_album_once():
+    handled = []
+
+    async def handler(messages):
+        handled.append([(m.chat.id, m.message_id) for m in messages])
+
+    async def scenario():
+        collector = bot.AlbumCollector(0.05)
+        collector.add(_album_message(1, 12), handler)
+        collector.add(_album_message(1, 11), handler)
+        collector.add(_album_message(2, 21, "g2"), handler)
+        # /done пришел раньше, чем истекла задержка сборки
+        await collector.flush_chat(1)
+        assert handled == [[(1, 11), (1, 12)]]
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    # Альбом чата 1 не обработан второй раз по таймеру, альбом чата 2 — по своему таймеру
+    assert handled == [[(1, 11), (1, 12)], [(2, 21)]]
+
+
+def test_album_flush_chat_waits_for_running_handler():
+    saved = []
+
+    async def slow_handler(messages):
+        await asyncio.sleep(0.05)
+        saved.extend(m.message_id for m in messages)
+
+    async def scenario():
+        collector = bot.AlbumCollector(0)
+        collector.add(_album_message(1, 11), slow_handler)
+        await asyncio.sleep(0.01)
+        # Задержка прошла, обработчик уже пишет фото — /done должен его дождаться
+        assert 1 in collector._running
+        await collector.flush_chat(1)
+        assert saved == [11]
+
+    asyncio.run(scenario())
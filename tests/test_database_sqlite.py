@@ -0,0 +1,14 @@
+import pytest
+
+import database_sqlite
+
+
+def test_init_db_rejects_sqlite_without_returning(monkeypatch):
+    monkeypatch.setattr(database_sqlite.sqlite3, "sqlite_version_info", (3, 31, 1))
+    monkeypatch.setattr(database_sqlite.sqlite3, "sqlite_version", "3.31.1")
+    with pytest.raises(RuntimeError, match=r"SQLite >= 3\.35\.0.*3\.31\.1"):
+        database_sqlite.init_db()
+
+
+def test_init_db_accepts_current_sqlite():
+    database_sqlite.init_db()
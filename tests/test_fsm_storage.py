@@ -0,0 +1,135 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("aiogram")
+
+import fsm_storage  # noqa: E402
+from fsm_storage import DatabaseStorage  # noqa: E402
+
+
+class FakeDb:
+    # save/get/delete_expired из database_async на словаре; save можно задержать или уронить
+    def __init__(self):
+        self.rows = {}
+        self.reads = []
+        self.fail_saves = 0
+        self.gate = None
+
+    async def get_fsm_state(self, chat_id, user_id, max_age=0):
+        self.reads.append((chat_id, user_id))
+        return self.rows.get((chat_id, user_id))
+
+    async def save_fsm_states(self, entries):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail_saves:
+            self.fail_saves -= 1
+            raise RuntimeError("database is down")
+        for chat_id, user_id, state, data in entries:
+            if state or data:
+                self.rows[(chat_id, user_id)] = (state, dict(data))
+            else:
+                self.rows.pop((chat_id, user_id), None)
+
+    async def delete_expired_fsm_states(self, max_age):
+        return 0
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDb()
+    for name in ("get_fsm_state", "save_fsm_states", "delete_expired_fsm_states"):
+        monkeypatch.setattr(fsm_storage, name, getattr(fake, name))
+    return fake
+
+
+def test_evicted_state_is_not_read_back_from_db_during_flush(db):
+    db.rows[(1, 1)] = ("Old:state", {"step": 0})
+
+    async def scenario():
+        storage = DatabaseStorage(cache_size=1, flush_interval=3600, ttl=0)
+        await storage.set_state(chat=1, user=1, state="New:state")
+        await storage.update_data(chat=1, user=1, step=1)
+
+        db.reads.clear()
+        db.gate = asyncio.Event()
+        flush = asyncio.create_task(storage.flush())
+        await asyncio.sleep(0)
+        assert storage.stats()["inflight"] == 1
+        # Другой чат вытесняет (1, 1) из кэша, пока его запись еще идет
+        await storage.set_state(chat=2, user=2, state="Other:state")
+        assert await storage.get_state(chat=1, user=1) == "New:state"
+        await storage.update_data(chat=1, user=1, step=2)
+
+        db.gate.set()
+        await flush
+        await storage.close()
+
+    asyncio.run(scenario())
+    assert (1, 1) not in db.reads
+    assert db.rows[(1, 1)] == ("New:state", {"step": 2})
+    assert db.rows[(2, 2)] == ("Other:state", {})
+
+
+def test_failed_flush_is_retried_without_losing_newer_writes(db):
+    async def scenario():
+        storage = DatabaseStorage(cache_size=10, flush_interval=3600, ttl=0)
+        await storage.set_state(chat=1, user=1, state="A:one")
+        await storage.set_state(chat=2, user=2, state="B:one")
+
+        db.fail_saves = 1
+        await storage.flush()
+        assert db.rows == {}
+        assert storage.stats()["pending"] == 2 and storage.stats()["inflight"] == 0
+
+        # Изменение после неудачной записи новее возвращенного в очередь
+        await storage.set_state(chat=1, user=1, state="A:two")
+        await storage.flush()
+        assert storage.stats()["pending"] == 0
+        await storage.close()
+
+    asyncio.run(scenario())
+    assert db.rows == {(1, 1): ("A:two", {}), (2, 2): ("B:one", {})}
+
+
+def test_close_saves_states_of_a_cancelled_flush(db):
+    async def scenario():
+        storage = DatabaseStorage(cache_size=10, flush_interval=0, ttl=0)
+        db.gate = asyncio.Event()
+        await storage.set_state(chat=1, user=1, state="A:one")
+        await asyncio.sleep(0.01)
+        assert storage.stats()["inflight"] == 1
+        db.gate = None
+        await storage.close()
+
+    asyncio.run(scenario())
+    assert db.rows == {(1, 1): ("A:one", {})}
+
+
+def test_state_expires_after_ttl(db, monkeypatch):
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(fsm_storage, "time", SimpleNamespace(time=lambda: clock.now, monotonic=lambda: clock.now))
+
+    async def scenario():
+        storage = DatabaseStorage(cache_size=10, flush_interval=3600, ttl=60)
+        await storage.set_state(chat=1, user=1, state="A:one")
+        await storage.set_state(chat=2, user=2, state="B:one")
+
+        clock.now += 30
+        assert await storage.get_state(chat=2, user=2) == "B:one"
+        await storage.update_data(chat=1, user=1, step=1)
+
+        # Срок считается от последнего изменения: (1, 1) изменен 45 секунд назад,
+        # (2, 2) только читали, а изменяли 75 секунд назад
+        clock.now += 45
+        assert await storage.get_state(chat=1, user=1) == "A:one"
+        assert await storage.get_state(chat=2, user=2) is None
+
+        clock.now += 61
+        await storage.flush()
+        assert storage.stats()["cached"] == 0
+        await storage.close()
+
+    asyncio.run(scenario())
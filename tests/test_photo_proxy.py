@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+httpx = pytest.importorskip("httpx")
+
+from fastapi import HTTPException  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from photo_proxy import TelegramPhotoProxy, _DiskCache, _parse_range  # noqa: E402
+
+CONTENT = bytes(range(100))
+
+
+def test_parse_range_single():
+    assert _parse_range("bytes=0-9", 100) == (0, 9)
+    assert _parse_range("bytes=10-", 100) == (10, 99)
+    # Конец за пределами файла обрезается
+    assert _parse_range("bytes=90-500", 100) == (90, 99)
+
+
+def test_parse_range_suffix():
+    assert _parse_range("bytes=-10", 100) == (90, 99)
+    assert _parse_range("bytes=-500", 100) == (0, 99)
+
+
+@pytest.mark.parametrize("header", ["bytes=-0", "bytes=100-", "bytes=150-200", "bytes=20-10"])
+def test_parse_range_not_satisfiable(header):
+    with pytest.raises(HTTPException) as exc:
+        _parse_range(header, 100)
+    assert exc.value.status_code == 416
+    assert exc.value.headers["Content-Range"] == "bytes */100"
+
+
+@pytest.mark.parametrize("header", [None, "", "bytes=0-9,20-29", "items=0-9", "bytes=a-b", "bytes=-"])
+def test_parse_range_falls_back_to_full_file(header):
+    assert _parse_range(header, 100) is None
+
+
+def test_disk_cache_evicts_least_recently_read(tmp_path):
+    cache = _DiskCache(str(tmp_path), max_bytes=250)
+    cache.write("a", b"a" * 100, "image/jpeg")
+    cache.write("b", b"b" * 100, "image/jpeg")
+    assert cache.read("a") == (b"a" * 100, "image/jpeg")
+
+    # Третий файл не помещается: вытесняется b, который давно не читали
+    cache.write("c", b"c" * 100, "image/png")
+    assert cache.read("b") is None
+    assert cache.read("c") == (b"c" * 100, "image/png")
+    assert sorted(os.listdir(tmp_path)) == ["a", "a.type", "c", "c.type"]
+    assert cache.stats()["bytes"] == 200 and cache.stats()["evictions"] == 1
+
+    # Файл больше лимита не кэшируется и ничего не вытесняет
+    cache.write("d", b"d" * 300, "image/jpeg")
+    assert cache.read("d") is None
+    assert cache.stats()["files"] == 2
+
+
+@pytest.fixture
+def proxy(tmp_path):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path.endswith("/getFile"):
+            return httpx.Response(200, json={"ok": True, "result": {"file_path": "photos/1.jpg", "file_size": len(CONTENT)}})
+        return httpx.Response(200, content=CONTENT, headers={"Content-Type": "image/jpeg"})
+
+    p = TelegramPhotoProxy("123:test", cache_dir=str(tmp_path))
+    p._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    p.requests = requests
+    return p
+
+
+def _respond(proxy, headers):
+    request = Request({
+        "type": "http",
+        "method": "GET",
+        "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    })
+
+    async def run():
+        try:
+            return await proxy.respond("file-1", request)
+        finally:
+            await proxy.close()
+
+    return asyncio.run(run())
+
+
+def _etag(file_id: str = "file-1") -> str:
+    return f'"{hashlib.sha1(file_id.encode("utf-8")).hexdigest()}"'
+
+
+def test_respond_if_none_match_is_304_without_upstream(proxy):
+    resp = _respond(proxy, {"If-None-Match": f'"other", {_etag()}'})
+    assert resp.status_code == 304
+    assert resp.headers["ETag"] == _etag()
+    assert proxy.requests == []
+
+
+def test_respond_range_and_if_range(proxy):
+    resp = _respond(proxy, {"Range": "bytes=10-19", "If-Range": _etag()})
+    assert resp.status_code == 206
+    assert resp.body == CONTENT[10:20]
+    assert resp.headers["Content-Range"] == "bytes 10-19/100"
+
+    # If-Range с чужим ETag — файл изменился, Range игнорируется; отдаем из кэша на диске
+    sent = len(proxy.requests)
+    resp = _respond(proxy, {"Range": "bytes=10-19", "If-Range": '"stale"'})
+    assert resp.status_code == 200
+    assert resp.body == CONTENT
+    assert "Content-Range" not in resp.headers
+    assert len(proxy.requests) == sent
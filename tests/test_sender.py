@@ -0,0 +1,28 @@
+import asyncio
+
+from sender import OutboundSender
+
+
+def test_metered_job_takes_a_token_per_call():
+    async def scenario():
+        sender = OutboundSender(global_rate=10, per_chat_interval=0)
+
+        async def menu_screen():
+            for _ in range(3):
+                await sender.throttle()
+            return "menu"
+
+        async def photo():
+            return "photo"
+
+        report = await sender.deliver_many([(1, photo)])
+        menu = sender.submit(1, menu_screen, metered=True)
+        assert await menu == "menu"
+        tokens = sender._bucket._tokens
+        await sender.close()
+        return report, tokens
+
+    report, tokens = asyncio.run(scenario())
+    assert report.sent == [1]
+    # Ведро на 10 токенов: фото — один токен, экран меню — по токену на каждый из трех вызовов
+    assert 5.9 < tokens < 6.5
@@ -0,0 +1,222 @@
+# Одни и те же проверки для всех движков хранилища (memory, sqlite, postgres):
+# поведение операций storage.OPERATIONS не должно зависеть от DB_ENGINE.
+import time
+from datetime import datetime, timedelta, timezone
+
+import storage
+
+
+def test_all_operations_implemented(store):
+    assert store.missing_operations() == []
+
+
+def test_user_code(store, new_user):
+    user_id = new_user()
+    code = store.get_user_code(user_id)
+    assert code and code.startswith("EM03-")
+    assert store.get_or_create_user_code(user_id) == code
+    assert store.get_user_id_by_code(code) == user_id
+    assert store.get_user_id_by_code("") is None
+
+
+def test_tracks_upsert_delivery(store, new_user):
+    user_id = new_user()
+    track = f"TR{user_id}A"
+    store.add_track(user_id, track, "авиа")
+    store.add_track(user_id, track)
+    assert store.get_tracks(user_id) == [(track, "авиа")]
+    store.add_track(user_id, track, "авто")
+    assert store.add_track_and_get_tracks(user_id, f"TR{user_id}B") == [(track, "авто"), (f"TR{user_id}B", "")]
+    assert store.find_user_ids_by_track(track) == [user_id]
+    assert store.delete_all_user_tracks(user_id) == 2
+    assert store.get_tracks(user_id) == []
+
+
+def test_tracks_bulk(store, new_user):
+    user_id = new_user()
+    first, second = f"BK{user_id}A", f"BK{user_id}B"
+    store.add_track(user_id, first)
+    added, duplicates = store.add_tracks_bulk(user_id, [first, second, second], "авиа")
+    assert added == [second]
+    assert duplicates == [first]
+    assert dict(store.get_tracks(user_id)) == {first: "авиа", second: "авиа"}
+
+
+def test_tracks_page(store, new_user):
+    user_id = new_user()
+    tracks = [f"PG{user_id}X{i:02d}" for i in range(5)]
+    store.add_tracks_bulk(user_id, tracks)
+    first = store.get_tracks_page(user_id, limit=2)
+    assert [row[1] for row in first["items"]] == tracks[:2]
+    assert first["prev_cursor"] is None
+    second = store.get_tracks_page(user_id, cursor=first["next_cursor"], limit=2)
+    assert [row[1] for row in second["items"]] == tracks[2:4]
+    back = store.get_tracks_page(user_id, cursor=second["prev_cursor"], backward=True, limit=2)
+    assert back["items"] == first["items"]
+    last = store.get_tracks_page(user_id, backward=True, limit=2)
+    assert [row[1] for row in last["items"]] == tracks[3:]
+    assert last["next_cursor"] is None
+
+
+def test_track_photos(store, new_user):
+    user_id = new_user()
+    track = f"PH{user_id}A"
+    store.add_track(user_id, track)
+    store.add_track_photo(track, "file-1", uploaded_by=1)
+    store.add_track_photo(track, "file-2")
+    assert store.get_track_photos(track) == ["file-1", "file-2"]
+    assert store.get_photos_for_tracks([track, f"PH{user_id}Z"]) == {track: ["file-1", "file-2"], f"PH{user_id}Z": []}
+
+
+def test_recipient_and_shipments(store, new_user):
+    user_id = new_user()
+    assert store.get_recipient(user_id) is None
+    store.set_recipient(user_id, " Иванов ", "+700", "Москва ")
+    assert store.get_recipient(user_id) == {"fio": "Иванов", "phone": "+700", "city": "Москва"}
+    assert store.get_next_cargo_num(user_id) == 1
+    codes = [f"C{user_id}-{n}" for n in (1, 2, 3)]
+    for n, cargo_code in enumerate(codes, 1):
+        store.create_shipment(user_id, n, cargo_code, "Иванов", "+700", "Москва", status="В обработке")
+    assert store.get_next_cargo_num(user_id) == 4
+    assert store.get_user_id_by_cargo_code(codes[0]) == user_id
+    store.update_shipment_status(codes[0], "Отправлен")
+    assert store.list_user_shipments_by_status(user_id, "Отправлен") == [codes[0]]
+    page = store.list_user_shipments_page(user_id, "В обработке", limit=1)
+    assert [row[1] for row in page["items"]] == [codes[1]]
+    page = store.list_user_shipments_page(user_id, "В обработке", cursor=page["next_cursor"], limit=1)
+    assert [row[1] for row in page["items"]] == [codes[2]]
+    assert page["next_cursor"] is None
+    assert store.count_user_shipments(user_id) == 3
+    assert store.count_user_shipments(user_id, "В обработке") == 2
+    assert store.delete_all_user_shipments(user_id) == 3
+    assert store.count_user_shipments(user_id) == 0
+
+
+def test_profile_bundle(store, new_user):
+    user_id = new_user()
+    store.delete_user_everything(user_id)
+    bundle = store.get_profile_bundle(user_id)
+    assert bundle["code"] is None
+    assert bundle["code_created"] is False
+    bundle = store.get_profile_bundle(user_id, create_code=True)
+    assert bundle["code"] == store.get_user_code(user_id)
+    assert bundle["code_created"] is True
+    assert store.get_profile_bundle(user_id, create_code=True)["code_created"] is False
+    track = f"BN{user_id}A"
+    store.add_track(user_id, track, "авиа")
+    store.add_track_photo(track, "file-1")
+    store.set_recipient(user_id, "Иванов", "+700", "Москва")
+    store.create_shipment(user_id, 1, f"C{user_id}-1", "Иванов", "+700", "Москва", status="Отправлен")
+    bundle = store.get_profile_bundle(user_id, photo_counts=True)
+    assert bundle["blocked"] is False
+    assert bundle["tracks"] == [(track, "авиа")]
+    assert bundle["recipient"]["city"] == "Москва"
+    assert bundle["shipments"] == {"Отправлен": 1}
+    assert bundle["shipments_total"] == 1
+    assert bundle["next_cargo_num"] == 2
+    assert bundle["photo_counts"] == {track: 1}
+
+
+def test_blocklist(store, new_user):
+    user_id = new_user()
+    assert store.is_user_blocked(user_id) is False
+    store.block_user(user_id, "spam")
+    assert store.is_user_blocked(user_id) is True
+    assert user_id in store.list_blocked_user_ids()
+    assert store.get_profile_bundle(user_id)["blocked"] is True
+    store.unblock_user(user_id)
+    assert store.is_user_blocked(user_id) is False
+    assert user_id not in store.list_blocked_user_ids()
+
+
+def test_delete_user_everything(store, new_user):
+    user_id = new_user()
+    track = f"DL{user_id}A"
+    store.add_track(user_id, track)
+    store.add_track_photo(track, "file-1")
+    store.set_recipient(user_id, "Иванов", "+700", "Москва")
+    store.create_shipment(user_id, 1, f"C{user_id}-1", "Иванов", "+700", "Москва")
+    store.block_user(user_id)
+    result = store.delete_user_everything(user_id)
+    assert result == {
+        "deleted_tracks": 1,
+        "deleted_photos": 1,
+        "deleted_shipments": 1,
+        "deleted_recipient": 1,
+        "deleted_user": 1,
+    }
+    assert store.get_user_code(user_id) is None
+    assert store.get_tracks(user_id) == []
+    assert store.get_recipient(user_id) is None
+    assert store.is_user_blocked(user_id) is False
+
+
+def test_reminders(store, new_user):
+    user_id, pressed_id = new_user(), new_user()
+    old = datetime.now(timezone.utc) - timedelta(days=40)
+    store.flush_user_activity([
+        (user_id, old, old, None, None),
+        (pressed_id, old, old, old, old),
+    ])
+    assert user_id in store.get_users_for_address_reminder(5)
+    assert pressed_id not in store.get_users_for_address_reminder(5)
+    store.mark_address_reminder_sent(user_id)
+    assert user_id not in store.get_users_for_address_reminder(5)
+    assert user_id in store.get_users_for_inactive_reminder(30)
+    store.mark_inactive_reminder_sent(user_id)
+    assert user_id not in store.get_users_for_inactive_reminder(30)
+    store.record_user_activity(user_id)
+    store.mark_pressed_address(user_id)
+    store.mark_pressed_sendcargo(user_id)
+    assert user_id not in store.get_users_for_sendcargo_reminder(15)
+
+
+def test_fsm_states(store, new_user):
+    user_id = new_user()
+    store.save_fsm_states([(user_id, user_id, "Form:city", {"fio": "Иванов"})])
+    assert store.get_fsm_state(user_id, user_id) == ("Form:city", {"fio": "Иванов"})
+    assert store.get_fsm_state(user_id, user_id + 1) is None
+    store.save_fsm_states([(user_id, user_id, None, {})])
+    assert store.get_fsm_state(user_id, user_id) is None
+
+
+def test_shipment_media(store, new_user):
+    admin_id = new_user()
+    cargo_code = f"C{admin_id}-1"
+    assert store.add_shipment_media(admin_id, cargo_code, ["f1", "f2"], 4) == (2, 2)
+    assert store.add_shipment_media(admin_id, cargo_code, ["f3", "f4", "f5"], 4) == (2, 4)
+    assert store.add_shipment_media(admin_id, cargo_code, ["f6"], 4) == (0, 4)
+    assert store.get_shipment_media(admin_id, cargo_code) == ["f1", "f2", "f3", "f4"]
+    assert store.delete_shipment_media(admin_id, cargo_code) == 4
+    assert store.get_shipment_media(admin_id, cargo_code) == []
+
+
+def test_shipment_media_session_expiry(store, new_user):
+    admin_id = new_user()
+    stale, fresh = f"C{admin_id}-1", f"C{admin_id}-2"
+    store.add_shipment_media(admin_id, stale, ["f1", "f2"])
+    store.add_shipment_media(admin_id, fresh, ["f3"])
+    time.sleep(1.1)
+    # Новое фото продлевает всю сессию, включая давно добавленные фото
+    store.add_shipment_media(admin_id, fresh, ["f4"])
+    assert store.get_shipment_media(admin_id, stale, max_age=1) == []
+    assert store.get_shipment_media(admin_id, fresh, max_age=1) == ["f3", "f4"]
+    assert store.delete_expired_shipment_media(1) >= 2
+    assert store.get_shipment_media(admin_id, stale) == []
+    assert store.get_shipment_media(admin_id, fresh) == ["f3", "f4"]
+    store.delete_shipment_media(admin_id, fresh)
+
+
+def test_menu_messages(store, new_user):
+    chat_id = new_user()
+    assert store.get_menu_message(chat_id) is None
+    store.save_menu_message(chat_id, 42, False)
+    assert tuple(store.get_menu_message(chat_id)) == (42, False)
+    store.save_menu_message(chat_id, None, True)
+    assert tuple(store.get_menu_message(chat_id)) == (None, True)
+
+
+def test_keyset_page_helper():
+    rows = [(i, f"t{i}") for i in range(1, 4)]
+    page = storage.keyset_page(rows, 2, None, False)
+    assert page == {"items": rows[:2], "next_cursor": 2, "prev_cursor": None}
@@ -0,0 +1,23 @@
+from tracks import extract_tracks, is_valid_track
+
+
+def test_is_valid_track():
+    assert is_valid_track(" yt1234567890 ")
+    assert is_valid_track("123456789012")
+    assert not is_valid_track("YT12")
+    assert not is_valid_track("YT-1234567890")
+
+
+def test_extract_tracks_from_list():
+    text = "Трек-коды:\nYT1234567890, sf1234567890123\n\"JT0001112223\";\nYT1234567890"
+    assert extract_tracks(text) == ["YT1234567890", "SF1234567890123", "JT0001112223"]
+
+
+def test_extract_tracks_digits_only_when_alone_on_line():
+    text = "773012345678\nЗаказ 20241231001 от 31.12.2024, тел. 79161234567\n  123456789012,\n"
+    assert extract_tracks(text) == ["773012345678", "123456789012"]
+
+
+def test_extract_tracks_skips_words_without_digits():
+    assert extract_tracks("TRACKING\nNUMBERS LIST") == []
+    assert extract_tracks("") == []
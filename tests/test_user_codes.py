@@ -0,0 +1,84 @@
+# Выдача кодов EM03-xxxx из нескольких потоков: у каждого нового пользователя свой код,
+# а после init_db нумерация продолжается с максимального уже выданного кода.
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+THREADS = 8
+USERS = 64
+
+
+def _code_num(code: str) -> int:
+    return int(code.split("-", 1)[1])
+
+
+def _issue_codes(store, user_ids) -> dict:
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        codes = list(pool.map(store.get_or_create_user_code, user_ids))
+    return dict(zip(user_ids, codes))
+
+
+def _force_code(store, user_id: int, code: str) -> None:
+    # Код, записанный в обход счетчика (старые данные, импорт) — init_db должен его учесть
+    inner = getattr(store, "inner", store)
+    module = inner.module
+    if store.name == "memory":
+        module._users[user_id] = code
+        module._user_by_code[code] = user_id
+    elif store.name == "sqlite":
+        module._execute("UPDATE users SET code = ? WHERE user_id = ?", (code, user_id))
+    else:
+        module._execute("UPDATE users SET code = %s WHERE user_id = %s", (code, user_id))
+    store.invalidate_user(user_id)
+
+
+def test_concurrent_codes_are_unique(store, new_user):
+    user_ids = [new_user() for _ in range(USERS)]
+    for user_id in user_ids:
+        store.delete_user_everything(user_id)
+    codes = _issue_codes(store, user_ids)
+    assert len(set(codes.values())) == USERS
+    assert all(store.get_user_code(user_id) == code for user_id, code in codes.items())
+    # Повторный вызов возвращает тот же код
+    assert _issue_codes(store, user_ids) == codes
+
+
+def test_codes_continue_after_existing_max(store, new_user):
+    seeded = new_user()
+    current = max(_code_num(store.get_or_create_user_code(new_user())), _code_num(store.get_user_code(seeded)))
+    top = current + 1000
+    _force_code(store, seeded, f"EM03-{top:04d}")
+    store.init_db()
+    user_ids = [new_user() for _ in range(USERS)]
+    for user_id in user_ids:
+        store.delete_user_everything(user_id)
+    codes = _issue_codes(store, user_ids)
+    nums = sorted(_code_num(code) for code in codes.values())
+    assert len(set(nums)) == USERS
+    assert nums[0] > top
+
+
+
+def test_concurrent_first_calls_for_one_user_agree(store, new_user):
+    # Первые вызовы для одного и того же пользователя из нескольких потоков сразу;
+    # частое переключение потоков, чтобы гонка между проверкой и записью кода проявлялась
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(USERS):
+            user_id = new_user()
+            store.delete_user_everything(user_id)
+            barrier = threading.Barrier(THREADS)
+
+            def first_call(_):
+                barrier.wait()
+                return store.get_or_create_user_code(user_id)
+
+            with ThreadPoolExecutor(max_workers=THREADS) as pool:
+                codes = set(pool.map(first_call, range(THREADS)))
+            assert len(codes) == 1
+            code = codes.pop()
+            assert store.get_user_code(user_id) == code
+            assert store.get_user_id_by_code(code) == user_id
+    finally:
+        sys.setswitchinterval(interval)
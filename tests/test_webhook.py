@@ -0,0 +1,80 @@
+import asyncio
+
+from webhook import UpdateQueue, synthetic_updates
+
+
+def _update(update_id: int, chat_id: int) -> dict:
+    return {"update_id": update_id, "message": {"message_id": update_id, "chat": {"id": chat_id}, "text": "/help"}}
+
+
+def test_updates_of_one_chat_keep_order():
+    handled = []
+
+    async def handler(update):
+        # Первые апдейты медленнее последующих: без ожидания порядок бы перемешался
+        await asyncio.sleep(0.01 * (5 - update["update_id"] % 5))
+        handled.append(update["update_id"])
+
+    async def scenario():
+        queue = UpdateQueue(handler, workers=4, size=100)
+        queue.start()
+        for i in range(10):
+            assert queue.put(_update(i, chat_id=7))
+        await queue.stop()
+        return queue.stats()
+
+    stats = asyncio.run(scenario())
+    assert handled == list(range(10))
+    assert stats["processed"] == 10 and stats["queued"] == 0
+
+
+def test_slow_chat_does_not_block_others():
+    release = None
+    handled = []
+
+    async def handler(update):
+        if update["message"]["chat"]["id"] == 1:
+            await release.wait()
+        handled.append(update["update_id"])
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        queue = UpdateQueue(handler, workers=4, size=100)
+        queue.start()
+        queue.put(_update(0, chat_id=1))
+        for i, chat_id in enumerate((2, 3, 9, 10, 11), start=1):
+            queue.put(_update(i, chat_id=chat_id))
+        await asyncio.sleep(0.05)
+        done_before_release = list(handled)
+        release.set()
+        await queue.stop()
+        return done_before_release
+
+    assert asyncio.run(scenario()) == [1, 2, 3, 4, 5]
+    assert handled[-1] == 0
+
+
+def test_concurrency_is_bounded_and_full_queue_rejects():
+    active = peak = 0
+
+    async def handler(update):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    async def scenario():
+        queue = UpdateQueue(handler, workers=3, size=20)
+        queue.start()
+        accepted = [queue.put(u) for u in synthetic_updates(25, chats=25)]
+        for update in synthetic_updates(10, chats=10):
+            await queue.put_wait(update)
+        await queue.stop()
+        return accepted, queue.stats()
+
+    accepted, stats = asyncio.run(scenario())
+    assert accepted.count(True) == 20 and stats["rejected"] == 5
+    assert stats["processed"] == 30
+    assert peak == 3
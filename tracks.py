@@ -0,0 +1,29 @@
+import re
+from typing import List, Optional
+
+# Трек-код — последовательность A-Z0-9 длиной 8..40. Общие правила для бота и Mini App (api.py).
+TRACK_MIN_LEN = 8
+TRACK_MAX_LEN = 40
+
+_TOKEN_RE = re.compile(r"(?<![A-Z0-9])[A-Z0-9]{%d,%d}(?![A-Z0-9])" % (TRACK_MIN_LEN, TRACK_MAX_LEN))
+# Разделители, которые могут окружать единственный трек в строке (txt/csv, вставка из таблицы)
+_LINE_PADDING = " \t\r,;\"'"
+
+
+def is_valid_track(track: Optional[str]) -> bool:
+    t = (track or "").strip().upper()
+    return TRACK_MIN_LEN <= len(t) <= TRACK_MAX_LEN and all("A" <= c <= "Z" or "0" <= c <= "9" for c in t)
+
+
+def extract_tracks(text: Optional[str]) -> List[str]:
+    # Все трек-коды из списка (сообщение, txt/csv), без повторов. В треке всегда есть цифра,
+    # иначе заголовки вроде TRACKING принимались бы за трек. Трек только из цифр берется, лишь
+    # если он — все содержимое строки: в строке с другим текстом это телефон, номер заказа или дата.
+    if not text:
+        return []
+    found: List[str] = []
+    for line in text.upper().splitlines():
+        tokens = [t for t in _TOKEN_RE.findall(line) if any("0" <= c <= "9" for c in t)]
+        sole = len(tokens) == 1 and line.strip(_LINE_PADDING) == tokens[0]
+        found.extend(t for t in tokens if sole or any("A" <= c <= "Z" for c in t))
+    return list(dict.fromkeys(found))
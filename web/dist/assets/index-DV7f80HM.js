@@ -1,134 +0,0 @@
-import"./modulepreload-polyfill-B5Qt9EMX.js";function Ie(e,t){return function(){return e.apply(t,arguments)}}const{toString:ut}=Object.prototype,{getPrototypeOf:me}=Object,Z=(e=>t=>{const n=ut.call(t);return e[n]||(e[n]=n.slice(8,-1).toLowerCase())})(Object.create(null)),P=e=>(e=e.toLowerCase(),t=>Z(t)===e),Y=e=>t=>typeof t===e,{isArray:q}=Array,z=Y("undefined");function dt(e){return e!==null&&!z(e)&&e.constructor!==null&&!z(e.constructor)&&C(e.constructor.isBuffer)&&e.constructor.isBuffer(e)}const je=P("ArrayBuffer");function ft(e){let t;return typeof ArrayBuffer<"u"&&ArrayBuffer.isView?t=ArrayBuffer.isView(e):t=e&&e.buffer&&je(e.buffer),t}const pt=Y("string"),C=Y("function"),qe=Y("number"),ee=e=>e!==null&&typeof e=="object",ht=e=>e===!0||e===!1,K=e=>{if(Z(e)!=="object")return!1;const t=me(e);return(t===null||t===Object.prototype||Object.getPrototypeOf(t)===null)&&!(Symbol.toStringTag in e)&&!(Symbol.iterator in e)},mt=P("Date"),yt=P("File"),bt=P("Blob"),wt=P("FileList"),gt=e=>ee(e)&&C(e.pipe),Et=e=>{let t;return e&&(typeof FormData=="function"&&e instanceof FormData||C(e.append)&&((t=Z(e))==="formdata"||t==="object"&&C(e.toString)&&e.toString()==="[object FormData]"))},St=P("URLSearchParams"),[Rt,Tt,At,Ot]=["ReadableStream","Request","Response","Headers"].map(P),xt=e=>e.trim?e.trim():e.replace(/^[\s\uFEFF\xA0]+|[\s\uFEFF\xA0]+$/g,"");function J(e,t,{allOwnKeys:n=!1}={}){if(e===null||typeof e>"u")return;let r,s;if(typeof e!="object"&&(e=[e]),q(e))for(r=0,s=e.length;r<s;r++)t.call(null,e[r],r,e);else{const o=n?Object.getOwnPropertyNames(e):Object.keys(e),i=o.length;let c;for(r=0;r<i;r++)c=o[r],t.call(null,e[c],c,e)}}function Me(e,t){t=t.toLowerCase();const n=Object.keys(e);let r=n.length,s;for(;r-- >0;)if(s=n[r],t===s.toLowerCase())return s;return null}const U=typeof globalThis<"u"?globalThis:typeof self<"u"?self:typeof window<"u"?window:global,He=e=>!z(e)&&e!==U;function ce(){const{caseless:e}=He(this)&&this||{},t={},n=(r,s)=>{const o=e&&Me(t,s)||s;K(t[o])&&K(r)?t[o]=ce(t[o],r):K(r)?t[o]=ce({},r):q(r)?t[o]=r.slice():t[o]=r};for(let r=0,s=arguments.length;r<s;r++)arguments[r]&&J(arguments[r],n);return t}const vt=(e,t,n,{allOwnKeys:r}={})=>(J(t,(s,o)=>{n&&C(s)?e[o]=Ie(s,n):e[o]=s},{allOwnKeys:r}),e),Ct=e=>(e.charCodeAt(0)===65279&&(e=e.slice(1)),e),Pt=(e,t,n,r)=>{e.prototype=Object.create(t.prototype,r),e.prototype.constructor=e,Object.defineProperty(e,"super",{value:t.prototype}),n&&Object.assign(e.prototype,n)},kt=(e,t,n,r)=>{let s,o,i;const c={};if(t=t||{},e==null)return t;do{for(s=Object.getOwnPropertyNames(e),o=s.length;o-- >0;)i=s[o],(!r||r(i,e,t))&&!c[i]&&(t[i]=e[i],c[i]=!0);e=n!==!1&&me(e)}while(e&&(!n||n(e,t))&&e!==Object.prototype);return t},Nt=(e,t,n)=>{e=String(e),(n===void 0||n>e.length)&&(n=e.length),n-=t.length;const r=e.indexOf(t,n);return r!==-1&&r===n},Bt=e=>{if(!e)return null;if(q(e))return e;let t=e.length;if(!qe(t))return null;const n=new Array(t);for(;t-- >0;)n[t]=e[t];return n},Lt=(e=>t=>e&&t instanceof e)(typeof Uint8Array<"u"&&me(Uint8Array)),_t=(e,t)=>{const r=(e&&e[Symbol.iterator]).call(e);let s;for(;(s=r.next())&&!s.done;){const o=s.value;t.call(e,o[0],o[1])}},Dt=(e,t)=>{let n;const r=[];for(;(n=e.exec(t))!==null;)r.push(n);return r},Ft=P("HTMLFormElement"),Ut=e=>e.toLowerCase().replace(/[-_\s]([a-z\d])(\w*)/g,function(n,r,s){return r.toUpperCase()+s}),Re=(({hasOwnProperty:e})=>(t,n)=>e.call(t,n))(Object.prototype),It=P("RegExp"),$e=(e,t)=>{const n=Object.getOwnPropertyDescriptors(e),r={};J(n,(s,o)=>{let i;(i=t(s,o,e))!==!1&&(r[o]=i||s)}),Object.defineProperties(e,r)},jt=e=>{$e(e,(t,n)=>{if(C(e)&&["arguments","caller","callee"].indexOf(n)!==-1)return!1;const r=e[n];if(C(r)){if(t.enumerable=!1,"writable"in t){t.writable=!1;return}t.set||(t.set=()=>{throw Error("Can not rewrite read-only method '"+n+"'")})}})},qt=(e,t)=>{const n={},r=s=>{s.forEach(o=>{n[o]=!0})};return q(e)?r(e):r(String(e).split(t)),n},Mt=()=>{},Ht=(e,t)=>e!=null&&Number.isFinite(e=+e)?e:t,se="abcdefghijklmnopqrstuvwxyz",Te="0123456789",ze={DIGIT:Te,ALPHA:se,ALPHA_DIGIT:se+se.toUpperCase()+Te},$t=(e=16,t=ze.ALPHA_DIGIT)=>{let n="";const{length:r}=t;for(;e--;)n+=t[Math.random()*r|0];return n};function zt(e){return!!(e&&C(e.append)&&e[Symbol.toStringTag]==="FormData"&&e[Symbol.iterator])}const Jt=e=>{const t=new Array(10),n=(r,s)=>{if(ee(r)){if(t.indexOf(r)>=0)return;if(!("toJSON"in r)){t[s]=r;const o=q(r)?[]:{};return J(r,(i,c)=>{const d=n(i,s+1);!z(d)&&(o[c]=d)}),t[s]=void 0,o}}return r};return n(e,0)},Vt=P("AsyncFunction"),Wt=e=>e&&(ee(e)||C(e))&&C(e.then)&&C(e.catch),Je=((e,t)=>e?setImmediate:t?((n,r)=>(U.addEventListener("message",({source:s,data:o})=>{s===U&&o===n&&r.length&&r.shift()()},!1),s=>{r.push(s),U.postMessage(n,"*")}))(`axios@${Math.random()}`,[]):n=>setTimeout(n))(typeof setImmediate=="function",C(U.postMessage)),Kt=typeof queueMicrotask<"u"?queueMicrotask.bind(U):typeof process<"u"&&process.nextTick||Je,a={isArray:q,isArrayBuffer:je,isBuffer:dt,isFormData:Et,isArrayBufferView:ft,isString:pt,isNumber:qe,isBoolean:ht,isObject:ee,isPlainObject:K,isReadableStream:Rt,isRequest:Tt,isResponse:At,isHeaders:Ot,isUndefined:z,isDate:mt,isFile:yt,isBlob:bt,isRegExp:It,isFunction:C,isStream:gt,isURLSearchParams:St,isTypedArray:Lt,isFileList:wt,forEach:J,merge:ce,extend:vt,trim:xt,stripBOM:Ct,inherits:Pt,toFlatObject:kt,kindOf:Z,kindOfTest:P,endsWith:Nt,toArray:Bt,forEachEntry:_t,matchAll:Dt,isHTMLForm:Ft,hasOwnProperty:Re,hasOwnProp:Re,reduceDescriptors:$e,freezeMethods:jt,toObjectSet:qt,toCamelCase:Ut,noop:Mt,toFiniteNumber:Ht,findKey:Me,global:U,isContextDefined:He,ALPHABET:ze,generateString:$t,isSpecCompliantForm:zt,toJSONObject:Jt,isAsyncFn:Vt,isThenable:Wt,setImmediate:Je,asap:Kt};function y(e,t,n,r,s){Error.call(this),Error.captureStackTrace?Error.captureStackTrace(this,this.constructor):this.stack=new Error().stack,this.message=e,this.name="AxiosError",t&&(this.code=t),n&&(this.config=n),r&&(this.request=r),s&&(this.response=s,this.status=s.status?s.status:null)}a.inherits(y,Error,{toJSON:function(){return{message:this.message,name:this.name,description:this.description,number:this.number,fileName:this.fileName,lineNumber:this.lineNumber,columnNumber:this.columnNumber,stack:this.stack,config:a.toJSONObject(this.config),code:this.code,status:this.status}}});const Ve=y.prototype,We={};["ERR_BAD_OPTION_VALUE","ERR_BAD_OPTION","ECONNABORTED","ETIMEDOUT","ERR_NETWORK","ERR_FR_TOO_MANY_REDIRECTS","ERR_DEPRECATED","ERR_BAD_RESPONSE","ERR_BAD_REQUEST","ERR_CANCELED","ERR_NOT_SUPPORT","ERR_INVALID_URL"].forEach(e=>{We[e]={value:e}});Object.defineProperties(y,We);Object.defineProperty(Ve,"isAxiosError",{value:!0});y.from=(e,t,n,r,s,o)=>{const i=Object.create(Ve);return a.toFlatObject(e,i,function(d){return d!==Error.prototype},c=>c!=="isAxiosError"),y.call(i,e.message,t,n,r,s),i.cause=e,i.name=e.name,o&&Object.assign(i,o),i};const Xt=null;function le(e){return a.isPlainObject(e)||a.isArray(e)}function Ke(e){return a.endsWith(e,"[]")?e.slice(0,-2):e}function Ae(e,t,n){return e?e.concat(t).map(function(s,o){return s=Ke(s),!n&&o?"["+s+"]":s}).join(n?".":""):t}function Gt(e){return a.isArray(e)&&!e.some(le)}const Qt=a.toFlatObject(a,{},null,function(t){return/^is[A-Z]/.test(t)});function te(e,t,n){if(!a.isObject(e))throw new TypeError("target must be an object");t=t||new FormData,n=a.toFlatObject(n,{metaTokens:!0,dots:!1,indexes:!1},!1,function(m,h){return!a.isUndefined(h[m])});const r=n.metaTokens,s=n.visitor||u,o=n.dots,i=n.indexes,d=(n.Blob||typeof Blob<"u"&&Blob)&&a.isSpecCompliantForm(t);if(!a.isFunction(s))throw new TypeError("visitor must be a function");function l(f){if(f===null)return"";if(a.isDate(f))return f.toISOString();if(!d&&a.isBlob(f))throw new y("Blob is not supported. Use a Buffer instead.");return a.isArrayBuffer(f)||a.isTypedArray(f)?d&&typeof Blob=="function"?new Blob([f]):Buffer.from(f):f}function u(f,m,h){let g=f;if(f&&!h&&typeof f=="object"){if(a.endsWith(m,"{}"))m=r?m:m.slice(0,-2),f=JSON.stringify(f);else if(a.isArray(f)&&Gt(f)||(a.isFileList(f)||a.endsWith(m,"[]"))&&(g=a.toArray(f)))return m=Ke(m),g.forEach(function(T,N){!(a.isUndefined(T)||T===null)&&t.append(i===!0?Ae([m],N,o):i===null?m:m+"[]",l(T))}),!1}return le(f)?!0:(t.append(Ae(h,m,o),l(f)),!1)}const p=[],w=Object.assign(Qt,{defaultVisitor:u,convertValue:l,isVisitable:le});function b(f,m){if(!a.isUndefined(f)){if(p.indexOf(f)!==-1)throw Error("Circular reference detected in "+m.join("."));p.push(f),a.forEach(f,function(g,R){(!(a.isUndefined(g)||g===null)&&s.call(t,g,a.isString(R)?R.trim():R,m,w))===!0&&b(g,m?m.concat(R):[R])}),p.pop()}}if(!a.isObject(e))throw new TypeError("data must be an object");return b(e),t}function Oe(e){const t={"!":"%21","'":"%27","(":"%28",")":"%29","~":"%7E","%20":"+","%00":"\0"};return encodeURIComponent(e).replace(/[!'()~]|%20|%00/g,function(r){return t[r]})}function ye(e,t){this._pairs=[],e&&te(e,this,t)}const Xe=ye.prototype;Xe.append=function(t,n){this._pairs.push([t,n])};Xe.toString=function(t){const n=t?function(r){return t.call(this,r,Oe)}:Oe;return this._pairs.map(function(s){return n(s[0])+"="+n(s[1])},"").join("&")};function Zt(e){return encodeURIComponent(e).replace(/%3A/gi,":").replace(/%24/g,"$").replace(/%2C/gi,",").replace(/%20/g,"+").replace(/%5B/gi,"[").replace(/%5D/gi,"]")}function Ge(e,t,n){if(!t)return e;const r=n&&n.encode||Zt,s=n&&n.serialize;let o;if(s?o=s(t,n):o=a.isURLSearchParams(t)?t.toString():new ye(t,n).toString(r),o){const i=e.indexOf("#");i!==-1&&(e=e.slice(0,i)),e+=(e.indexOf("?")===-1?"?":"&")+o}return e}class xe{constructor(){this.handlers=[]}use(t,n,r){return this.handlers.push({fulfilled:t,rejected:n,synchronous:r?r.synchronous:!1,runWhen:r?r.runWhen:null}),this.handlers.length-1}eject(t){this.handlers[t]&&(this.handlers[t]=null)}clear(){this.handlers&&(this.handlers=[])}forEach(t){a.forEach(this.handlers,function(r){r!==null&&t(r)})}}const Qe={silentJSONParsing:!0,forcedJSONParsing:!0,clarifyTimeoutError:!1},Yt=typeof URLSearchParams<"u"?URLSearchParams:ye,en=typeof FormData<"u"?FormData:null,tn=typeof Blob<"u"?Blob:null,nn={isBrowser:!0,classes:{URLSearchParams:Yt,FormData:en,Blob:tn},protocols:["http","https","file","blob","url","data"]},be=typeof window<"u"&&typeof document<"u",ue=typeof navigator=="object"&&navigator||void 0,rn=be&&(!ue||["ReactNative","NativeScript","NS"].indexOf(ue.product)<0),sn=typeof WorkerGlobalScope<"u"&&self instanceof WorkerGlobalScope&&typeof self.importScripts=="function",on=be&&window.location.href||"http://localhost",an=Object.freeze(Object.defineProperty({__proto__:null,hasBrowserEnv:be,hasStandardBrowserEnv:rn,hasStandardBrowserWebWorkerEnv:sn,navigator:ue,origin:on},Symbol.toStringTag,{value:"Module"})),O={...an,...nn};function cn(e,t){return te(e,new O.classes.URLSearchParams,Object.assign({visitor:function(n,r,s,o){return O.isNode&&a.isBuffer(n)?(this.append(r,n.toString("base64")),!1):o.defaultVisitor.apply(this,arguments)}},t))}function ln(e){return a.matchAll(/\w+|\[(\w*)]/g,e).map(t=>t[0]==="[]"?"":t[1]||t[0])}function un(e){const t={},n=Object.keys(e);let r;const s=n.length;let o;for(r=0;r<s;r++)o=n[r],t[o]=e[o];return t}function Ze(e){function t(n,r,s,o){let i=n[o++];if(i==="__proto__")return!0;const c=Number.isFinite(+i),d=o>=n.length;return i=!i&&a.isArray(s)?s.length:i,d?(a.hasOwnProp(s,i)?s[i]=[s[i],r]:s[i]=r,!c):((!s[i]||!a.isObject(s[i]))&&(s[i]=[]),t(n,r,s[i],o)&&a.isArray(s[i])&&(s[i]=un(s[i])),!c)}if(a.isFormData(e)&&a.isFunction(e.entries)){const n={};return a.forEachEntry(e,(r,s)=>{t(ln(r),s,n,0)}),n}return null}function dn(e,t,n){if(a.isString(e))try{return(t||JSON.parse)(e),a.trim(e)}catch(r){if(r.name!=="SyntaxError")throw r}return(n||JSON.stringify)(e)}const V={transitional:Qe,adapter:["xhr","http","fetch"],transformRequest:[function(t,n){const r=n.getContentType()||"",s=r.indexOf("application/json")>-1,o=a.isObject(t);if(o&&a.isHTMLForm(t)&&(t=new FormData(t)),a.isFormData(t))return s?JSON.stringify(Ze(t)):t;if(a.isArrayBuffer(t)||a.isBuffer(t)||a.isStream(t)||a.isFile(t)||a.isBlob(t)||a.isReadableStream(t))return t;if(a.isArrayBufferView(t))return t.buffer;if(a.isURLSearchParams(t))return n.setContentType("application/x-www-form-urlencoded;charset=utf-8",!1),t.toString();let c;if(o){if(r.indexOf("application/x-www-form-urlencoded")>-1)return cn(t,this.formSerializer).toString();if((c=a.isFileList(t))||r.indexOf("multipart/form-data")>-1){const d=this.env&&this.env.FormData;return te(c?{"files[]":t}:t,d&&new d,this.formSerializer)}}return o||s?(n.setContentType("application/json",!1),dn(t)):t}],transformResponse:[function(t){const n=this.transitional||V.transitional,r=n&&n.forcedJSONParsing,s=this.responseType==="json";if(a.isResponse(t)||a.isReadableStream(t))return t;if(t&&a.isString(t)&&(r&&!this.responseType||s)){const i=!(n&&n.silentJSONParsing)&&s;try{return JSON.parse(t)}catch(c){if(i)throw c.name==="SyntaxError"?y.from(c,y.ERR_BAD_RESPONSE,this,null,this.response):c}}return t}],timeout:0,xsrfCookieName:"XSRF-TOKEN",xsrfHeaderName:"X-XSRF-TOKEN",maxContentLength:-1,maxBodyLength:-1,env:{FormData:O.classes.FormData,Blob:O.classes.Blob},validateStatus:function(t){return t>=200&&t<300},headers:{common:{Accept:"application/json, text/plain, */*","Content-Type":void 0}}};a.forEach(["delete","get","head","post","put","patch"],e=>{V.headers[e]={}});const fn=a.toObjectSet(["age","authorization","content-length","content-type","etag","expires","from","host","if-modified-since","if-unmodified-since","last-modified","location","max-forwards","proxy-authorization","referer","retry-after","user-agent"]),pn=e=>{const t={};let n,r,s;return e&&e.split(`
-`).forEach(function(i){s=i.indexOf(":"),n=i.substring(0,s).trim().toLowerCase(),r=i.substring(s+1).trim(),!(!n||t[n]&&fn[n])&&(n==="set-cookie"?t[n]?t[n].push(r):t[n]=[r]:t[n]=t[n]?t[n]+", "+r:r)}),t},ve=Symbol("internals");function H(e){return e&&String(e).trim().toLowerCase()}function X(e){return e===!1||e==null?e:a.isArray(e)?e.map(X):String(e)}function hn(e){const t=Object.create(null),n=/([^\s,;=]+)\s*(?:=\s*([^,;]+))?/g;let r;for(;r=n.exec(e);)t[r[1]]=r[2];return t}const mn=e=>/^[-_a-zA-Z0-9^`|~,!#$%&'*+.]+$/.test(e.trim());function oe(e,t,n,r,s){if(a.isFunction(r))return r.call(this,t,n);if(s&&(t=n),!!a.isString(t)){if(a.isString(r))return t.indexOf(r)!==-1;if(a.isRegExp(r))return r.test(t)}}function yn(e){return e.trim().toLowerCase().replace(/([a-z\d])(\w*)/g,(t,n,r)=>n.toUpperCase()+r)}function bn(e,t){const n=a.toCamelCase(" "+t);["get","set","has"].forEach(r=>{Object.defineProperty(e,r+n,{value:function(s,o,i){return this[r].call(this,t,s,o,i)},configurable:!0})})}let x=class{constructor(t){t&&this.set(t)}set(t,n,r){const s=this;function o(c,d,l){const u=H(d);if(!u)throw new Error("header name must be a non-empty string");const p=a.findKey(s,u);(!p||s[p]===void 0||l===!0||l===void 0&&s[p]!==!1)&&(s[p||d]=X(c))}const i=(c,d)=>a.forEach(c,(l,u)=>o(l,u,d));if(a.isPlainObject(t)||t instanceof this.constructor)i(t,n);else if(a.isString(t)&&(t=t.trim())&&!mn(t))i(pn(t),n);else if(a.isHeaders(t))for(const[c,d]of t.entries())o(d,c,r);else t!=null&&o(n,t,r);return this}get(t,n){if(t=H(t),t){const r=a.findKey(this,t);if(r){const s=this[r];if(!n)return s;if(n===!0)return hn(s);if(a.isFunction(n))return n.call(this,s,r);if(a.isRegExp(n))return n.exec(s);throw new TypeError("parser must be boolean|regexp|function")}}}has(t,n){if(t=H(t),t){const r=a.findKey(this,t);return!!(r&&this[r]!==void 0&&(!n||oe(this,this[r],r,n)))}return!1}delete(t,n){const r=this;let s=!1;function o(i){if(i=H(i),i){const c=a.findKey(r,i);c&&(!n||oe(r,r[c],c,n))&&(delete r[c],s=!0)}}return a.isArray(t)?t.forEach(o):o(t),s}clear(t){const n=Object.keys(this);let r=n.length,s=!1;for(;r--;){const o=n[r];(!t||oe(this,this[o],o,t,!0))&&(delete this[o],s=!0)}return s}normalize(t){const n=this,r={};return a.forEach(this,(s,o)=>{const i=a.findKey(r,o);if(i){n[i]=X(s),delete n[o];return}const c=t?yn(o):String(o).trim();c!==o&&delete n[o],n[c]=X(s),r[c]=!0}),this}concat(...t){return this.constructor.concat(this,...t)}toJSON(t){const n=Object.create(null);return a.forEach(this,(r,s)=>{r!=null&&r!==!1&&(n[s]=t&&a.isArray(r)?r.join(", "):r)}),n}[Symbol.iterator](){return Object.entries(this.toJSON())[Symbol.iterator]()}toString(){return Object.entries(this.toJSON()).map(([t,n])=>t+": "+n).join(`
-`)}get[Symbol.toStringTag](){return"AxiosHeaders"}static from(t){return t instanceof this?t:new this(t)}static concat(t,...n){const r=new this(t);return n.forEach(s=>r.set(s)),r}static accessor(t){const r=(this[ve]=this[ve]={accessors:{}}).accessors,s=this.prototype;function o(i){const c=H(i);r[c]||(bn(s,i),r[c]=!0)}return a.isArray(t)?t.forEach(o):o(t),this}};x.accessor(["Content-Type","Content-Length","Accept","Accept-Encoding","User-Agent","Authorization"]);a.reduceDescriptors(x.prototype,({value:e},t)=>{let n=t[0].toUpperCase()+t.slice(1);return{get:()=>e,set(r){this[n]=r}}});a.freezeMethods(x);function ie(e,t){const n=this||V,r=t||n,s=x.from(r.headers);let o=r.data;return a.forEach(e,function(c){o=c.call(n,o,s.normalize(),t?t.status:void 0)}),s.normalize(),o}function Ye(e){return!!(e&&e.__CANCEL__)}function M(e,t,n){y.call(this,e??"canceled",y.ERR_CANCELED,t,n),this.name="CanceledError"}a.inherits(M,y,{__CANCEL__:!0});function et(e,t,n){const r=n.config.validateStatus;!n.status||!r||r(n.status)?e(n):t(new y("Request failed with status code "+n.status,[y.ERR_BAD_REQUEST,y.ERR_BAD_RESPONSE][Math.floor(n.status/100)-4],n.config,n.request,n))}function wn(e){const t=/^([-+\w]{1,25})(:?\/\/|:)/.exec(e);return t&&t[1]||""}function gn(e,t){e=e||10;const n=new Array(e),r=new Array(e);let s=0,o=0,i;return t=t!==void 0?t:1e3,function(d){const l=Date.now(),u=r[o];i||(i=l),n[s]=d,r[s]=l;let p=o,w=0;for(;p!==s;)w+=n[p++],p=p%e;if(s=(s+1)%e,s===o&&(o=(o+1)%e),l-i<t)return;const b=u&&l-u;return b?Math.round(w*1e3/b):void 0}}function En(e,t){let n=0,r=1e3/t,s,o;const i=(l,u=Date.now())=>{n=u,s=null,o&&(clearTimeout(o),o=null),e.apply(null,l)};return[(...l)=>{const u=Date.now(),p=u-n;p>=r?i(l,u):(s=l,o||(o=setTimeout(()=>{o=null,i(s)},r-p)))},()=>s&&i(s)]}const G=(e,t,n=3)=>{let r=0;const s=gn(50,250);return En(o=>{const i=o.loaded,c=o.lengthComputable?o.total:void 0,d=i-r,l=s(d),u=i<=c;r=i;const p={loaded:i,total:c,progress:c?i/c:void 0,bytes:d,rate:l||void 0,estimated:l&&c&&u?(c-i)/l:void 0,event:o,lengthComputable:c!=null,[t?"download":"upload"]:!0};e(p)},n)},Ce=(e,t)=>{const n=e!=null;return[r=>t[0]({lengthComputable:n,total:e,loaded:r}),t[1]]},Pe=e=>(...t)=>a.asap(()=>e(...t)),Sn=O.hasStandardBrowserEnv?function(){const t=O.navigator&&/(msie|trident)/i.test(O.navigator.userAgent),n=document.createElement("a");let r;function s(o){let i=o;return t&&(n.setAttribute("href",i),i=n.href),n.setAttribute("href",i),{href:n.href,protocol:n.protocol?n.protocol.replace(/:$/,""):"",host:n.host,search:n.search?n.search.replace(/^\?/,""):"",hash:n.hash?n.hash.replace(/^#/,""):"",hostname:n.hostname,port:n.port,pathname:n.pathname.charAt(0)==="/"?n.pathname:"/"+n.pathname}}return r=s(window.location.href),function(i){const c=a.isString(i)?s(i):i;return c.protocol===r.protocol&&c.host===r.host}}():function(){return function(){return!0}}(),Rn=O.hasStandardBrowserEnv?{write(e,t,n,r,s,o){const i=[e+"="+encodeURIComponent(t)];a.isNumber(n)&&i.push("expires="+new Date(n).toGMTString()),a.isString(r)&&i.push("path="+r),a.isString(s)&&i.push("domain="+s),o===!0&&i.push("secure"),document.cookie=i.join("; ")},read(e){const t=document.cookie.match(new RegExp("(^|;\\s*)("+e+")=([^;]*)"));return t?decodeURIComponent(t[3]):null},remove(e){this.write(e,"",Date.now()-864e5)}}:{write(){},read(){return null},remove(){}};function Tn(e){return/^([a-z][a-z\d+\-.]*:)?\/\//i.test(e)}function An(e,t){return t?e.replace(/\/?\/$/,"")+"/"+t.replace(/^\/+/,""):e}function tt(e,t){return e&&!Tn(t)?An(e,t):t}const ke=e=>e instanceof x?{...e}:e;function j(e,t){t=t||{};const n={};function r(l,u,p){return a.isPlainObject(l)&&a.isPlainObject(u)?a.merge.call({caseless:p},l,u):a.isPlainObject(u)?a.merge({},u):a.isArray(u)?u.slice():u}function s(l,u,p){if(a.isUndefined(u)){if(!a.isUndefined(l))return r(void 0,l,p)}else return r(l,u,p)}function o(l,u){if(!a.isUndefined(u))return r(void 0,u)}function i(l,u){if(a.isUndefined(u)){if(!a.isUndefined(l))return r(void 0,l)}else return r(void 0,u)}function c(l,u,p){if(p in t)return r(l,u);if(p in e)return r(void 0,l)}const d={url:o,method:o,data:o,baseURL:i,transformRequest:i,transformResponse:i,paramsSerializer:i,timeout:i,timeoutMessage:i,withCredentials:i,withXSRFToken:i,adapter:i,responseType:i,xsrfCookieName:i,xsrfHeaderName:i,onUploadProgress:i,onDownloadProgress:i,decompress:i,maxContentLength:i,maxBodyLength:i,beforeRedirect:i,transport:i,httpAgent:i,httpsAgent:i,cancelToken:i,socketPath:i,responseEncoding:i,validateStatus:c,headers:(l,u)=>s(ke(l),ke(u),!0)};return a.forEach(Object.keys(Object.assign({},e,t)),function(u){const p=d[u]||s,w=p(e[u],t[u],u);a.isUndefined(w)&&p!==c||(n[u]=w)}),n}const nt=e=>{const t=j({},e);let{data:n,withXSRFToken:r,xsrfHeaderName:s,xsrfCookieName:o,headers:i,auth:c}=t;t.headers=i=x.from(i),t.url=Ge(tt(t.baseURL,t.url),e.params,e.paramsSerializer),c&&i.set("Authorization","Basic "+btoa((c.username||"")+":"+(c.password?unescape(encodeURIComponent(c.password)):"")));let d;if(a.isFormData(n)){if(O.hasStandardBrowserEnv||O.hasStandardBrowserWebWorkerEnv)i.setContentType(void 0);else if((d=i.getContentType())!==!1){const[l,...u]=d?d.split(";").map(p=>p.trim()).filter(Boolean):[];i.setContentType([l||"multipart/form-data",...u].join("; "))}}if(O.hasStandardBrowserEnv&&(r&&a.isFunction(r)&&(r=r(t)),r||r!==!1&&Sn(t.url))){const l=s&&o&&Rn.read(o);l&&i.set(s,l)}return t},On=typeof XMLHttpRequest<"u",xn=On&&function(e){return new Promise(function(n,r){const s=nt(e);let o=s.data;const i=x.from(s.headers).normalize();let{responseType:c,onUploadProgress:d,onDownloadProgress:l}=s,u,p,w,b,f;function m(){b&&b(),f&&f(),s.cancelToken&&s.cancelToken.unsubscribe(u),s.signal&&s.signal.removeEventListener("abort",u)}let h=new XMLHttpRequest;h.open(s.method.toUpperCase(),s.url,!0),h.timeout=s.timeout;function g(){if(!h)return;const T=x.from("getAllResponseHeaders"in h&&h.getAllResponseHeaders()),A={data:!c||c==="text"||c==="json"?h.responseText:h.response,status:h.status,statusText:h.statusText,headers:T,config:e,request:h};et(function(F){n(F),m()},function(F){r(F),m()},A),h=null}"onloadend"in h?h.onloadend=g:h.onreadystatechange=function(){!h||h.readyState!==4||h.status===0&&!(h.responseURL&&h.responseURL.indexOf("file:")===0)||setTimeout(g)},h.onabort=function(){h&&(r(new y("Request aborted",y.ECONNABORTED,e,h)),h=null)},h.onerror=function(){r(new y("Network Error",y.ERR_NETWORK,e,h)),h=null},h.ontimeout=function(){let N=s.timeout?"timeout of "+s.timeout+"ms exceeded":"timeout exceeded";const A=s.transitional||Qe;s.timeoutErrorMessage&&(N=s.timeoutErrorMessage),r(new y(N,A.clarifyTimeoutError?y.ETIMEDOUT:y.ECONNABORTED,e,h)),h=null},o===void 0&&i.setContentType(null),"setRequestHeader"in h&&a.forEach(i.toJSON(),function(N,A){h.setRequestHeader(A,N)}),a.isUndefined(s.withCredentials)||(h.withCredentials=!!s.withCredentials),c&&c!=="json"&&(h.responseType=s.responseType),l&&([w,f]=G(l,!0),h.addEventListener("progress",w)),d&&h.upload&&([p,b]=G(d),h.upload.addEventListener("progress",p),h.upload.addEventListener("loadend",b)),(s.cancelToken||s.signal)&&(u=T=>{h&&(r(!T||T.type?new M(null,e,h):T),h.abort(),h=null)},s.cancelToken&&s.cancelToken.subscribe(u),s.signal&&(s.signal.aborted?u():s.signal.addEventListener("abort",u)));const R=wn(s.url);if(R&&O.protocols.indexOf(R)===-1){r(new y("Unsupported protocol "+R+":",y.ERR_BAD_REQUEST,e));return}h.send(o||null)})},vn=(e,t)=>{const{length:n}=e=e?e.filter(Boolean):[];if(t||n){let r=new AbortController,s;const o=function(l){if(!s){s=!0,c();const u=l instanceof Error?l:this.reason;r.abort(u instanceof y?u:new M(u instanceof Error?u.message:u))}};let i=t&&setTimeout(()=>{i=null,o(new y(`timeout ${t} of ms exceeded`,y.ETIMEDOUT))},t);const c=()=>{e&&(i&&clearTimeout(i),i=null,e.forEach(l=>{l.unsubscribe?l.unsubscribe(o):l.removeEventListener("abort",o)}),e=null)};e.forEach(l=>l.addEventListener("abort",o));const{signal:d}=r;return d.unsubscribe=()=>a.asap(c),d}},Cn=function*(e,t){let n=e.byteLength;if(n<t){yield e;return}let r=0,s;for(;r<n;)s=r+t,yield e.slice(r,s),r=s},Pn=async function*(e,t){for await(const n of kn(e))yield*Cn(n,t)},kn=async function*(e){if(e[Symbol.asyncIterator]){yield*e;return}const t=e.getReader();try{for(;;){const{done:n,value:r}=await t.read();if(n)break;yield r}}finally{await t.cancel()}},Ne=(e,t,n,r)=>{const s=Pn(e,t);let o=0,i,c=d=>{i||(i=!0,r&&r(d))};return new ReadableStream({async pull(d){try{const{done:l,value:u}=await s.next();if(l){c(),d.close();return}let p=u.byteLength;if(n){let w=o+=p;n(w)}d.enqueue(new Uint8Array(u))}catch(l){throw c(l),l}},cancel(d){return c(d),s.return()}},{highWaterMark:2})},ne=typeof fetch=="function"&&typeof Request=="function"&&typeof Response=="function",rt=ne&&typeof ReadableStream=="function",Nn=ne&&(typeof TextEncoder=="function"?(e=>t=>e.encode(t))(new TextEncoder):async e=>new Uint8Array(await new Response(e).arrayBuffer())),st=(e,...t)=>{try{return!!e(...t)}catch{return!1}},Bn=rt&&st(()=>{let e=!1;const t=new Request(O.origin,{body:new ReadableStream,method:"POST",get duplex(){return e=!0,"half"}}).headers.has("Content-Type");return e&&!t}),Be=64*1024,de=rt&&st(()=>a.isReadableStream(new Response("").body)),Q={stream:de&&(e=>e.body)};ne&&(e=>{["text","arrayBuffer","blob","formData","stream"].forEach(t=>{!Q[t]&&(Q[t]=a.isFunction(e[t])?n=>n[t]():(n,r)=>{throw new y(`Response type '${t}' is not supported`,y.ERR_NOT_SUPPORT,r)})})})(new Response);const Ln=async e=>{if(e==null)return 0;if(a.isBlob(e))return e.size;if(a.isSpecCompliantForm(e))return(await new Request(O.origin,{method:"POST",body:e}).arrayBuffer()).byteLength;if(a.isArrayBufferView(e)||a.isArrayBuffer(e))return e.byteLength;if(a.isURLSearchParams(e)&&(e=e+""),a.isString(e))return(await Nn(e)).byteLength},_n=async(e,t)=>{const n=a.toFiniteNumber(e.getContentLength());return n??Ln(t)},Dn=ne&&(async e=>{let{url:t,method:n,data:r,signal:s,cancelToken:o,timeout:i,onDownloadProgress:c,onUploadProgress:d,responseType:l,headers:u,withCredentials:p="same-origin",fetchOptions:w}=nt(e);l=l?(l+"").toLowerCase():"text";let b=vn([s,o&&o.toAbortSignal()],i),f;const m=b&&b.unsubscribe&&(()=>{b.unsubscribe()});let h;try{if(d&&Bn&&n!=="get"&&n!=="head"&&(h=await _n(u,r))!==0){let A=new Request(t,{method:"POST",body:r,duplex:"half"}),L;if(a.isFormData(r)&&(L=A.headers.get("content-type"))&&u.setContentType(L),A.body){const[F,W]=Ce(h,G(Pe(d)));r=Ne(A.body,Be,F,W)}}a.isString(p)||(p=p?"include":"omit");const g="credentials"in Request.prototype;f=new Request(t,{...w,signal:b,method:n.toUpperCase(),headers:u.normalize().toJSON(),body:r,duplex:"half",credentials:g?p:void 0});let R=await fetch(f);const T=de&&(l==="stream"||l==="response");if(de&&(c||T&&m)){const A={};["status","statusText","headers"].forEach(Se=>{A[Se]=R[Se]});const L=a.toFiniteNumber(R.headers.get("content-length")),[F,W]=c&&Ce(L,G(Pe(c),!0))||[];R=new Response(Ne(R.body,Be,F,()=>{W&&W(),m&&m()}),A)}l=l||"text";let N=await Q[a.findKey(Q,l)||"text"](R,e);return!T&&m&&m(),await new Promise((A,L)=>{et(A,L,{data:N,headers:x.from(R.headers),status:R.status,statusText:R.statusText,config:e,request:f})})}catch(g){throw m&&m(),g&&g.name==="TypeError"&&/fetch/i.test(g.message)?Object.assign(new y("Network Error",y.ERR_NETWORK,e,f),{cause:g.cause||g}):y.from(g,g&&g.code,e,f)}}),fe={http:Xt,xhr:xn,fetch:Dn};a.forEach(fe,(e,t)=>{if(e){try{Object.defineProperty(e,"name",{value:t})}catch{}Object.defineProperty(e,"adapterName",{value:t})}});const Le=e=>`- ${e}`,Fn=e=>a.isFunction(e)||e===null||e===!1,ot={getAdapter:e=>{e=a.isArray(e)?e:[e];const{length:t}=e;let n,r;const s={};for(let o=0;o<t;o++){n=e[o];let i;if(r=n,!Fn(n)&&(r=fe[(i=String(n)).toLowerCase()],r===void 0))throw new y(`Unknown adapter '${i}'`);if(r)break;s[i||"#"+o]=r}if(!r){const o=Object.entries(s).map(([c,d])=>`adapter ${c} `+(d===!1?"is not supported by the environment":"is not available in the build"));let i=t?o.length>1?`since :
-`+o.map(Le).join(`
-`):" "+Le(o[0]):"as no adapter specified";throw new y("There is no suitable adapter to dispatch the request "+i,"ERR_NOT_SUPPORT")}return r},adapters:fe};function ae(e){if(e.cancelToken&&e.cancelToken.throwIfRequested(),e.signal&&e.signal.aborted)throw new M(null,e)}function _e(e){return ae(e),e.headers=x.from(e.headers),e.data=ie.call(e,e.transformRequest),["post","put","patch"].indexOf(e.method)!==-1&&e.headers.setContentType("application/x-www-form-urlencoded",!1),ot.getAdapter(e.adapter||V.adapter)(e).then(function(r){return ae(e),r.data=ie.call(e,e.transformResponse,r),r.headers=x.from(r.headers),r},function(r){return Ye(r)||(ae(e),r&&r.response&&(r.response.data=ie.call(e,e.transformResponse,r.response),r.response.headers=x.from(r.response.headers))),Promise.reject(r)})}const it="1.7.7",we={};["object","boolean","number","function","string","symbol"].forEach((e,t)=>{we[e]=function(r){return typeof r===e||"a"+(t<1?"n ":" ")+e}});const De={};we.transitional=function(t,n,r){function s(o,i){return"[Axios v"+it+"] Transitional option '"+o+"'"+i+(r?". "+r:"")}return(o,i,c)=>{if(t===!1)throw new y(s(i," has been removed"+(n?" in "+n:"")),y.ERR_DEPRECATED);return n&&!De[i]&&(De[i]=!0,console.warn(s(i," has been deprecated since v"+n+" and will be removed in the near future"))),t?t(o,i,c):!0}};function Un(e,t,n){if(typeof e!="object")throw new y("options must be an object",y.ERR_BAD_OPTION_VALUE);const r=Object.keys(e);let s=r.length;for(;s-- >0;){const o=r[s],i=t[o];if(i){const c=e[o],d=c===void 0||i(c,o,e);if(d!==!0)throw new y("option "+o+" must be "+d,y.ERR_BAD_OPTION_VALUE);continue}if(n!==!0)throw new y("Unknown option "+o,y.ERR_BAD_OPTION)}}const pe={assertOptions:Un,validators:we},_=pe.validators;let I=class{constructor(t){this.defaults=t,this.interceptors={request:new xe,response:new xe}}async request(t,n){try{return await this._request(t,n)}catch(r){if(r instanceof Error){let s;Error.captureStackTrace?Error.captureStackTrace(s={}):s=new Error;const o=s.stack?s.stack.replace(/^.+\n/,""):"";try{r.stack?o&&!String(r.stack).endsWith(o.replace(/^.+\n.+\n/,""))&&(r.stack+=`
-`+o):r.stack=o}catch{}}throw r}}_request(t,n){typeof t=="string"?(n=n||{},n.url=t):n=t||{},n=j(this.defaults,n);const{transitional:r,paramsSerializer:s,headers:o}=n;r!==void 0&&pe.assertOptions(r,{silentJSONParsing:_.transitional(_.boolean),forcedJSONParsing:_.transitional(_.boolean),clarifyTimeoutError:_.transitional(_.boolean)},!1),s!=null&&(a.isFunction(s)?n.paramsSerializer={serialize:s}:pe.assertOptions(s,{encode:_.function,serialize:_.function},!0)),n.method=(n.method||this.defaults.method||"get").toLowerCase();let i=o&&a.merge(o.common,o[n.method]);o&&a.forEach(["delete","get","head","post","put","patch","common"],f=>{delete o[f]}),n.headers=x.concat(i,o);const c=[];let d=!0;this.interceptors.request.forEach(function(m){typeof m.runWhen=="function"&&m.runWhen(n)===!1||(d=d&&m.synchronous,c.unshift(m.fulfilled,m.rejected))});const l=[];this.interceptors.response.forEach(function(m){l.push(m.fulfilled,m.rejected)});let u,p=0,w;if(!d){const f=[_e.bind(this),void 0];for(f.unshift.apply(f,c),f.push.apply(f,l),w=f.length,u=Promise.resolve(n);p<w;)u=u.then(f[p++],f[p++]);return u}w=c.length;let b=n;for(p=0;p<w;){const f=c[p++],m=c[p++];try{b=f(b)}catch(h){m.call(this,h);break}}try{u=_e.call(this,b)}catch(f){return Promise.reject(f)}for(p=0,w=l.length;p<w;)u=u.then(l[p++],l[p++]);return u}getUri(t){t=j(this.defaults,t);const n=tt(t.baseURL,t.url);return Ge(n,t.params,t.paramsSerializer)}};a.forEach(["delete","get","head","options"],function(t){I.prototype[t]=function(n,r){return this.request(j(r||{},{method:t,url:n,data:(r||{}).data}))}});a.forEach(["post","put","patch"],function(t){function n(r){return function(o,i,c){return this.request(j(c||{},{method:t,headers:r?{"Content-Type":"multipart/form-data"}:{},url:o,data:i}))}}I.prototype[t]=n(),I.prototype[t+"Form"]=n(!0)});let In=class at{constructor(t){if(typeof t!="function")throw new TypeError("executor must be a function.");let n;this.promise=new Promise(function(o){n=o});const r=this;this.promise.then(s=>{if(!r._listeners)return;let o=r._listeners.length;for(;o-- >0;)r._listeners[o](s);r._listeners=null}),this.promise.then=s=>{let o;const i=new Promise(c=>{r.subscribe(c),o=c}).then(s);return i.cancel=function(){r.unsubscribe(o)},i},t(function(o,i,c){r.reason||(r.reason=new M(o,i,c),n(r.reason))})}throwIfRequested(){if(this.reason)throw this.reason}subscribe(t){if(this.reason){t(this.reason);return}this._listeners?this._listeners.push(t):this._listeners=[t]}unsubscribe(t){if(!this._listeners)return;const n=this._listeners.indexOf(t);n!==-1&&this._listeners.splice(n,1)}toAbortSignal(){const t=new AbortController,n=r=>{t.abort(r)};return this.subscribe(n),t.signal.unsubscribe=()=>this.unsubscribe(n),t.signal}static source(){let t;return{token:new at(function(s){t=s}),cancel:t}}};function jn(e){return function(n){return e.apply(null,n)}}function qn(e){return a.isObject(e)&&e.isAxiosError===!0}const he={Continue:100,SwitchingProtocols:101,Processing:102,EarlyHints:103,Ok:200,Created:201,Accepted:202,NonAuthoritativeInformation:203,NoContent:204,ResetContent:205,PartialContent:206,MultiStatus:207,AlreadyReported:208,ImUsed:226,MultipleChoices:300,MovedPermanently:301,Found:302,SeeOther:303,NotModified:304,UseProxy:305,Unused:306,TemporaryRedirect:307,PermanentRedirect:308,BadRequest:400,Unauthorized:401,PaymentRequired:402,Forbidden:403,NotFound:404,MethodNotAllowed:405,NotAcceptable:406,ProxyAuthenticationRequired:407,RequestTimeout:408,Conflict:409,Gone:410,LengthRequired:411,PreconditionFailed:412,PayloadTooLarge:413,UriTooLong:414,UnsupportedMediaType:415,RangeNotSatisfiable:416,ExpectationFailed:417,ImATeapot:418,MisdirectedRequest:421,UnprocessableEntity:422,Locked:423,FailedDependency:424,TooEarly:425,UpgradeRequired:426,PreconditionRequired:428,TooManyRequests:429,RequestHeaderFieldsTooLarge:431,UnavailableForLegalReasons:451,InternalServerError:500,NotImplemented:501,BadGateway:502,ServiceUnavailable:503,GatewayTimeout:504,HttpVersionNotSupported:505,VariantAlsoNegotiates:506,InsufficientStorage:507,LoopDetected:508,NotExtended:510,NetworkAuthenticationRequired:511};Object.entries(he).forEach(([e,t])=>{he[t]=e});function ct(e){const t=new I(e),n=Ie(I.prototype.request,t);return a.extend(n,I.prototype,t,{allOwnKeys:!0}),a.extend(n,t,null,{allOwnKeys:!0}),n.create=function(s){return ct(j(e,s))},n}const E=ct(V);E.Axios=I;E.CanceledError=M;E.CancelToken=In;E.isCancel=Ye;E.VERSION=it;E.toFormData=te;E.AxiosError=y;E.Cancel=E.CanceledError;E.all=function(t){return Promise.all(t)};E.spread=jn;E.isAxiosError=qn;E.mergeConfig=j;E.AxiosHeaders=x;E.formToJSON=e=>Ze(a.isHTMLForm(e)?new FormData(e):e);E.getAdapter=ot.getAdapter;E.HttpStatusCode=he;E.default=E;const{Axios:Zn,AxiosError:Yn,CanceledError:er,isCancel:tr,CancelToken:nr,VERSION:rr,all:sr,Cancel:or,isAxiosError:ir,spread:ar,toFormData:cr,AxiosHeaders:lr,HttpStatusCode:ur,formToJSON:dr,getAdapter:fr,mergeConfig:pr}=E;var Fe;const S=(Fe=window.Telegram)==null?void 0:Fe.WebApp;S&&(S.ready(),S.expand());const Mn=document.getElementById("app"),B={me:null,loading:!1,error:null,deliveries:[],theme:"light"};function lt(){var r,s;const e=((r=S==null?void 0:S.themeParams)==null?void 0:r.bg_color)||"#f6f9fc",t=((s=S==null?void 0:S.themeParams)==null?void 0:s.text_color)||"#0f172a",n=((S==null?void 0:S.colorScheme)||"").toLowerCase()==="dark";B.theme=n?"dark":"light",document.documentElement.setAttribute("data-theme",B.theme),document.body.style.background=e,document.body.style.color=t}lt();var Ue;(Ue=S==null?void 0:S.onEvent)==null||Ue.call(S,"themeChanged",lt);function v(e){B.loading=e,Ee()}function k(e){B.error=e,Ee()}async function D(e,t,n){const r="",o={"X-Telegram-Init-Data":(S==null?void 0:S.initData)||new URLSearchParams(location.search).get("init_data")||""};return(await E({method:e,url:r+t,headers:o,data:n})).data}async function ge(){var e,t;try{v(!0),B.me=await D("get","/api/me");const n=await D("get","/api/deliveries");B.deliveries=(n==null?void 0:n.items)||[],k(null)}catch(n){k(((t=(e=n==null?void 0:n.response)==null?void 0:e.data)==null?void 0:t.detail)||"Ошибка загрузки")}finally{v(!1)}}function $(e){var t;(t=document.getElementById(e))==null||t.classList.add("open")}function re(e){var t;(t=document.getElementById(e))==null||t.classList.remove("open")}async function Hn(e){var r,s,o,i;const t=(((r=e.querySelector("#trackInput"))==null?void 0:r.value)||"").trim(),n=(((s=e.querySelector("#deliverySelect"))==null?void 0:s.value)||"").trim();if(!t){k("Введите трек-код");return}try{v(!0),await D("post","/api/track",{track:t,delivery:n}),await ge(),re("modalAddTrack")}catch(c){k(((i=(o=c==null?void 0:c.response)==null?void 0:o.data)==null?void 0:i.detail)||"Ошибка добавления")}finally{v(!1)}}async function $n(){var e,t;try{v(!0),await D("delete","/api/tracks"),await ge()}catch(n){k(((t=(e=n==null?void 0:n.response)==null?void 0:e.data)==null?void 0:t.detail)||"Ошибка очистки")}finally{v(!1)}}async function zn(){var e,t;try{v(!0);const n=await D("get","/api/address"),r=document.getElementById("addressText");r&&(r.innerText=((n==null?void 0:n.text)||"").replace(/<[^>]*>?/gm,"")),$("modalAddress")}catch(n){k(((t=(e=n==null?void 0:n.response)==null?void 0:e.data)==null?void 0:t.detail)||"Не удалось получить адрес")}finally{v(!1)}}async function Jn(e){var n,r,s;const t=(((n=e.querySelector("#managerText"))==null?void 0:n.value)||"").trim();try{v(!0);const o=await D("post","/api/manager",{text:t});o!=null&&o.ok&&re("modalManager")}catch(o){k(((s=(r=o==null?void 0:o.response)==null?void 0:r.data)==null?void 0:s.detail)||"Не удалось отправить запрос")}finally{v(!1)}}async function Vn(e){var n,r,s;const t=(((n=e.querySelector("#buyText"))==null?void 0:n.value)||"").trim();if(!t){k("Опишите заказ");return}try{v(!0);const o=await D("post","/api/buy",{text:t});o!=null&&o.ok&&re("modalBuy")}catch(o){k(((s=(r=o==null?void 0:o.response)==null?void 0:r.data)==null?void 0:s.detail)||"Не удалось отправить запрос")}finally{v(!1)}}function Wn(e){return e!=null&&e.length?`
-    <div class="list">
-      <div class="list-title">Ваши трек-коды</div>
-      ${e.map(t=>`
-        <div class="track">
-          <div class="track-left">
-            <span class="track-code"><code>${t.track}</code></span>
-            ${t.delivery?`<span class="chip">${t.delivery}</span>`:""}
-          </div>
-          <div class="track-actions">
-            <button class="btn" data-photo-track="${t.track}">Фото</button>
-          </div>
-        </div>
-      `).join("")}
-    </div>
-  `:'<div class="banner">Пока нет зарегистрированных трек-кодов</div>'}async function Kn(e){var t,n;try{v(!0);const r=await D("get",`/api/track/${encodeURIComponent(e)}/photos`),s=document.getElementById("photosWrap");if(s){const o=(r==null?void 0:r.photos)||[];o.length?s.innerHTML='<div class="list-title">Фото</div>'+o.map(i=>`
-          <img alt="photo" src="/api/tg_photo/${encodeURIComponent(i)}" style="max-width:100%; border-radius: 12px; border:1px solid var(--color-border); margin-bottom:12px" />
-        `).join(""):s.innerHTML='<div class="banner">Фото пока нет</div>'}$("modalPhotos")}catch(r){k(((n=(t=r==null?void 0:r.response)==null?void 0:t.data)==null?void 0:n.detail)||"Не удалось загрузить фото")}finally{v(!1)}}function Ee(){var r,s,o,i,c,d,l,u,p,w;const{me:e,loading:t,error:n}=B;Mn.innerHTML=`
-    <div class="app" data-theme="${B.theme}">
-      <div class="container">
-        <div class="header">
-          <div>
-            <h1 class="title">Probuy</h1>
-            <div class="subtitle">Мини‑приложение</div>
-          </div>
-        </div>
-
-        ${t?'<div class="loading">Загрузка…</div>':""}
-        ${n?`<div class="error">${n}</div>`:""}
-
-        ${e?`
-          <div class="card code-card">
-            <div>
-              <div class="subtitle">Ваш код клиента</div>
-              <div class="code">${e.code}</div>
-            </div>
-            <div class="actions">
-              <button class="btn" id="btnAddr">Адрес склада</button>
-              <button class="btn primary" id="btnMgr">Менеджер</button>
-            </div>
-          </div>
-
-          ${Wn(e.tracks)}
-
-          <div class="actions" style="margin-top: 16px">
-            <button class="btn" id="btnAdd">Добавить трек</button>
-            <button class="btn" id="btnClr">Очистить</button>
-            <button class="btn success" id="btnBuy">Оформить заказ</button>
-          </div>
-        `:""}
-      </div>
-    </div>
-
-    <!-- Modals -->
-    <div class="modal-overlay" id="modalAddress">
-      <div class="modal">
-        <h3 class="modal-title">Адрес склада</h3>
-        <div id="addressText" class="banner">Загрузка…</div>
-        <div class="modal-actions">
-          <button class="btn" data-close="modalAddress">Закрыть</button>
-        </div>
-      </div>
-    </div>
-
-    <div class="modal-overlay" id="modalAddTrack">
-      <div class="modal">
-        <h3 class="modal-title">Добавить трек</h3>
-        <form id="formAddTrack">
-          <div class="field">
-            <label class="label" for="trackInput">Трек-код</label>
-            <input class="input" id="trackInput" placeholder="A1B2C3D4..." />
-          </div>
-          <div class="field">
-            <label class="label" for="deliverySelect">Тип доставки</label>
-            <select class="select" id="deliverySelect">
-              <option value="">Не выбрано</option>
-              ${B.deliveries.map(b=>`<option value="${b.key}">${b.name}</option>`).join("")}
-            </select>
-          </div>
-          <div class="modal-actions">
-            <button type="button" class="btn" data-close="modalAddTrack">Отмена</button>
-            <button type="submit" class="btn primary">Добавить</button>
-          </div>
-        </form>
-      </div>
-    </div>
-
-    <div class="modal-overlay" id="modalManager">
-      <div class="modal">
-        <h3 class="modal-title">Связаться с менеджером</h3>
-        <form id="formManager">
-          <div class="field">
-            <label class="label" for="managerText">Сообщение (необязательно)</label>
-            <textarea class="textarea" id="managerText" placeholder="Коротко опишите вопрос"></textarea>
-          </div>
-          <div class="modal-actions">
-            <button type="button" class="btn" data-close="modalManager">Отмена</button>
-            <button type="submit" class="btn primary">Отправить</button>
-          </div>
-        </form>
-      </div>
-    </div>
-
-    <div class="modal-overlay" id="modalBuy">
-      <div class="modal">
-        <h3 class="modal-title">Оформить заказ</h3>
-        <form id="formBuy">
-          <div class="field">
-            <label class="label" for="buyText">Что купить и в каком количестве?</label>
-            <textarea class="textarea" id="buyText" placeholder="Например: 10 шт. товара X, цвет синий"></textarea>
-          </div>
-          <div class="modal-actions">
-            <button type="button" class="btn" data-close="modalBuy">Отмена</button>
-            <button type="submit" class="btn success">Отправить</button>
-          </div>
-        </form>
-      </div>
-    </div>
-
-    <div class="modal-overlay" id="modalPhotos">
-      <div class="modal">
-        <h3 class="modal-title">Фото по треку</h3>
-        <div id="photosWrap" class="banner">Загрузка…</div>
-        <div class="modal-actions">
-          <button class="btn" data-close="modalPhotos">Закрыть</button>
-        </div>
-      </div>
-    </div>
-  `,(r=document.getElementById("btnAdd"))==null||r.addEventListener("click",()=>$("modalAddTrack")),(s=document.getElementById("btnClr"))==null||s.addEventListener("click",$n),(o=document.getElementById("btnAddr"))==null||o.addEventListener("click",zn),(i=document.getElementById("btnMgr"))==null||i.addEventListener("click",()=>$("modalManager")),(c=document.getElementById("btnBuy"))==null||c.addEventListener("click",()=>$("modalBuy")),(d=document.querySelectorAll("[data-close]"))==null||d.forEach(b=>b.addEventListener("click",f=>{const m=f.currentTarget.getAttribute("data-close");re(m)})),(l=document.getElementById("formAddTrack"))==null||l.addEventListener("submit",b=>{b.preventDefault(),Hn(b.currentTarget)}),(u=document.getElementById("formManager"))==null||u.addEventListener("submit",b=>{b.preventDefault(),Jn(b.currentTarget)}),(p=document.getElementById("formBuy"))==null||p.addEventListener("submit",b=>{b.preventDefault(),Vn(b.currentTarget)}),(w=document.querySelectorAll("[data-photo-track]"))==null||w.forEach(b=>b.addEventListener("click",f=>{const m=f.currentTarget.getAttribute("data-photo-track");Kn(m)}))}Ee();ge();
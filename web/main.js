@@ -7,7 +7,7 @@ if (tg) {
 }
 
 const root = document.getElementById('app')
-const state = { me: null, loading: false, error: null, deliveries: [], theme: 'light' }
+const state = { me: null, photos: null, loading: false, error: null, deliveries: [], theme: 'light' }
 
 function applyTelegramTheme() {
   const bgColor = tg?.themeParams?.bg_color || '#f6f9fc'
@@ -36,7 +36,8 @@ async function callApi(method, url, data) {
 async function loadMe() {
   try {
     setLoading(true)
-    state.me = await callApi('get', '/api/me')
+    state.me = await callApi('get', '/api/me?photos=1')
+    state.photos = null
     const d = await callApi('get', '/api/deliveries')
     state.deliveries = d?.items || []
     setError(null)
@@ -132,7 +133,7 @@ function renderTracks(tracks) {
             ${t.delivery ? `<span class="chip">${t.delivery}</span>` : ''}
           </div>
           <div class="track-actions">
-            <button class="btn" data-photo-track="${t.track}">Фото</button>
+            <button class="btn" data-photo-track="${t.track}">Фото${t.photos ? ` (${t.photos})` : ''}</button>
           </div>
         </div>
       `).join('')}
@@ -140,13 +141,20 @@ function renderTracks(tracks) {
   `
 }
 
+// Фото всех треков с фотографиями загружаются одним запросом и дальше берутся из state.photos
+async function loadPhotos() {
+  const tracks = (state.me?.tracks || []).filter(t => t.photos).map(t => t.track)
+  const data = tracks.length ? await callApi('post', '/api/photos', { tracks }) : null
+  state.photos = data?.photos || {}
+}
+
 async function openPhotos(track) {
   try {
     setLoading(true)
-    const data = await callApi('get', `/api/track/${encodeURIComponent(track)}/photos`)
+    if (!state.photos) await loadPhotos()
     const wrap = document.getElementById('photosWrap')
     if (wrap) {
-      const list = (data?.photos || [])
+      const list = (state.photos[track] || [])
       if (!list.length) {
         wrap.innerHTML = '<div class="banner">Фото пока нет</div>'
       } else {
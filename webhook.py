@@ -0,0 +1,242 @@
+import os
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger("webhook")
+
+# Режим webhook: Telegram присылает апдейты в FastAPI-приложение (api.py), бот работает
+# внутри процесса uvicorn. BOT_MODE=polling (по умолчанию) — отдельный процесс bot.py с long polling.
+BOT_MODE = os.getenv("BOT_MODE", "polling").strip().lower()
+BOT_TOKEN = os.getenv("BOT_TOKEN", "")
+# Секрет входит в путь и передается Telegram как secret_token (заголовок X-Telegram-Bot-Api-Secret-Token).
+# По умолчанию выводится из BOT_TOKEN, чтобы не заводить отдельную переменную.
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "").strip() or (
+    hashlib.sha256(f"webhook:{BOT_TOKEN}".encode()).hexdigest()[:32] if BOT_TOKEN else ""
+)
+WEBHOOK_PATH = "/tg/webhook"
+# Публичный адрес для setWebhook; по умолчанию — адрес WebApp (WEBAPP_URL, см. Procfile)
+WEBHOOK_BASE_URL = (os.getenv("WEBHOOK_URL", "").strip() or os.getenv("WEBAPP_URL", "").strip()).rstrip("/")
+# Сколько апдейтов обрабатывается одновременно (разных чатов) и сколько всего может ждать в очереди.
+# Переполненная очередь отвечает 503 — Telegram повторит доставку позже.
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "32") or 32)
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000") or 1000)
+# Сколько ждать обработки очереди при остановке
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "10") or 10)
+# Файл, в который пишутся входящие апдейты (JSON Lines) для нагрузочного прогона; пусто — не пишем
+WEBHOOK_RECORD_PATH = os.getenv("WEBHOOK_RECORD_PATH", "").strip()
+
+UpdateHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def webhook_url() -> str:
+    if not WEBHOOK_BASE_URL:
+        return ""
+    base = WEBHOOK_BASE_URL if WEBHOOK_BASE_URL.startswith(("http://", "https://")) else f"https://{WEBHOOK_BASE_URL}"
+    return f"{base}{WEBHOOK_PATH}/{WEBHOOK_SECRET}"
+
+
+def update_chat_id(update: Dict[str, Any]) -> int:
+    # Чат апдейта: по нему апдейты раскладываются по очередям, чтобы один чат обрабатывался по порядку
+    for key in ("message", "edited_message", "channel_post", "edited_channel_post"):
+        chat = (update.get(key) or {}).get("chat")
+        if chat:
+            return int(chat.get("id") or 0)
+    callback = update.get("callback_query")
+    if callback:
+        chat = (callback.get("message") or {}).get("chat")
+        if chat:
+            return int(chat.get("id") or 0)
+    for key in ("callback_query", "inline_query", "chosen_inline_result", "shipping_query", "pre_checkout_query", "my_chat_member", "chat_member", "chat_join_request"):
+        value = update.get(key)
+        if value:
+            chat = value.get("chat") or value.get("from") or {}
+            return int(chat.get("id") or 0)
+    return 0
+
+
+class UpdateQueue:
+    """Bounded in-process queue of webhook updates.
+
+    Updates of one chat are handled one after another in arrival order; updates of
+    different chats run concurrently, up to ``workers`` at a time, so a slow handler
+    holds up only its own chat.
+    """
+
+    def __init__(self, handler: UpdateHandler, workers: int = WEBHOOK_WORKERS, size: int = WEBHOOK_QUEUE_SIZE):
+        self._handler = handler
+        self._workers = max(1, workers)
+        self._size = max(1, size)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._space: Optional[asyncio.Event] = None
+        # chat_id -> задача последнего принятого апдейта чата; следующий апдейт чата ждет ее
+        self._tails: Dict[int, asyncio.Task] = {}
+        self._pending: Set[asyncio.Task] = set()
+        self._active = 0
+        self._processed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def start(self) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._workers)
+            self._space = asyncio.Event()
+            self._space.set()
+
+    def put(self, update: Dict[str, Any]) -> bool:
+        # False — очередь заполнена, апдейт нужно отклонить
+        if len(self._pending) >= self._size:
+            self._rejected += 1
+            return False
+        self._submit(update)
+        return True
+
+    async def put_wait(self, update: Dict[str, Any]) -> None:
+        # Для внутренних источников (воркер, см. workers.py): ждем места вместо отказа
+        while len(self._pending) >= self._size:
+            self._space.clear()
+            await self._space.wait()
+        self._submit(update)
+
+    def _submit(self, update: Dict[str, Any]) -> None:
+        self.start()
+        chat_id = update_chat_id(update)
+        task = asyncio.get_running_loop().create_task(self._run(update, self._tails.get(chat_id)))
+        self._tails[chat_id] = task
+        self._pending.add(task)
+        task.add_done_callback(functools.partial(self._done, chat_id))
+
+    def _done(self, chat_id: int, task: asyncio.Task) -> None:
+        self._pending.discard(task)
+        if self._tails.get(chat_id) is task:
+            del self._tails[chat_id]
+        if len(self._pending) < self._size:
+            self._space.set()
+
+    async def _run(self, update: Dict[str, Any], previous: Optional[asyncio.Task]) -> None:
+        if previous is not None:
+            # Порядок внутри чата: ждем предыдущий апдейт, его ошибка нас не касается
+            await asyncio.wait({previous})
+        async with self._slots:
+            self._active += 1
+            try:
+                await self._handler(update)
+                self._processed += 1
+            except Exception as e:
+                self._failed += 1
+                logger.exception("Failed to process update %s: %s", update.get("update_id"), e)
+            finally:
+                self._active -= 1
+
+    async def stop(self, timeout: float = WEBHOOK_DRAIN_TIMEOUT) -> None:
+        # Принятые апдейты Telegram уже не повторит — даем им обработаться
+        if not self._pending:
+            return
+        _, left = await asyncio.wait(set(self._pending), timeout=timeout)
+        if left:
+            logger.warning("Webhook queue not drained in %ss, %s updates dropped", timeout, len(left))
+            for task in left:
+                task.cancel()
+            await asyncio.gather(*left, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self._workers,
+            "active": self._active,
+            "queued": len(self._pending) - self._active,
+            "chats": len(self._tails),
+            "processed": self._processed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+        }
+
+
+def record_update(update: Dict[str, Any]) -> None:
+    if not WEBHOOK_RECORD_PATH:
+        return
+    try:
+        with open(WEBHOOK_RECORD_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(update, ensure_ascii=False) + "\n")
+    except Exception as e:
+        logger.warning("Failed to record update: %s", e)
+
+
+def synthetic_updates(count: int, chats: int = 100) -> List[Dict[str, Any]]:
+    # Текстовые сообщения от chats пользователей с большими id — для прогона без записанных апдейтов
+    base = 9_000_000_000
+    now = int(time.time())
+    updates = []
+    for i in range(count):
+        chat_id = base + i % max(1, chats)
+        user = {"id": chat_id, "is_bot": False, "first_name": "Bench"}
+        updates.append({
+            "update_id": i + 1,
+            "message": {
+                "message_id": i + 1,
+                "date": now,
+                "chat": {"id": chat_id, "type": "private", "first_name": "Bench"},
+                "from": user,
+                "text": "/help",
+            },
+        })
+    return updates
+
+
+# Нагрузочный прогон: записанные апдейты (WEBHOOK_RECORD_PATH) отправляются на локальный endpoint
+async def replay(updates: List[Dict[str, Any]], url: str, concurrency: int = 50) -> dict:
+    import httpx
+
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    pending = iter(updates)
+
+    async def client_loop(client: "httpx.AsyncClient") -> None:
+        for update in pending:
+            started = time.perf_counter()
+            try:
+                resp = await client.post(url, json=update, headers={"X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET})
+                status = resp.status_code
+            except httpx.HTTPError:
+                status = 0
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=30) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(max(1, concurrency))))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "updates": len(latencies),
+        "statuses": statuses,
+        "updates_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else 0.0,
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def _load_updates(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python webhook.py replay <updates.jsonl | synthetic:N> [base_url] [concurrency]
+    if len(sys.argv) < 3 or sys.argv[1] != "replay":
+        sys.exit("Usage: python webhook.py replay <updates.jsonl | synthetic:N> [base_url] [concurrency]")
+    source = sys.argv[2]
+    if source.startswith("synthetic:"):
+        data = synthetic_updates(int(source.split(":", 1)[1]))
+    else:
+        data = _load_updates(source)
+    base_url = (sys.argv[3] if len(sys.argv) > 3 else "http://127.0.0.1:8000").rstrip("/")
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 50
+    report = asyncio.run(replay(data, f"{base_url}{WEBHOOK_PATH}/{WEBHOOK_SECRET}", workers))
+    for key, value in report.items():
+        print(f"{key:<16} {value}")
@@ -0,0 +1,302 @@
+import os
+import asyncio
+import importlib
+import logging
+import multiprocessing as mp
+import queue
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from storage import DB_ENGINE
+from webhook import BOT_MODE, WEBHOOK_QUEUE_SIZE, UpdateQueue, update_chat_id
+
+logger = logging.getLogger("workers")
+
+# Несколько процессов-воркеров бота: апдейты делятся между ними по chat_id (chat_id % BOT_WORKERS),
+# поэтому апдейты одного чата всегда попадают в один воркер и обрабатываются по порядку.
+# Но обработчик может менять данные чужого чата (рассылка фото клиентам, /ban, /wipe) — кэши
+# в памяти владельца чата об этом узнают через служебные сообщения (notify_owner, broadcast).
+# Источник апдейтов — long polling в родительском процессе (python workers.py run) или webhook (api.py).
+# Состояние чата должно быть общим: FSM_STORAGE=db и DB_ENGINE=postgres/sqlite, не memory.
+# Пул соединений к базе (DB_POOL_MAX) открывает каждый воркер.
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "1") or 1)
+# Обработчик апдейта в воркере — "модуль:функция"; модуль с dp получает on_startup/on_shutdown
+BOT_WORKER_HANDLER = "bot:process_webhook_update"
+# Long polling: сколько секунд Telegram держит запрос getUpdates
+POLL_TIMEOUT = int(os.getenv("POLL_TIMEOUT", "20") or 20)
+# Сколько ждать завершения воркеров при остановке
+WORKER_STOP_TIMEOUT = float(os.getenv("WORKER_STOP_TIMEOUT", "30") or 30)
+# Модуль обработчика может объявить эту корутину — она получает служебные сообщения от других воркеров
+WORKER_CONTROL_HANDLER = "process_worker_control"
+
+# В процессе воркера: очереди служебных сообщений всех воркеров и номер своего.
+# Пусто — бот работает одним процессом и сам владеет всеми чатами.
+_control_queues: List["mp.Queue"] = []
+_worker_index = 0
+
+
+def owns_chat(chat_id: int) -> bool:
+    # Апдейты этого чата обрабатывает текущий процесс, и его кэши в памяти — здесь
+    return not _control_queues or int(chat_id) % len(_control_queues) == _worker_index
+
+
+def notify_owner(chat_id: int, message: Dict[str, Any]) -> None:
+    # Служебное сообщение воркеру, который обрабатывает чат (если это не текущий процесс)
+    if _control_queues and not owns_chat(chat_id):
+        _control_queues[int(chat_id) % len(_control_queues)].put_nowait(message)
+
+
+def broadcast(message: Dict[str, Any]) -> None:
+    # Служебное сообщение всем остальным воркерам
+    for index, control in enumerate(_control_queues):
+        if index != _worker_index:
+            control.put_nowait(message)
+
+
+def _worker_main(index: int, count: int, updates: "mp.Queue", controls: List["mp.Queue"], processed: Any, handler_spec: str) -> None:
+    global _control_queues, _worker_index
+    # Остановкой управляет родитель (стоп-сигнал в очереди), иначе Ctrl+C/SIGTERM оборвут обработку
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    os.environ["BOT_WORKER_INDEX"] = str(index)
+    # Лимит Telegram (~30 сообщений/с на бота) делим между воркерами
+    os.environ["SEND_RATE"] = str(float(os.getenv("SEND_RATE", "30") or 30) / count)
+    _control_queues, _worker_index = controls, index
+    asyncio.run(_worker_loop(updates, processed, handler_spec))
+
+
+async def _read_controls(module: Any, reader: ThreadPoolExecutor) -> None:
+    control_handler = getattr(module, WORKER_CONTROL_HANDLER, None)
+    own = _control_queues[_worker_index]
+    loop = asyncio.get_running_loop()
+    while True:
+        message = await loop.run_in_executor(reader, own.get)
+        if message is None:
+            return
+        if control_handler is None:
+            continue
+        try:
+            await control_handler(message)
+        except Exception as e:
+            logger.exception("Failed to process control message %s: %s", message, e)
+
+
+async def _worker_loop(updates: "mp.Queue", processed: Any, handler_spec: str) -> None:
+    module_name, func_name = handler_spec.split(":", 1)
+    module = importlib.import_module(module_name)
+    handler = getattr(module, func_name)
+    dp = getattr(module, "dp", None)
+    if dp is not None:
+        await module.on_startup(dp)
+    # Служебные сообщения читаются отдельно от апдейтов: очередь апдейтов может быть заполнена
+    control_reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="control-reader")
+    controls = asyncio.get_running_loop().create_task(_read_controls(module, control_reader))
+
+    async def handle(update: Dict[str, Any]) -> None:
+        try:
+            await handler(update)
+        finally:
+            with processed.get_lock():
+                processed.value += 1
+
+    pending = UpdateQueue(handle)
+    pending.start()
+    loop = asyncio.get_running_loop()
+    # Отдельный поток под блокирующее чтение очереди — общий executor нужен базе
+    reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="updates-reader")
+    try:
+        while True:
+            update = await loop.run_in_executor(reader, updates.get)
+            if update is None:
+                break
+            await pending.put_wait(update)
+    finally:
+        await pending.stop()
+        _control_queues[_worker_index].put(None)
+        await controls
+        control_reader.shutdown(wait=False)
+        if dp is not None:
+            await module.on_shutdown(dp)
+            await dp.bot.session.close()
+        reader.shutdown(wait=False)
+
+
+class WorkerPool:
+    """Hash-partition updates by chat_id across N bot worker processes.
+
+    Exposes the same put/stop/stats interface as webhook.UpdateQueue, so api.py can feed either.
+    """
+
+    def __init__(self, count: int = BOT_WORKERS, handler: str = BOT_WORKER_HANDLER, size: int = WEBHOOK_QUEUE_SIZE):
+        if count > 1 and handler == BOT_WORKER_HANDLER and DB_ENGINE == "memory":
+            raise RuntimeError("BOT_WORKERS > 1 needs a shared database: set DB_ENGINE=postgres or sqlite")
+        ctx = mp.get_context("spawn")
+        self._count = max(1, count)
+        lane_size = max(1, -(-max(1, size) // self._count))
+        self._queues = [ctx.Queue(maxsize=lane_size) for _ in range(self._count)]
+        # Служебные сообщения между воркерами — без лимита, чтобы отправитель никогда не ждал
+        self._controls = [ctx.Queue() for _ in range(self._count)]
+        self._processed = [ctx.Value("q", 0) for _ in range(self._count)]
+        self._procs = [
+            ctx.Process(
+                target=_worker_main,
+                args=(i, self._count, self._queues[i], self._controls, self._processed[i], handler),
+                name=f"bot-worker-{i}",
+                daemon=True,
+            )
+            for i in range(self._count)
+        ]
+        self._rejected = 0
+
+    def start(self) -> None:
+        for proc in self._procs:
+            proc.start()
+
+    def _queue(self, update: Dict[str, Any]) -> "mp.Queue":
+        return self._queues[update_chat_id(update) % self._count]
+
+    def put(self, update: Dict[str, Any]) -> bool:
+        # False — очередь воркера заполнена (webhook ответит 503, Telegram повторит)
+        try:
+            self._queue(update).put_nowait(update)
+        except queue.Full:
+            self._rejected += 1
+            return False
+        return True
+
+    async def put_wait(self, update: Dict[str, Any]) -> None:
+        # Для long polling: ждем, пока воркер разгребет очередь
+        target = self._queue(update)
+        while True:
+            try:
+                target.put_nowait(update)
+                return
+            except queue.Full:
+                await asyncio.sleep(0.05)
+
+    def processed(self) -> int:
+        return sum(v.value for v in self._processed)
+
+    async def stop(self, timeout: float = WORKER_STOP_TIMEOUT) -> None:
+        loop = asyncio.get_running_loop()
+        for q in self._queues:
+            await loop.run_in_executor(None, q.put, None)
+        deadline = time.monotonic() + timeout
+        for proc in self._procs:
+            await loop.run_in_executor(None, proc.join, max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                logger.warning("Worker %s did not stop in %ss, terminating", proc.name, timeout)
+                proc.terminate()
+
+    def stats(self) -> dict:
+        try:
+            queued: Optional[int] = sum(q.qsize() for q in self._queues)
+        except NotImplementedError:
+            # macOS не поддерживает qsize у multiprocessing.Queue
+            queued = None
+        return {
+            "workers": self._count,
+            "alive": sum(1 for p in self._procs if p.is_alive()),
+            "queued": queued,
+            "processed": self.processed(),
+            "rejected": self._rejected,
+        }
+
+
+async def run_polling(count: int = BOT_WORKERS) -> None:
+    # Родительский процесс: получает апдейты через getUpdates и раздает их воркерам
+    from aiogram import Bot
+
+    if BOT_MODE == "webhook":
+        raise SystemExit("BOT_MODE=webhook: апдейты принимает api.py, long polling не нужен")
+    bot = Bot(token=os.getenv("BOT_TOKEN", ""))
+    pool = WorkerPool(count)
+    pool.start()
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, main_task.cancel)
+    except (NotImplementedError, RuntimeError):
+        pass
+    offset = None
+    try:
+        await bot.delete_webhook()
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=POLL_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("getUpdates failed: %s", e)
+                await asyncio.sleep(1)
+                continue
+            for update in updates:
+                offset = update.update_id + 1
+                await pool.put_wait(update.to_python())
+    except (asyncio.CancelledError, KeyboardInterrupt):
+        pass
+    finally:
+        await pool.stop()
+        await bot.session.close()
+
+
+# Нагрузочный прогон пула: синтетические апдейты с обработчиком, имитирующим CPU и ожидание сети
+BENCH_CPU_MS = float(os.getenv("BENCH_CPU_MS", "2") or 0)
+BENCH_IO_MS = float(os.getenv("BENCH_IO_MS", "20") or 0)
+
+
+async def bench_handler(update: Dict[str, Any]) -> None:
+    deadline = time.perf_counter() + BENCH_CPU_MS / 1000
+    while time.perf_counter() < deadline:
+        pass
+    await asyncio.sleep(BENCH_IO_MS / 1000)
+
+
+async def bench(max_workers: int = 4, updates: int = 2000) -> List[dict]:
+    from webhook import synthetic_updates
+
+    data = synthetic_updates(updates, chats=max(100, max_workers * 25))
+    rows = []
+    count = 1
+    while count <= max_workers:
+        pool = WorkerPool(count, handler="workers:bench_handler")
+        pool.start()
+        # Прогрев: ждем, пока воркеры запустятся и обработают по апдейту
+        warmup = synthetic_updates(count, chats=count)
+        for update in warmup:
+            await pool.put_wait(update)
+        while pool.processed() < len(warmup):
+            await asyncio.sleep(0.01)
+        started = time.perf_counter()
+        for update in data:
+            await pool.put_wait(update)
+        while pool.processed() < len(warmup) + len(data):
+            await asyncio.sleep(0.005)
+        elapsed = time.perf_counter() - started
+        await pool.stop()
+        rows.append({"workers": count, "updates": len(data), "seconds": round(elapsed, 3), "updates_per_sec": round(len(data) / elapsed, 1)})
+        count *= 2
+    return rows
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python workers.py run [workers] — long polling с раздачей апдейтов воркерам
+    # python workers.py bench [max_workers] [updates]
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if cmd == "run":
+        asyncio.run(run_polling(int(sys.argv[2]) if len(sys.argv) > 2 else BOT_WORKERS))
+        sys.exit(0)
+    if cmd != "bench":
+        sys.exit("Usage: python workers.py run [workers] | bench [max_workers] [updates]")
+    result = asyncio.run(bench(
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 2000,
+    ))
+    print(f"{'workers':>8} {'updates':>8} {'seconds':>9} {'updates/s':>10}")
+    for row in result:
+        print(f"{row['workers']:>8} {row['updates']:>8} {row['seconds']:>9} {row['updates_per_sec']:>10}")